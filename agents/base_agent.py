@@ -1,15 +1,30 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from .dtmac import DTMAC, DTMessage, MessagePriority
+from .concurrency import run_blocking
 
 class BaseAgent(ABC):
-    def __init__(self, agent_id: str, dtmac: DTMAC, topics: List[str]):
-        self.agent_id = agent_id
+    # Attributes saved in DTMAC message log snapshots and restored before replay
+    state_attributes: Tuple[str, ...] = ()
+    
+    def __init__(self, agent_id: str, dtmac: DTMAC, topics: List[str], replica: Optional[int] = None):
+        """
+        Args:
+            replica: Replica number when running several instances of this agent;
+                     DTMAC then shards messages for agent_id across them by symbol.
+        """
+        self.group_id = agent_id  # ID other agents address this agent by
+        self.agent_id = agent_id if replica is None else f"{agent_id}#{replica}"
         self.dtmac = dtmac
         self.topics = topics
         
         # Register agent with DTMAC
-        self.dtmac.register_agent(agent_id, topics)
+        if replica is None:
+            self.dtmac.register_agent(agent_id, topics)
+        else:
+            self.dtmac.register_replica(agent_id, self.agent_id, topics)
+        if self.state_attributes:
+            self.dtmac.register_state(self.agent_id, self.get_state, self.load_state)
         
         # Register default message handlers
         self._register_default_handlers()
@@ -21,9 +36,8 @@ class BaseAgent(ABC):
     
     async def _handle_ping(self, message: DTMessage):
         """Handle ping messages"""
-        await self.dtmac.send_message(
-            sender=self.agent_id,
-            recipients=[message.sender],
+        await self.reply(
+            message,
             content={"status": "alive"},
             message_type="pong",
             priority=MessagePriority.HIGH
@@ -32,14 +46,27 @@ class BaseAgent(ABC):
     async def _handle_status_request(self, message: DTMessage):
         """Handle status request messages"""
         status = await self.get_status()
-        await self.dtmac.send_message(
-            sender=self.agent_id,
-            recipients=[message.sender],
+        await self.reply(
+            message,
             content={"status": status},
             message_type="status_response",
             priority=MessagePriority.NORMAL
         )
     
+    def get_state(self) -> Dict[str, Any]:
+        """State to snapshot; values must be plain data (dicts, lists, numbers, strings, datetimes)"""
+        return {name: getattr(self, name, None) for name in self.state_attributes}
+    
+    def load_state(self, state: Dict[str, Any]):
+        """Restore state saved by get_state"""
+        for name in self.state_attributes:
+            if name in state:
+                setattr(self, name, state[name])
+    
+    async def run_blocking(self, func, *args, executor: str = "thread", **kwargs) -> Any:
+        """Run blocking work (file I/O, pandas) in a thread or process executor from a handler"""
+        return await run_blocking(func, *args, executor=executor, **kwargs)
+    
     @abstractmethod
     async def get_status(self) -> Dict[str, Any]:
         """Get current status of the agent"""
@@ -61,6 +88,63 @@ class BaseAgent(ABC):
             metadata=metadata
         )
     
+    async def request(self,
+                      recipient: str,
+                      content: Dict[str, Any],
+                      message_type: str,
+                      priority: MessagePriority = MessagePriority.NORMAL,
+                      timeout: Optional[float] = 30.0) -> DTMessage:
+        """Send a request to a specific agent and wait for its reply"""
+        return await self.dtmac.request(
+            sender=self.agent_id,
+            recipient=recipient,
+            content=content,
+            message_type=message_type,
+            priority=priority,
+            timeout=timeout
+        )
+    
+    async def reply(self,
+                    request: DTMessage,
+                    content: Dict[str, Any],
+                    message_type: str,
+                    priority: MessagePriority = MessagePriority.NORMAL):
+        """Reply to a message received from another agent or from request()"""
+        await self.dtmac.reply(
+            request,
+            sender=self.agent_id,
+            content=content,
+            message_type=message_type,
+            priority=priority
+        )
+    
+    def schedule_message(self,
+                         recipient: str,
+                         content: Dict[str, Any],
+                         message_type: str,
+                         delay: float = 0.0,
+                         interval: Optional[float] = None,
+                         jitter: float = 0.0,
+                         priority: MessagePriority = MessagePriority.NORMAL,
+                         key: Optional[str] = None) -> int:
+        """Send a message after delay seconds, then every interval seconds if given;
+        send it to self.agent_id to run a periodic refresh cycle"""
+        return self.dtmac.schedule_message(
+            sender=self.agent_id,
+            recipients=[recipient],
+            content=content,
+            message_type=message_type,
+            delay=delay,
+            priority=priority,
+            interval=interval,
+            jitter=jitter,
+            key=key
+        )
+    
+    def cancel_scheduled(self, timer_id: Optional[int] = None, key: Optional[str] = None) -> bool:
+        """Cancel a message scheduled with schedule_message"""
+        return self.dtmac.cancel_scheduled(timer_id, key)
+    
     async def broadcast_to_topic(self, 
                                topic: str, 
                                content: Dict[str, Any], 
@@ -75,13 +159,21 @@ class BaseAgent(ABC):
             priority=priority
         )
     
-    def get_message_history(self) -> List[DTMessage]:
-        """Get message history for this agent"""
-        return self.dtmac.get_message_history(self.agent_id)
+    def get_message_history(self, message_type: Optional[str] = None) -> List[DTMessage]:
+        """Get message history for this agent, optionally filtered by message type"""
+        return self.dtmac.get_message_history(self.agent_id, message_type)
+    
+    def subscribe(self, topics: List[str]):
+        """Subscribe to more topics, e.g. per-symbol ones such as market_data.AAPL"""
+        self.dtmac.subscribe(self.group_id, topics)
+    
+    def unsubscribe(self, topics: List[str]):
+        """Stop receiving messages for topics"""
+        self.dtmac.unsubscribe(self.group_id, topics)
     
     def get_subscribed_topics(self) -> List[str]:
         """Get topics this agent is subscribed to"""
-        return self.dtmac.get_agent_topics(self.agent_id)
+        return self.dtmac.get_agent_topics(self.group_id)
     
     def get_topic_subscribers(self, topic: str) -> List[str]:
         """Get all agents subscribed to a topic"""
@@ -0,0 +1,197 @@
+"""
+Compact binary encoding for DTMAC messages crossing a process boundary.
+
+Values are tagged with a single byte; lengths and integers use varints, so
+small messages stay small and no pickled Python objects ever cross the wire.
+Supported values: None, bool, int, float, str, bytes, datetime, lists/tuples
+and mappings with string keys. numpy scalars are converted to int/float.
+"""
+
+import struct
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from .dtmac import DTMessage, message_time_ns
+
+_NONE = b"N"
+_TRUE = b"T"
+_FALSE = b"F"
+_INT = b"i"
+_FLOAT = b"d"
+_STR = b"s"
+_BYTES = b"b"
+_LIST = b"l"
+_MAP = b"m"
+_DATETIME = b"t"
+
+_DOUBLE = struct.Struct("<d")
+
+# Wire format version of an encoded message
+MESSAGE_FORMAT = 2
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_value(out: bytearray, value: Any):
+    if value is None:
+        out += _NONE
+    elif value is True:
+        out += _TRUE
+    elif value is False:
+        out += _FALSE
+    elif isinstance(value, float):
+        out += _FLOAT
+        out += _DOUBLE.pack(value)
+    elif isinstance(value, str):
+        raw = value.encode("utf-8")
+        out += _STR
+        _write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, Mapping):
+        out += _MAP
+        _write_varint(out, len(value))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                key = str(key)
+            _write_value(out, key)
+            _write_value(out, item)
+    elif isinstance(value, (list, tuple)):
+        out += _LIST
+        _write_varint(out, len(value))
+        for item in value:
+            _write_value(out, item)
+    elif isinstance(value, datetime):
+        out += _DATETIME
+        out += _DOUBLE.pack(value.timestamp())
+    elif isinstance(value, (bytes, bytearray)):
+        out += _BYTES
+        _write_varint(out, len(value))
+        out += value
+    elif hasattr(value, "__index__"):
+        # ints, including numpy integers; zigzag keeps small negatives short
+        number = value.__index__()
+        if not -2**63 <= number < 2**63:
+            raise OverflowError(f"Integer {number} does not fit in 64 bits")
+        out += _INT
+        _write_varint(out, (number << 1) ^ (number >> 63))
+    elif hasattr(value, "__float__") and type(value).__module__ == "numpy":
+        out += _FLOAT
+        out += _DOUBLE.pack(float(value))
+    else:
+        raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def _read_value(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos:pos + 1]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _TRUE:
+        return True, pos
+    if tag == _FALSE:
+        return False, pos
+    if tag == _INT:
+        raw, pos = _read_varint(data, pos)
+        return (raw >> 1) ^ -(raw & 1), pos
+    if tag == _FLOAT:
+        return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+    if tag == _STR:
+        length, pos = _read_varint(data, pos)
+        return data[pos:pos + length].decode("utf-8"), pos + length
+    if tag == _MAP:
+        count, pos = _read_varint(data, pos)
+        result = {}
+        for _ in range(count):
+            key, pos = _read_value(data, pos)
+            result[key], pos = _read_value(data, pos)
+        return result, pos
+    if tag == _LIST:
+        count, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _read_value(data, pos)
+            items.append(item)
+        return items, pos
+    if tag == _DATETIME:
+        return datetime.fromtimestamp(_DOUBLE.unpack_from(data, pos)[0]), pos + 8
+    if tag == _BYTES:
+        length, pos = _read_varint(data, pos)
+        return bytes(data[pos:pos + length]), pos + length
+    raise ValueError(f"Unknown value tag {tag!r} at offset {pos - 1}")
+
+
+def pack(value: Any) -> bytes:
+    """Encode a value"""
+    out = bytearray()
+    _write_value(out, value)
+    return bytes(out)
+
+
+def unpack(data: bytes) -> Any:
+    """Decode a value produced by pack()"""
+    value, pos = _read_value(data, 0)
+    if pos != len(data):
+        raise ValueError(f"Trailing bytes after decoded value ({len(data) - pos})")
+    return value
+
+
+def message_to_fields(message: DTMessage) -> List[Any]:
+    # Timestamps travel as wall-clock time, monotonic clocks are not comparable across hosts
+    return [
+        MESSAGE_FORMAT,
+        message.origin,
+        message.seq,
+        message.sender,
+        message.recipients,
+        message.content,
+        message.wall_time_ns,
+        message.priority,
+        message.message_type,
+        message.metadata
+    ]
+
+
+def message_from_fields(fields: List[Any]) -> DTMessage:
+    version = fields[0]
+    if version != MESSAGE_FORMAT:
+        raise ValueError(f"Unsupported message format {version}")
+    _, origin, seq, sender, recipients, content, wall_time_ns, priority, message_type, metadata = fields
+    return DTMessage(
+        sender=sender,
+        recipients=recipients,
+        content=content,
+        message_type=message_type,
+        priority=priority,
+        metadata=metadata,
+        seq=seq,
+        origin=origin,
+        timestamp_ns=message_time_ns(wall_time_ns)
+    )
+
+
+def encode_message(message: DTMessage) -> bytes:
+    """Encode a DTMessage"""
+    return pack(message_to_fields(message))
+
+
+def decode_message(data: bytes) -> DTMessage:
+    """Decode a DTMessage produced by encode_message()"""
+    return message_from_fields(unpack(data))
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def run_blocking(func: Callable, *args, executor: str = "thread", **kwargs) -> Any:
+    """Run a blocking function without blocking the event loop.
+
+    executor="thread" suits I/O and pandas/numpy work that releases the GIL.
+    executor="process" runs CPU-bound pure functions in a shared process pool;
+    func and its arguments must be picklable (module-level functions, plain data).
+    """
+    global _process_pool
+    loop = asyncio.get_running_loop()
+    call = partial(func, *args, **kwargs)
+    if executor == "thread":
+        return await loop.run_in_executor(None, call)
+    if executor == "process":
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return await loop.run_in_executor(_process_pool, call)
+    raise ValueError(f"Unknown executor {executor!r}, expected 'thread' or 'process'")
+
+
+def blocking_handler(func: Callable, executor: str = "thread") -> Callable[[Any], Awaitable[None]]:
+    """Wrap a synchronous message handler so it runs in an executor"""
+    async def handler(message):
+        return await run_blocking(func, message, executor=executor)
+    return handler
+
+
+class PartitionedDispatcher:
+    """
+    Runs one agent's handlers concurrently across partitions.
+
+    Messages are partitioned by a key (the symbol by default). Up to
+    concurrency partitions are handled at once, while messages within a
+    partition are handled one at a time in arrival order. At most max_pending
+    messages are taken out of the mailbox ahead of their handler, so the
+    mailbox's priority order, capacity and overflow policy still apply.
+    """
+
+    def __init__(self,
+                 handle: Callable[[Any, float], Awaitable[None]],
+                 concurrency: int,
+                 partition_key: Callable[[Any], Optional[Hashable]],
+                 max_pending: Optional[int] = None):
+        self.handle = handle  # Coroutine function (message, seconds queued)
+        self.concurrency = concurrency
+        self.partition_key = partition_key
+        self.max_pending = max_pending or concurrency * 8
+        self._window: Optional[asyncio.Semaphore] = None
+        self._backlog: Dict[Hashable, Deque[Tuple[Any, float]]] = {}  # Active partition -> messages not started
+        self._ready: Deque[Hashable] = deque()  # Partitions waiting for a free slot
+        self._running = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self, mailbox, keep_running: Callable[[], bool]):
+        """Pull messages from the mailbox and dispatch them until keep_running() is False"""
+        if self._window is None:
+            self._window = asyncio.Semaphore(self.max_pending)
+        while keep_running():
+            await self._window.acquire()
+            try:
+                message, waited = await mailbox.get_with_wait()
+            except BaseException:
+                self._window.release()
+                raise
+            key = self.partition_key(message)
+            backlog = self._backlog.get(key)
+            if backlog is not None:
+                backlog.append((message, waited))
+                continue
+            self._backlog[key] = deque([(message, waited)])
+            if self._running < self.concurrency:
+                self._start(key)
+            else:
+                self._ready.append(key)
+
+    def _start(self, key: Hashable):
+        self._running += 1
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key: Hashable):
+        backlog = self._backlog[key]
+        try:
+            while backlog:
+                message, waited = backlog.popleft()
+                try:
+                    await self.handle(message, waited)
+                finally:
+                    self._window.release()
+        finally:
+            del self._backlog[key]
+            self._running -= 1
+            if self._ready:
+                self._start(self._ready.popleft())
+
+    def messages(self) -> List[Any]:
+        """Messages taken from the mailbox whose handler has not started yet"""
+        return [message for backlog in self._backlog.values() for message, _ in backlog]
+
+    def extract(self, predicate: Callable[[Any], bool]) -> List[Any]:
+        """Remove and return not-yet-started messages matching predicate, oldest first per partition"""
+        extracted = []
+        for key in list(self._backlog):
+            backlog = self._backlog[key]
+            kept = deque()
+            for item in backlog:
+                if predicate(item[0]):
+                    extracted.append(item[0])
+                    self._window.release()
+                else:
+                    kept.append(item)
+            backlog.clear()
+            backlog.extend(kept)
+            if not backlog and key in self._ready:
+                # Never started, so nothing else references the partition
+                self._ready.remove(key)
+                del self._backlog[key]
+        return extracted
+
+    def cancel(self):
+        for task in list(self._tasks):
+            task.cancel()
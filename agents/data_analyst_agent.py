@@ -3,7 +3,7 @@ import os
 from collections import OrderedDict
 import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import pandas as pd
 from datetime import datetime
 import asyncio
@@ -23,10 +23,13 @@ try:
     from services.historic_data import get_historic_data
     from services.earning_call_transcript import get_earnings_call_transcript
     from services.news_sentiment import get_news_sentiment
-    from services.economics import get_economic_indicators
+    from services.economics import get_economic_indicators_async
+    from services.http_client import AsyncHTTPClient
+    from services.stock_overview import fetch_sources, news_failure
     from agents.base_agent import BaseAgent
     from services.stock_data import fetch_stock_basics as stock_data
     from agents.dtmac import MessagePriority, DTMessage
+    from agents.topics import symbol_topic
 except ImportError as e:
     print(f"Import error: {e}")
     print(f"Python path: {sys.path}")
@@ -41,7 +44,9 @@ class DataAnalystAgent(BaseAgent):
     from various sources for further analysis.
     """
 
-    def __init__(self, dtmac):
+    state_attributes = ("current_analysis", "last_update")
+
+    def __init__(self, dtmac, replica: Optional[int] = None):
         # Define topics this agent is interested in
         topics = [
             "market_data",
@@ -49,15 +54,17 @@ class DataAnalystAgent(BaseAgent):
             "risk_alerts",
             "trading_signals"
         ]
-        super().__init__("data_analyst", dtmac, topics)
+        super().__init__("data_analyst", dtmac, topics, replica)
         
         # Register specific message handlers
-        self.dtmac.register_handler(self.agent_id, "new_market_data", self.handle_new_market_data)
+        self.dtmac.register_handler(self.agent_id, "new_market_data", self.handle_new_market_data, replay=True)
         self.dtmac.register_handler(self.agent_id, "analysis_request", self.handle_analysis_request)
+        self.dtmac.register_handler(self.agent_id, "economic_refresh", self.handle_economic_refresh)
         
         # Initialize agent state
         self.current_analysis = {}
         self.last_update = None
+        self._http = None  # AsyncHTTPClient of the economic refresh, created on first use
         
         self.data_archive = 'data_archive'
         os.makedirs(self.data_archive, exist_ok=True)
@@ -75,6 +82,30 @@ class DataAnalystAgent(BaseAgent):
         ]
         self.INTERVALS = ['1min', '5min', '15min', '30min', '60min', 'daily', 'weekly', 'monthly']
 
+    # Economic indicators are published monthly or quarterly, a few refreshes a day are plenty
+    ECONOMIC_REFRESH_INTERVAL = 6 * 60 * 60
+    ECONOMIC_REFRESH_JITTER = 10 * 60
+
+    async def start(self):
+        """Schedule the recurring economic data refresh"""
+        # Keyed by agent group, so replicas keep a single refresh cycle between them
+        self.schedule_message(
+            self.agent_id,
+            content={},
+            message_type="economic_refresh",
+            delay=5.0,
+            interval=self.ECONOMIC_REFRESH_INTERVAL,
+            jitter=self.ECONOMIC_REFRESH_JITTER,
+            priority=MessagePriority.LOW,
+            key=f"{self.group_id}.economic_refresh"
+        )
+
+    async def stop(self):
+        """Close the HTTP connections of the economic refresh"""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
     async def get_status(self) -> Dict[str, Any]:
         return {
             "status": "active",
@@ -83,6 +114,26 @@ class DataAnalystAgent(BaseAgent):
             "subscribed_topics": self.get_subscribed_topics()
         }
     
+    async def handle_economic_refresh(self, message: DTMessage):
+        """Fetch the economic indicators and broadcast them to economic_data subscribers"""
+        if self._http is None:
+            # Created on the event loop that uses it; in a worker process that is the worker's loop
+            self._http = AsyncHTTPClient()
+        indicators = await get_economic_indicators_async(self._http)
+        if not indicators or "error" in indicators:
+            logger.warning(f"Economic refresh failed: {(indicators or {}).get('error')}")
+            return
+        
+        await self.broadcast_to_topic(
+            topic="economic_data",
+            content={
+                "indicators": indicators,
+                "timestamp": datetime.now().isoformat()
+            },
+            message_type="economic_update",
+            priority=MessagePriority.LOW
+        )
+    
     async def handle_new_market_data(self, message: DTMessage):
         """Handle new market data messages"""
         market_data = message.content
@@ -97,7 +148,7 @@ class DataAnalystAgent(BaseAgent):
         
         # Broadcast analysis results to interested agents
         await self.broadcast_to_topic(
-            topic="analysis_results",
+            topic=symbol_topic("analysis_results", symbol),
             content={
                 "symbol": symbol,
                 "analysis": analysis,
@@ -114,8 +165,8 @@ class DataAnalystAgent(BaseAgent):
         
         if symbol in self.current_analysis:
             # Send analysis directly to requester
-            await self.send_to_agent(
-                recipient=message.sender,
+            await self.reply(
+                message,
                 content={
                     "symbol": symbol,
                     "analysis": self.current_analysis[symbol],
@@ -127,11 +178,18 @@ class DataAnalystAgent(BaseAgent):
         else:
             # Request new data if not available
             await self.broadcast_to_topic(
-                topic="market_data",
+                topic=symbol_topic("market_data", symbol),
                 content={"symbol": symbol, "request_type": "historical"},
                 message_type="data_request",
                 priority=MessagePriority.HIGH
             )
+            # Let the requester know the analysis will follow on analysis_results
+            await self.reply(
+                message,
+                content={"symbol": symbol, "status": "pending"},
+                message_type="analysis_response",
+                priority=MessagePriority.NORMAL
+            )
     
     async def analyze_market_data(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze market data and generate insights"""
@@ -361,23 +419,24 @@ class DataAnalystAgent(BaseAgent):
         try:
             logger.info(f"Fetching stock overview for {ticker_symbol}")
             
-            # Get basic stock data
-            stock_data = fetch_stock_basics(ticker_symbol)
-            if 'error' in stock_data:
-                return stock_data
-                
-            # Get key financial statements (most recent quarter)
-            financials = get_company_financials(ticker_symbol)
-            # financials = get_company_financials(ticker_symbol, period='quarterly', limit=1)
-            
-            # Get important financial ratios
-            ratios = get_financial_ratios(ticker_symbol)
-            
-            # Get economic indicators
+            # Basic stock data, key financial statements, important financial ratios
+            # and news sentiment, fetched at once; a slow source only loses its section
+            fetched = fetch_sources(ticker_symbol, {
+                'stock_data': fetch_stock_basics,
+                'financials': get_company_financials,
+                'ratios': get_financial_ratios,
+                'news': get_news_sentiment
+            })
             # economic = get_economic_indicators(ticker_symbol)
             
-            # Get news sentiment
-            news = get_news_sentiment(ticker_symbol)
+            stock_data = fetched['stock_data']
+            if 'error' in stock_data:
+                return stock_data
+            financials = fetched['financials']
+            ratios = fetched['ratios']
+            news = fetched['news']
+            if 'error' in news and 'has_error' not in news:
+                news = news_failure(news)
 
             # Get Reddit sentiment
             # sentiment_analyzer = RedditSentimentAnalyzer()
@@ -489,6 +548,9 @@ class DataAnalystAgent(BaseAgent):
 
             # Financial Statements
             financial_highlights = stock_data.get("financial_highlights", [])
+            if not isinstance(financial_highlights, list):
+                # {'error': ...} when the statements could not be fetched
+                financial_highlights = []
             
             # Initialize with default values (expanded with critical metrics)
             financial_statements = {
@@ -1,54 +1,352 @@
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from datetime import datetime
+from types import MappingProxyType
 import asyncio
-from enum import Enum
+import contextvars
+from enum import IntEnum
+from functools import partial
+import itertools
 import json
+import logging
+import os
+import sys
+import time
 import uuid
 
-class MessagePriority(Enum):
+from .concurrency import PartitionedDispatcher, blocking_handler
+from .mailbox import Mailbox, OverflowPolicy
+from .message_history import MessageHistory
+from .metrics import DTMACMetrics
+from .scheduler import TimerScheduler
+from .sharding import HashRing, symbol_shard_key
+from .topics import TopicIndex
+
+logger = logging.getLogger(__name__)
+
+# Set inside handlers run by DTMAC.replay(); what they send was logged the first time round
+_in_replay = contextvars.ContextVar("dtmac_in_replay", default=False)
+
+class MessagePriority(IntEnum):
     LOW = 1
     NORMAL = 2
     HIGH = 3
     CRITICAL = 4
 
-@dataclass
+_ORIGIN = int.from_bytes(os.urandom(8), "big") >> 1  # Identifies this process in message IDs (63 bits)
+_SEQUENCE = itertools.count(1)
+_WALL_CLOCK_OFFSET_NS = time.time_ns() - time.monotonic_ns()  # Monotonic -> Unix time
+
 class DTMessage:
-    message_id: str
-    sender: str
-    recipients: List[str]
-    content: Dict[str, Any]
-    timestamp: datetime
-    priority: MessagePriority
-    message_type: str
-    metadata: Dict[str, Any] = None
+    """
+    A message on the DTMAC bus.
+
+    Kept compact for high message rates: priority is a plain int, message
+    types are interned, timestamps are monotonic nanoseconds and identity is
+    a 64-bit sequence number. The UUID-style message_id is only built when
+    asked for. Content is a read-only view shared by every recipient.
+    """
+    
+    __slots__ = ("seq", "origin", "sender", "recipients", "content", "timestamp_ns",
+                 "priority", "message_type", "metadata", "_message_id")
+    
+    def __init__(self,
+                 sender: str,
+                 recipients: List[str],
+                 content: Mapping[str, Any],
+                 message_type: str,
+                 priority: int = MessagePriority.NORMAL,
+                 metadata: Optional[Dict[str, Any]] = None,
+                 seq: Optional[int] = None,
+                 origin: int = _ORIGIN,
+                 timestamp_ns: Optional[int] = None):
+        self.seq = next(_SEQUENCE) if seq is None else seq
+        self.origin = origin  # Process that created the message; with seq, unique across processes
+        self.sender = sender
+        self.recipients = recipients
+        self.content = content if type(content) is MappingProxyType else MappingProxyType(content)
+        self.timestamp_ns = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        self.priority = int(priority)
+        self.message_type = sys.intern(message_type)
+        self.metadata = metadata
+        self._message_id = None
+    
+    @property
+    def message_id(self) -> str:
+        if self._message_id is None:
+            self._message_id = str(uuid.UUID(int=(self.origin << 64) | self.seq))
+        return self._message_id
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Wall-clock creation time"""
+        return datetime.fromtimestamp((self.timestamp_ns + _WALL_CLOCK_OFFSET_NS) / 1e9)
+    
+    @property
+    def wall_time_ns(self) -> int:
+        """Creation time in nanoseconds since the Unix epoch"""
+        return self.timestamp_ns + _WALL_CLOCK_OFFSET_NS
+    
+    def with_recipients(self, recipients: List[str]) -> "DTMessage":
+        """Same message (identity, content and timestamp) addressed to other recipients"""
+        return DTMessage(self.sender, recipients, self.content, self.message_type, self.priority,
+                         self.metadata, self.seq, self.origin, self.timestamp_ns)
+    
+    def __repr__(self) -> str:
+        return (f"DTMessage(seq={self.seq}, sender={self.sender!r}, recipients={self.recipients!r}, "
+                f"message_type={self.message_type!r}, priority={self.priority})")
+
+def message_time_ns(wall_time_ns: int) -> int:
+    """Local monotonic timestamp of a wall-clock time, e.g. one received from another process"""
+    return wall_time_ns - _WALL_CLOCK_OFFSET_NS
 
 class DTMAC:
-    def __init__(self):
-        self.message_queue: Dict[str, List[DTMessage]] = {}  # Agent ID -> Message Queue
+    def __init__(self,
+                 history_size: int = 10000,
+                 history_max_age: Optional[float] = 3600.0,
+                 message_log=None,
+                 snapshot_every: int = 10000):
+        """
+        Args:
+            message_log: Optional agents.message_log.MessageLog every routed message is appended to
+            snapshot_every: Logged messages after which agent state is snapshotted, bounding replay time
+        """
+        self.message_queue: Dict[str, Mailbox] = {}  # Agent ID -> Priority mailbox
+        self._consumers: Dict[str, asyncio.Task] = {}  # Agent ID -> Mailbox consumer task
         self.message_handlers: Dict[str, Dict[str, callable]] = {}  # Agent ID -> {Message Type -> Handler}
-        self.message_history: List[DTMessage] = []
+        self._replay_types: Dict[str, set] = {}  # Agent ID -> message types whose handlers are replayed
+        self.message_history = MessageHistory(history_size, history_max_age)  # Bounded, indexed by agent and type
+        self.metrics = DTMACMetrics()  # Per agent / message type latency, handler time, errors and rate
         self.agent_topics: Dict[str, List[str]] = {}  # Agent ID -> List of topics
-        self.message_routing_table: Dict[str, List[str]] = {}  # Topic -> List of agent IDs
+        self.message_routing_table: Dict[str, List[str]] = {}  # Topic pattern -> List of agent IDs
+        self.topic_index = TopicIndex()  # Same subscriptions, matched by topic hierarchy
+        self.remote_agents: Dict[str, Any] = {}  # Agent ID -> Transport hosting the agent
+        self.uplink = None  # Set inside worker processes; takes messages for agents hosted elsewhere
+        self._pending_requests: Dict[str, asyncio.Future] = {}  # Correlation ID -> response future
+        self.replica_groups: Dict[str, HashRing] = {}  # Group ID -> ring of replica agent IDs
+        self.shard_key = symbol_shard_key  # Message -> key replicas are sharded by, None for all replicas
+        self._dispatchers: Dict[str, PartitionedDispatcher] = {}  # Agent ID -> concurrent handler dispatcher
+        self._in_flight: Dict[str, Dict[int, DTMessage]] = {}  # Agent ID -> {id(message): message} being handled
+        self._handoffs: Dict[Tuple[str, int], asyncio.Future] = {}  # (Agent ID, id(message)) -> resolved once handled
+        self._handoff_gates: Dict[Tuple[str, str], List[asyncio.Future]] = {}  # (Agent ID, shard key) -> handoffs to wait for
+        self.message_log = message_log
+        self.snapshot_every = snapshot_every
+        self._state_handlers: Dict[str, tuple] = {}  # Agent ID -> (get_state, load_state)
+        self._replaying = False  # Set while replaying the log; live messages are held back until it is done
+        self._held_back: List[DTMessage] = []  # Live messages routed during replay
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self.scheduler = TimerScheduler()  # Delayed and recurring messages
         
     def register_agent(self, agent_id: str, topics: List[str]):
-        """Register an agent with specific topics of interest"""
-        self.message_queue[agent_id] = []
-        self.message_handlers[agent_id] = {}
-        self.agent_topics[agent_id] = topics
+        """Register an agent with specific topics of interest.
+
+        Registering an already known agent adds the new topics and keeps its
+        mailbox and handlers intact.
+        """
+        if agent_id not in self.message_queue:
+            self.message_queue[agent_id] = Mailbox()
+        self.message_handlers.setdefault(agent_id, {})
+        self.subscribe(agent_id, topics)
+    
+    def register_remote_agent(self, agent_id: str, topics: List[str], transport):
+        """Register an agent hosted by a transport, e.g. in a worker process"""
+        self.remote_agents[agent_id] = transport
+        self.subscribe(agent_id, topics)
+    
+    def register_replica(self, group_id: str, replica_id: str, topics: List[str]):
+        """Register one replica of a sharded agent.
+
+        Messages addressed to group_id, or broadcast to its topics, go to a single
+        replica chosen by consistent hashing on the message's shard key (the
+        symbol by default), so each symbol is always handled by the same replica
+        and in order. Messages without a shard key go to every replica. Queued
+        messages whose symbol now belongs to the new replica are handed over.
+        """
+        self.register_agent(replica_id, [])
+        self.subscribe(group_id, topics)
+        ring = self.replica_groups.setdefault(group_id, HashRing())
+        ring.add(replica_id)
+        self._rebalance(group_id)
+    
+    def unregister_replica(self, group_id: str, replica_id: str):
+        """Remove a replica, handing its queued messages to the remaining replicas"""
+        ring = self.replica_groups.get(group_id)
+        if ring is None or replica_id not in ring:
+            return
+        ring.remove(replica_id)
+        mailbox = self.message_queue.pop(replica_id)
+        self.message_handlers.pop(replica_id, None)
+        self._rebalance(group_id, retired={replica_id: mailbox})
+        dispatcher = self._dispatchers.pop(replica_id, None)
+        
+        # Messages already in hand are still handled; a sequential consumer exits after its message
+        task = self._consumers.pop(replica_id, None)
+        if task is not None and (dispatcher is not None or not self._in_flight.get(replica_id)):
+            task.cancel()
+        if not ring:
+            del self.replica_groups[group_id]
+    
+    def get_replicas(self, group_id: str) -> List[str]:
+        """Get the replica agent IDs of a sharded agent"""
+        ring = self.replica_groups.get(group_id)
+        return ring.nodes if ring is not None else []
+    
+    def _rebalance(self, group_id: str, retired: Optional[Dict[str, Mailbox]] = None):
+        """Move queued messages to the replica that now owns their shard key.
+
+        Runs without yielding, so no new message can overtake the ones being
+        moved. A replica taking over a symbol whose message is still being
+        handled elsewhere waits for that handler to finish first.
+        """
+        ring = self.replica_groups[group_id]
+        if not ring:
+            return
+        retired = retired or {}
+        mailboxes = {replica: self.message_queue[replica] for replica in ring.nodes}
+        mailboxes.update(retired)
+        
+        def owner(message) -> Optional[str]:
+            key = self.shard_key(message)
+            return ring.get(key) if key is not None else None
+        
+        for replica, mailbox in mailboxes.items():
+            if replica in retired:
+                should_move = lambda message: True
+            else:
+                should_move = lambda message, replica=replica: owner(message) not in (None, replica)
+            # Messages a dispatcher already took from the mailbox are older than the queued ones
+            dispatcher = self._dispatchers.get(replica)
+            moved = dispatcher.extract(should_move) if dispatcher is not None else []
+            moved.extend(mailbox.extract(should_move))
+            for message in moved:
+                new_owner = owner(message)
+                if new_owner is None:
+                    continue  # Unkeyed messages went to every replica, the others have their copy
+                self.message_queue[new_owner].requeue(message)
+                self._ensure_consumer(new_owner)
+            
+            for token, message in self._in_flight.get(replica, {}).items():
+                new_owner = owner(message)
+                if new_owner is None or new_owner == replica:
+                    continue
+                handoff = self._handoffs.get((replica, token))
+                if handoff is None:
+                    handoff = self._handoffs[(replica, token)] = asyncio.get_running_loop().create_future()
+                self._handoff_gates.setdefault((new_owner, self.shard_key(message)), []).append(handoff)
+    
+    def subscribe(self, agent_id: str, topics: List[str]):
+        """Add topics to an agent's (or replica group's) subscriptions.
+
+        Topics are hierarchical: "market_data" also receives "market_data.AAPL",
+        "market_data.AAPL" receives only AAPL traffic and "market_data.*" any
+        single symbol below market_data.
+        """
+        agent_topics = self.agent_topics.setdefault(agent_id, [])
         
         # Update routing table
         for topic in topics:
+            if topic not in agent_topics:
+                agent_topics.append(topic)
             if topic not in self.message_routing_table:
                 self.message_routing_table[topic] = []
             if agent_id not in self.message_routing_table[topic]:
                 self.message_routing_table[topic].append(agent_id)
+                self.topic_index.subscribe(topic, agent_id)
+        if self.uplink is not None:
+            # Inside a worker the parent routes broadcasts, so it has to know too
+            self.uplink.subscribe(agent_id, topics)
+    
+    def unsubscribe(self, agent_id: str, topics: List[str]):
+        """Remove topics from an agent's subscriptions"""
+        agent_topics = self.agent_topics.get(agent_id, [])
+        for topic in topics:
+            if topic in agent_topics:
+                agent_topics.remove(topic)
+            subscribers = self.message_routing_table.get(topic)
+            if subscribers and agent_id in subscribers:
+                subscribers.remove(agent_id)
+                if not subscribers:
+                    del self.message_routing_table[topic]
+                self.topic_index.unsubscribe(topic, agent_id)
+        if self.uplink is not None:
+            self.uplink.unsubscribe(agent_id, topics)
+    
+    def configure_mailbox(self,
+                          agent_id: str,
+                          capacity: Optional[int] = None,
+                          overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                          coalesce_key: Optional[callable] = None):
+        """Bound an agent's mailbox and choose what happens when it is full.
+
+        coalesce_key maps a message to a key (default: message type and symbol);
+        with OverflowPolicy.COALESCE only the latest queued message per key is kept.
+        """
+        if agent_id not in self.message_queue:
+            self.message_queue[agent_id] = Mailbox()
+        self.message_queue[agent_id].configure(capacity, overflow_policy, coalesce_key)
+    
+    def configure_concurrency(self,
+                              agent_id: str,
+                              concurrency: int,
+                              partition_key: Optional[callable] = None,
+                              max_pending: Optional[int] = None):
+        """Let an agent handle up to concurrency messages at once.
+
+        Messages are partitioned by partition_key (default: the symbol); each
+        partition is still handled one message at a time, in order. Call before
+        the agent starts receiving messages. concurrency=1 restores sequential
+        handling.
+        """
+        self._dispatchers.pop(agent_id, None)
+        if concurrency > 1:
+            handlers = self.message_handlers.setdefault(agent_id, {})
+            self._dispatchers[agent_id] = PartitionedDispatcher(
+                partial(self._handle, agent_id, handlers),
+                concurrency,
+                partition_key or symbol_shard_key,
+                max_pending
+            )
     
-    def register_handler(self, agent_id: str, message_type: str, handler: callable):
-        """Register a message handler for specific message type"""
+    def get_mailbox_stats(self, agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get queue depth and drop/coalesce counters, for one agent or all of them"""
+        if agent_id:
+            mailbox = self.message_queue.get(agent_id)
+            return mailbox.stats() if mailbox is not None else {}
+        return {agent: mailbox.stats() for agent, mailbox in self.message_queue.items()}
+    
+    def register_state(self, agent_id: str, get_state: callable, load_state: callable):
+        """Include an agent's state in message log snapshots"""
+        self._state_handlers[agent_id] = (get_state, load_state)
+    
+    def get_metrics(self, agent_id: Optional[str] = None) -> Dict[str, Any]:
+        """Get runtime metrics and queue stats, for one locally hosted agent or all of them"""
+        if agent_id:
+            return self.metrics.snapshot(agent_id, self.get_mailbox_stats(agent_id))
+        return {agent: self.metrics.snapshot(agent, mailbox.stats()) for agent, mailbox in self.message_queue.items()}
+    
+    def register_handler(self,
+                         agent_id: str,
+                         message_type: str,
+                         handler: callable,
+                         executor: Optional[str] = None,
+                         replay: bool = False):
+        """Register a message handler for specific message type.
+
+        With executor="thread" or "process" the handler is a blocking (non-async)
+        function run off the event loop; process handlers must be picklable
+        module-level functions. Only handlers registered with replay=True are
+        run by replay(): they must rebuild state from the message alone, without
+        network I/O or heavy recomputation.
+        """
         if agent_id not in self.message_handlers:
             self.message_handlers[agent_id] = {}
+        if executor is not None:
+            handler = blocking_handler(handler, executor)
         self.message_handlers[agent_id][message_type] = handler
+        replay_types = self._replay_types.setdefault(agent_id, set())
+        if replay:
+            replay_types.add(message_type)
+        else:
+            replay_types.discard(message_type)
     
     async def send_message(self, 
                           sender: str, 
@@ -58,25 +356,8 @@ class DTMAC:
                           priority: MessagePriority = MessagePriority.NORMAL,
                           metadata: Optional[Dict[str, Any]] = None):
         """Send a message to specific recipients"""
-        message = DTMessage(
-            message_id=str(uuid.uuid4()),
-            sender=sender,
-            recipients=recipients,
-            content=content,
-            timestamp=datetime.now(),
-            priority=priority,
-            message_type=message_type,
-            metadata=metadata
-        )
-        
-        self.message_history.append(message)
-        
-        # Route message to recipients
-        for recipient in recipients:
-            if recipient in self.message_queue:
-                self.message_queue[recipient].append(message)
-                # Trigger message processing
-                asyncio.create_task(self._process_message(recipient))
+        message = DTMessage(sender, recipients, content, message_type, priority, metadata)
+        await self.route_message(message)
     
     async def broadcast_to_topic(self, 
                                sender: str, 
@@ -85,29 +366,320 @@ class DTMAC:
                                message_type: str,
                                priority: MessagePriority = MessagePriority.NORMAL):
         """Broadcast message to all agents subscribed to a topic"""
-        if topic in self.message_routing_table:
-            recipients = self.message_routing_table[topic]
-            await self.send_message(sender, recipients, content, message_type, priority)
-    
-    async def _process_message(self, agent_id: str):
-        """Process messages in the agent's queue"""
-        while self.message_queue[agent_id]:
-            message = self.message_queue[agent_id].pop(0)
-            if message.message_type in self.message_handlers[agent_id]:
-                handler = self.message_handlers[agent_id][message.message_type]
-                await handler(message)
-    
-    def get_message_history(self, agent_id: Optional[str] = None) -> List[DTMessage]:
-        """Get message history, optionally filtered by agent"""
-        if agent_id:
-            return [msg for msg in self.message_history 
-                   if msg.sender == agent_id or agent_id in msg.recipients]
-        return self.message_history
+        if self.uplink is not None:
+            # Inside a worker only the parent knows every subscriber
+            message = DTMessage(sender, [], content, message_type, priority)
+            await self.uplink.forward(message, topic)
+        else:
+            recipients = self.topic_index.match(topic)
+            if recipients:
+                await self.send_message(sender, recipients, content, message_type, priority)
+    
+    def schedule_message(self,
+                         sender: str,
+                         recipients: List[str],
+                         content: Dict[str, Any],
+                         message_type: str,
+                         delay: float = 0.0,
+                         priority: MessagePriority = MessagePriority.NORMAL,
+                         metadata: Optional[Dict[str, Any]] = None,
+                         interval: Optional[float] = None,
+                         jitter: float = 0.0,
+                         key: Optional[str] = None) -> int:
+        """Send a message after delay seconds, then every interval seconds if given.
+
+        Each firing sends a new message (own ID and timestamp). jitter spreads
+        firings by up to that many seconds either way, so timers created
+        together don't fire together. Scheduling with the key of a pending
+        timer replaces it. Timers are not persisted; agents re-create them
+        when they start. Returns the timer ID for cancel_scheduled().
+        """
+        return self.scheduler.schedule(
+            partial(self.send_message, sender, recipients, content, message_type, priority, metadata),
+            delay, interval, jitter, key
+        )
+    
+    def schedule_broadcast(self,
+                           sender: str,
+                           topic: str,
+                           content: Dict[str, Any],
+                           message_type: str,
+                           delay: float = 0.0,
+                           priority: MessagePriority = MessagePriority.NORMAL,
+                           interval: Optional[float] = None,
+                           jitter: float = 0.0,
+                           key: Optional[str] = None) -> int:
+        """Broadcast to a topic after delay seconds, then every interval seconds if given"""
+        return self.scheduler.schedule(
+            partial(self.broadcast_to_topic, sender, topic, content, message_type, priority),
+            delay, interval, jitter, key
+        )
+    
+    def cancel_scheduled(self, timer_id: Optional[int] = None, key: Optional[str] = None) -> bool:
+        """Cancel a scheduled message by timer ID or key; False if there was none pending"""
+        if timer_id is not None:
+            return self.scheduler.cancel(timer_id)
+        return key is not None and self.scheduler.cancel_key(key)
+    
+    async def request(self,
+                      sender: str,
+                      recipient: str,
+                      content: Dict[str, Any],
+                      message_type: str,
+                      priority: MessagePriority = MessagePriority.NORMAL,
+                      timeout: Optional[float] = 30.0) -> DTMessage:
+        """Send a request and wait for the recipient's reply.
+
+        Raises asyncio.TimeoutError when no reply arrives within timeout seconds
+        (None waits forever). Cancelling the awaiting task abandons the request.
+        """
+        if _in_replay.get():
+            raise RuntimeError("Requests cannot be made while replaying the message log")
+        correlation_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending_requests[correlation_id] = future
+        try:
+            await self.send_message(
+                sender=sender,
+                recipients=[recipient],
+                content=content,
+                message_type=message_type,
+                priority=priority,
+                metadata={"correlation_id": correlation_id, "reply_to": sender}
+            )
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending_requests.pop(correlation_id, None)
+    
+    async def reply(self,
+                    request: DTMessage,
+                    sender: str,
+                    content: Dict[str, Any],
+                    message_type: str,
+                    priority: MessagePriority = MessagePriority.NORMAL):
+        """Answer a message; resolves the requester's future if it came from request()"""
+        metadata = request.metadata or {}
+        correlation_id = metadata.get("correlation_id")
+        await self.send_message(
+            sender=sender,
+            recipients=[metadata.get("reply_to", request.sender)],
+            content=content,
+            message_type=message_type,
+            priority=priority,
+            metadata={"in_reply_to": correlation_id} if correlation_id else None
+        )
+    
+    def resolve_response(self, message: DTMessage) -> bool:
+        """Complete the pending request a reply belongs to; False if it is not one of ours"""
+        metadata = message.metadata
+        if not metadata or "in_reply_to" not in metadata:
+            return False
+        future = self._pending_requests.get(metadata["in_reply_to"])
+        if future is None:
+            return False
+        if not future.done():
+            future.set_result(message)
+        return True
+    
+    async def route_message(self, message: DTMessage):
+        """Record a message and deliver it to each recipient, wherever it is hosted"""
+        if _in_replay.get():
+            return  # Sent by a replayed handler; logged, and delivered, the first time round
+        if self._replaying:
+            self._held_back.append(message)
+            return
+        await self._route(message)
+    
+    async def _route(self, message: DTMessage):
+        self.message_history.append(message)
+        if self.message_log is not None:
+            self.message_log.append(message)
+            if (self.message_log.records_since_snapshot >= self.snapshot_every
+                    and (self._snapshot_task is None or self._snapshot_task.done())):
+                self._snapshot_task = asyncio.create_task(self.snapshot())
+        if self.resolve_response(message):
+            return
+        
+        upstream = []
+        for recipient in message.recipients:
+            if recipient in self.message_queue:
+                await self.deliver_local(recipient, message)
+            elif recipient in self.replica_groups:
+                await self._deliver_to_group(recipient, message)
+            elif recipient in self.remote_agents:
+                await self.remote_agents[recipient].deliver(recipient, message)
+            elif self.uplink is not None:
+                upstream.append(recipient)
+        
+        if upstream:
+            await self.uplink.forward(message.with_recipients(upstream))
+    
+    async def deliver_local(self, agent_id: str, message: DTMessage):
+        """Queue a message in a locally hosted agent's mailbox"""
+        self._ensure_consumer(agent_id)
+        await self.message_queue[agent_id].put(message)
+    
+    async def _deliver_to_group(self, group_id: str, message: DTMessage):
+        """Queue a message with the replica owning its shard key, or with all replicas"""
+        ring = self.replica_groups[group_id]
+        key = self.shard_key(message)
+        if key is None:
+            for replica in ring.nodes:
+                await self.deliver_local(replica, message)
+        else:
+            await self.deliver_local(ring.get(key), message)
+    
+    def _ensure_consumer(self, agent_id: str):
+        """Start the agent's mailbox consumer if it is not already running"""
+        task = self._consumers.get(agent_id)
+        if task is None or task.done():
+            self._consumers[agent_id] = asyncio.create_task(self._consume(agent_id))
+    
+    async def _consume(self, agent_id: str):
+        """Drain the agent's mailbox in priority order, one message at a time unless
+        the agent is configured for partitioned concurrency"""
+        mailbox = self.message_queue[agent_id]
+        dispatcher = self._dispatchers.get(agent_id)
+        if dispatcher is not None:
+            await dispatcher.run(mailbox, lambda: self.message_queue.get(agent_id) is mailbox)
+            return
+        handlers = self.message_handlers[agent_id]
+        while self.message_queue.get(agent_id) is mailbox:
+            message, waited = await mailbox.get_with_wait()
+            await self._handle(agent_id, handlers, message, waited)
+    
+    async def _handle(self, agent_id: str, handlers: Dict[str, callable], message: DTMessage, waited: float):
+        """Run the agent's handler for a message, recording metrics and errors"""
+        if self._handoff_gates:
+            gates = self._handoff_gates.pop((agent_id, self.shard_key(message)), None)
+            if gates:
+                # Symbol handed over by a rebalance: let the previous owner finish first
+                await asyncio.gather(*gates)
+        handler = handlers.get(message.message_type)
+        if handler is None:
+            self.metrics.record_unhandled(agent_id)
+            return
+        in_flight = self._in_flight.setdefault(agent_id, {})
+        token = id(message)
+        in_flight[token] = message
+        started = time.perf_counter()
+        failed = False
+        try:
+            await handler(message)
+        except Exception as e:
+            failed = True
+            logger.error(f"Error handling {message.message_type} for {agent_id}: {e}", exc_info=True)
+            if message.metadata and "correlation_id" in message.metadata:
+                # Don't leave the requester waiting for its timeout
+                await self.reply(message, agent_id, {"error": str(e)}, "error_response", MessagePriority.HIGH)
+        finally:
+            self.metrics.record_handled(agent_id, message.message_type, waited,
+                                        time.perf_counter() - started, failed)
+            del in_flight[token]
+            if self._handoffs:
+                handoff = self._handoffs.pop((agent_id, token), None)
+                if handoff is not None and not handoff.done():
+                    handoff.set_result(None)
+    
+    async def stop(self):
+        """Stop scheduled messages and all mailbox consumers, and flush the message log"""
+        self.scheduler.stop()
+        tasks = list(self._consumers.values())
+        self._consumers.clear()
+        for task in tasks:
+            task.cancel()
+        for dispatcher in self._dispatchers.values():
+            dispatcher.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.message_log is not None:
+            if self._snapshot_task is not None:
+                await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            await self.message_log.close()
+    
+    async def snapshot(self) -> int:
+        """Snapshot agent state and queued messages so replay can start from here"""
+        state = {}
+        for agent_id, (get_state, _) in self._state_handlers.items():
+            state[agent_id] = get_state()
+        
+        # Messages not handled yet, including the ones in flight (handled again on replay)
+        pending = []
+        for agent_id, mailbox in self.message_queue.items():
+            pending.extend((agent_id, message) for message in self._in_flight.get(agent_id, {}).values())
+            dispatcher = self._dispatchers.get(agent_id)
+            if dispatcher is not None:
+                pending.extend((agent_id, message) for message in dispatcher.messages())
+            pending.extend((agent_id, message) for message in mailbox.messages())
+        
+        lsn = await self.message_log.write_snapshot(state, pending)
+        logger.info(f"Message log snapshot at {lsn} ({len(state)} agent states, {len(pending)} pending messages)")
+        return lsn
+    
+    async def replay(self) -> int:
+        """Rebuild agent state from the message log: latest snapshot, then every message logged after it.
+
+        Call once at startup, after the agents are registered. Only handlers
+        registered with replay=True run, in log order; anything they send is
+        dropped, since those messages were logged as well. Live messages routed
+        meanwhile are held back and delivered, in order, once replay is done.
+        Returns the number of messages replayed.
+        """
+        snapshot = self.message_log.load_snapshot()
+        after_lsn = 0
+        pending = []
+        if snapshot is not None:
+            after_lsn = snapshot["lsn"]
+            pending = snapshot["pending"]
+            for agent_id, state in snapshot["state"].items():
+                if agent_id in self._state_handlers:
+                    self._state_handlers[agent_id][1](state)
+        
+        count = 0
+        self._replaying = True
+        try:
+            for agent_id, message in pending:
+                await self._replay_to(agent_id, message)
+                count += 1
+            for _, message in self.message_log.read(after_lsn):
+                for recipient in message.recipients:
+                    if recipient in self.message_queue:
+                        await self._replay_to(recipient, message)
+                    elif recipient in self.replica_groups:
+                        ring = self.replica_groups[recipient]
+                        key = self.shard_key(message)
+                        for replica in (ring.nodes if key is None else [ring.get(key)]):
+                            await self._replay_to(replica, message)
+                count += 1
+        finally:
+            # Still flagged while draining, so messages arriving now queue up behind the held-back ones
+            while self._held_back:
+                await self._route(self._held_back.pop(0))
+            self._replaying = False
+        logger.info(f"Replayed {count} messages from the message log")
+        return count
+    
+    async def _replay_to(self, agent_id: str, message: DTMessage):
+        if message.message_type not in self._replay_types.get(agent_id, ()):
+            return
+        handler = self.message_handlers[agent_id][message.message_type]
+        token = _in_replay.set(True)
+        try:
+            await handler(message)
+        except Exception as e:
+            logger.error(f"Error replaying {message.message_type} to {agent_id}: {e}", exc_info=True)
+        finally:
+            _in_replay.reset(token)
+    
+    def get_message_history(self,
+                            agent_id: Optional[str] = None,
+                            message_type: Optional[str] = None) -> List[DTMessage]:
+        """Get retained message history, optionally filtered by agent and/or message type"""
+        return self.message_history.get(agent_id, message_type)
     
     def get_agent_topics(self, agent_id: str) -> List[str]:
         """Get topics an agent is subscribed to"""
         return self.agent_topics.get(agent_id, [])
     
     def get_topic_subscribers(self, topic: str) -> List[str]:
-        """Get all agents subscribed to a topic"""
-        return self.message_routing_table.get(topic, []) 
\ No newline at end of file
+        """Get all agents subscribed to a topic, its parent topics or a matching wildcard"""
+        return self.topic_index.match(topic) 
\ No newline at end of file
@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class OverflowPolicy(Enum):
+    BLOCK = "block"              # Senders wait until the mailbox has room
+    DROP_OLDEST = "drop_oldest"  # Evict the oldest message of the lowest priority
+    COALESCE = "coalesce"        # Replace queued messages with the same key (requests excepted), then drop oldest
+
+
+def is_request(message) -> bool:
+    """Whether a message awaits a reply; those are never coalesced, every requester needs its answer"""
+    metadata = message.metadata
+    return bool(metadata) and "correlation_id" in metadata
+
+
+def symbol_coalesce_key(message) -> Optional[Hashable]:
+    """Coalesce messages of the same type about the same symbol"""
+    content = message.content
+    symbol = content.get("symbol") if hasattr(content, "get") else None
+    if symbol is None:
+        return None
+    return (message.message_type, symbol)
+
+
+class Mailbox:
+    """
+    Per-agent queue of pending DTMAC messages.
+
+    Messages are kept in one FIFO bucket per priority level, so the highest
+    priority is always served first while arrival order is preserved within
+    a level. With a handful of priority levels both put and get are O(1).
+
+    An optional capacity bounds how far a slow handler can fall behind; what
+    happens when it is reached depends on the overflow policy. With BLOCK an
+    agent must not send to itself from a handler while its mailbox is full.
+    """
+
+    def __init__(self,
+                 capacity: Optional[int] = None,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                 coalesce_key: Callable[[Any], Optional[Hashable]] = symbol_coalesce_key):
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        self.coalesce_key = coalesce_key
+
+        # Entries are [message, coalesce key, enqueue time]; a coalesced-away entry has its message set to None
+        self._buckets: Dict[int, Deque[list]] = {}  # Priority level -> FIFO of entries
+        self._levels: List[int] = []  # Priority levels with a bucket, ascending
+        self._coalescable: Dict[Hashable, list] = {}  # Coalesce key -> queued entry
+        self._size = 0
+        self._getters: Deque[asyncio.Future] = deque()
+        self._putters: Deque[asyncio.Future] = deque()
+
+        # Counters
+        self.max_depth = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def full(self) -> bool:
+        return self.capacity is not None and self._size >= self.capacity
+
+    def configure(self,
+                  capacity: Optional[int] = None,
+                  overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+                  coalesce_key: Optional[Callable[[Any], Optional[Hashable]]] = None):
+        """Change the capacity and overflow policy, keeping queued messages"""
+        self.capacity = capacity
+        self.overflow_policy = overflow_policy
+        if coalesce_key is not None:
+            self.coalesce_key = coalesce_key
+        if overflow_policy is not OverflowPolicy.COALESCE:
+            self._coalescable.clear()
+        self._wakeup(self._putters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self._size,
+            "max_depth": self.max_depth,
+            "capacity": self.capacity,
+            "overflow_policy": self.overflow_policy.value,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced
+        }
+
+    async def put(self, message):
+        """Queue a message, waiting for room if the mailbox is full and blocking"""
+        while self.full() and self.overflow_policy is OverflowPolicy.BLOCK:
+            putter = asyncio.get_running_loop().create_future()
+            self._putters.append(putter)
+            try:
+                await putter
+            except BaseException:
+                self._discard_waiter(self._putters, putter)
+                if not self.full():
+                    self._wakeup(self._putters)
+                raise
+        self.put_nowait(message)
+
+    def put_nowait(self, message):
+        """Queue a message behind any others of the same priority"""
+        level = message.priority
+        key = None
+        if self.overflow_policy is OverflowPolicy.COALESCE and not is_request(message):
+            key = self.coalesce_key(message)
+            if key is not None and self._coalesce(key, message, level):
+                return
+
+        if self.full():
+            if self.overflow_policy is OverflowPolicy.BLOCK:
+                raise asyncio.QueueFull()
+            lowest = self._lowest_live_level()
+            if lowest is None or level < lowest:
+                # The new message is the least important one, so it is the one dropped
+                self.dropped += 1
+                return
+            self._drop_oldest()
+
+        entry = [message, key, time.perf_counter()]
+        bucket = self._buckets.get(level)
+        if bucket is None:
+            bucket = self._buckets[level] = deque()
+            bisect.insort(self._levels, level)
+        bucket.append(entry)
+        if key is not None:
+            self._coalescable[key] = entry
+        self._size += 1
+        self.max_depth = max(self.max_depth, self._size)
+        self._wakeup(self._getters)
+
+    def get_nowait(self):
+        """Pop the oldest message of the highest priority level"""
+        return self._get_entry()[0]
+
+    async def get(self):
+        """Wait until a message is available and pop it"""
+        await self._wait_for_message()
+        return self.get_nowait()
+
+    async def get_with_wait(self) -> Tuple[Any, float]:
+        """Like get(), also returning how many seconds the message spent queued"""
+        await self._wait_for_message()
+        entry = self._get_entry()
+        return entry[0], time.perf_counter() - entry[2]
+
+    async def _wait_for_message(self):
+        while not self._size:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                self._discard_waiter(self._getters, getter)
+                raise
+
+    def _get_entry(self) -> list:
+        if not self._size:
+            raise asyncio.QueueEmpty()
+        entry = self._pop_live(self._levels[-1], last_level=True)
+        self._wakeup(self._putters)
+        return entry
+
+    def messages(self) -> List[Any]:
+        """Queued messages in delivery order, without removing them"""
+        return [entry[0] for level in reversed(self._levels) for entry in self._buckets[level]
+                if entry[0] is not None]
+
+    def extract(self, predicate: Callable[[Any], bool]) -> List[Any]:
+        """Remove and return the queued messages matching predicate, in delivery order"""
+        extracted = []
+        for level in reversed(self._levels[:]):
+            kept = deque()
+            for entry in self._buckets[level]:
+                message = entry[0]
+                if message is None:
+                    continue
+                if predicate(message):
+                    extracted.append(message)
+                    if entry[1] is not None and self._coalescable.get(entry[1]) is entry:
+                        del self._coalescable[entry[1]]
+                else:
+                    kept.append(entry)
+            if kept:
+                self._buckets[level] = kept
+            else:
+                del self._buckets[level]
+                self._levels.remove(level)
+        self._size -= len(extracted)
+        if extracted:
+            self._wakeup(self._putters)
+        return extracted
+
+    def requeue(self, message):
+        """Queue a message handed over from another mailbox, even past capacity"""
+        level = message.priority
+        bucket = self._buckets.get(level)
+        if bucket is None:
+            bucket = self._buckets[level] = deque()
+            bisect.insort(self._levels, level)
+        bucket.append([message, None, time.perf_counter()])
+        self._size += 1
+        self.max_depth = max(self.max_depth, self._size)
+        self._wakeup(self._getters)
+
+    def _coalesce(self, key: Hashable, message, level: int) -> bool:
+        """Fold a message into a queued one with the same key; False if it must be queued"""
+        entry = self._coalescable.get(key)
+        if entry is None:
+            return False
+        self.coalesced += 1
+        if entry[0].priority == level:
+            # Keep the queue position, deliver only the latest content
+            entry[0] = message
+            return True
+        # Priority changed, so the stale entry is dropped and the new one queued at its level
+        entry[0] = entry[1] = None
+        del self._coalescable[key]
+        self._size -= 1
+        return False
+
+    def _lowest_live_level(self) -> Optional[int]:
+        """Lowest priority level with a live message, discarding coalesced-away entries in front of it"""
+        while self._levels:
+            level = self._levels[0]
+            bucket = self._buckets[level]
+            while bucket and bucket[0][0] is None:
+                bucket.popleft()
+            if bucket:
+                return level
+            del self._buckets[level]
+            self._levels.pop(0)
+        return None
+
+    def _drop_oldest(self):
+        self._pop_live(self._levels[0], last_level=False)
+        self.dropped += 1
+
+    def _pop_live(self, level: int, last_level: bool) -> list:
+        """Pop the first live entry, starting at the given end of the priority levels"""
+        while True:
+            bucket = self._buckets[level]
+            entry = bucket.popleft()
+            if not bucket:
+                del self._buckets[level]
+                self._levels.remove(level)
+            if entry[0] is not None:
+                break
+            level = self._levels[-1] if last_level else self._levels[0]
+        if entry[1] is not None and self._coalescable.get(entry[1]) is entry:
+            del self._coalescable[entry[1]]
+        self._size -= 1
+        return entry
+
+    @staticmethod
+    def _wakeup(waiters: Deque[asyncio.Future]):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    @staticmethod
+    def _discard_waiter(waiters: Deque[asyncio.Future], waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
@@ -0,0 +1,82 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+
+class MessageHistory:
+    """
+    Retention-bounded record of DTMAC messages.
+
+    Messages live in a ring buffer capped by count and by age, with
+    per-agent and per-message-type indexes kept in the same arrival order,
+    so lookups cost O(result size) and eviction only ever pops from the
+    left of each index.
+    """
+
+    def __init__(self, max_messages: int = 10000, max_age: Optional[float] = 3600.0):
+        self.max_messages = max_messages
+        self.max_age = max_age  # Seconds, None keeps messages until the count cap evicts them
+        self._messages: Deque[Any] = deque()
+        self._arrivals: Deque[float] = deque()  # Monotonic arrival time of each message
+        self._by_agent: Dict[str, Deque[Any]] = {}  # Agent ID -> messages sent or received
+        self._by_type: Dict[str, Deque[Any]] = {}  # Message type -> messages
+
+    def __len__(self) -> int:
+        self._evict()
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Any]:
+        self._evict()
+        return iter(list(self._messages))
+
+    def append(self, message):
+        """Record a message and evict whatever falls outside the retention window"""
+        self._messages.append(message)
+        self._arrivals.append(time.monotonic())
+        for agent_id in self._agents_of(message):
+            self._by_agent.setdefault(agent_id, deque()).append(message)
+        self._by_type.setdefault(message.message_type, deque()).append(message)
+        self._evict()
+
+    def get(self, agent_id: Optional[str] = None, message_type: Optional[str] = None) -> List[Any]:
+        """Get retained messages, optionally filtered by agent and/or message type"""
+        self._evict()
+        if agent_id and message_type:
+            by_agent = self._by_agent.get(agent_id, ())
+            by_type = self._by_type.get(message_type, ())
+            if len(by_agent) <= len(by_type):
+                return [msg for msg in by_agent if msg.message_type == message_type]
+            return [msg for msg in by_type if agent_id in self._agents_of(msg)]
+        if agent_id:
+            return list(self._by_agent.get(agent_id, ()))
+        if message_type:
+            return list(self._by_type.get(message_type, ()))
+        return list(self._messages)
+
+    def clear(self):
+        self._messages.clear()
+        self._arrivals.clear()
+        self._by_agent.clear()
+        self._by_type.clear()
+
+    def _evict(self):
+        cutoff = time.monotonic() - self.max_age if self.max_age is not None else None
+        while self._messages and (len(self._messages) > self.max_messages
+                                  or (cutoff is not None and self._arrivals[0] < cutoff)):
+            message = self._messages.popleft()
+            self._arrivals.popleft()
+            for agent_id in self._agents_of(message):
+                self._pop_index(self._by_agent, agent_id)
+            self._pop_index(self._by_type, message.message_type)
+
+    @staticmethod
+    def _pop_index(index: Dict[str, Deque[Any]], key: str):
+        entries = index[key]
+        entries.popleft()
+        if not entries:
+            del index[key]
+
+    @staticmethod
+    def _agents_of(message) -> Dict[str, None]:
+        """Sender and recipients of a message, without duplicates"""
+        return dict.fromkeys([message.sender, *message.recipients])
@@ -0,0 +1,251 @@
+"""
+Durable, append-only log of DTMAC messages.
+
+Records are codec-encoded messages framed as [length][crc32][payload] and
+appended to segment files named after the log sequence number (LSN) of their
+first record. Appends are buffered and written by one background task that
+fsyncs once per batch (group commit), off the event loop. A snapshot stores
+agent state plus the messages still queued at that point, so replay only has
+to read the records logged after it and older segments can be deleted.
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .codec import pack, unpack, message_to_fields, message_from_fields, encode_message, decode_message
+from .dtmac import DTMessage
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<II")  # Payload length, CRC32 of the payload
+_SEGMENT_SUFFIX = ".log"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+def _frame(payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(data: bytes) -> Iterator[Tuple[bytes, int]]:
+    """Payloads of the intact records, with the offset just past each one"""
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, pos)
+        end = pos + _HEADER.size + length
+        payload = data[pos + _HEADER.size:end]
+        if end > len(data) or zlib.crc32(payload) != crc:
+            return
+        yield payload, end
+        pos = end
+
+
+class MessageLog:
+    """Segment-rotated, group-committed message log with snapshots"""
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int = 16 * 1024 * 1024,
+                 commit_interval: float = 0.005):
+        """
+        Args:
+            directory: Where segments and snapshots are kept
+            segment_size: Bytes after which a new segment is started
+            commit_interval: Seconds appends are gathered for before one write + fsync
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.commit_interval = commit_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()  # Guards the segment list and files against the writer thread
+        self._segments: List[int] = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)]) for name in os.listdir(directory) if name.endswith(_SEGMENT_SUFFIX)
+        )  # First LSN of each segment
+        self.snapshot_lsn = self._latest_snapshot_lsn() or 0
+        self.next_lsn = self._recover()
+        self.durable_lsn = self.next_lsn  # Every record below this is on disk
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+
+        self._buffer = bytearray()
+        self._buffer_lsn = self.next_lsn  # LSN of the first buffered record
+        self._writer: Optional[asyncio.Task] = None
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+
+    def _segment_path(self, first_lsn: int) -> str:
+        return os.path.join(self.directory, f"{first_lsn:020d}{_SEGMENT_SUFFIX}")
+
+    def _snapshot_path(self, lsn: int) -> str:
+        return os.path.join(self.directory, f"{_SNAPSHOT_PREFIX}{lsn:020d}")
+
+    def _recover(self) -> int:
+        """Find the next LSN, truncating a record torn by a crash at the end of the log"""
+        if not self._segments:
+            self._segments.append(self.snapshot_lsn)
+            open(self._segment_path(self.snapshot_lsn), "ab").close()
+            return self.snapshot_lsn
+
+        path = self._segment_path(self._segments[-1])
+        with open(path, "rb") as f:
+            data = f.read()
+        count = 0
+        valid = 0
+        for _, valid in _read_frames(data):
+            count += 1
+        if valid < len(data):
+            logger.warning(f"Truncating {len(data) - valid} bytes of incomplete records from {path}")
+            with open(path, "r+b") as f:
+                f.truncate(valid)
+                os.fsync(f.fileno())
+        return self._segments[-1] + count
+
+    # Appending
+
+    def append(self, message: DTMessage) -> int:
+        """Log a message; it is durable once sync() covering it returns. Returns its LSN."""
+        self._buffer += _frame(encode_message(message))
+        lsn = self.next_lsn
+        self.next_lsn += 1
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_batches())
+        return lsn
+
+    async def sync(self):
+        """Wait until every message appended so far is on disk"""
+        target = self.next_lsn
+        if self.durable_lsn >= target:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((target, waiter))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_batches())
+        await waiter
+
+    async def _write_batches(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(self.commit_interval)
+        while self._buffer:
+            data, first_lsn = bytes(self._buffer), self._buffer_lsn
+            self._buffer.clear()
+            self._buffer_lsn = end_lsn = self.next_lsn
+            try:
+                await loop.run_in_executor(None, self._write, data, first_lsn)
+            except Exception as e:
+                logger.error(f"Error writing message log: {e}", exc_info=True)
+                for _, waiter in self._waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                self._waiters.clear()
+                return
+            self.durable_lsn = end_lsn
+            waiting = []
+            for target, waiter in self._waiters:
+                if target <= end_lsn:
+                    if not waiter.done():
+                        waiter.set_result(None)
+                else:
+                    waiting.append((target, waiter))
+            self._waiters = waiting
+
+    def _write(self, data: bytes, first_lsn: int):
+        with self._lock:
+            if self._file.tell() >= self.segment_size:
+                self._file.close()
+                self._segments.append(first_lsn)
+                self._file = open(self._segment_path(first_lsn), "ab")
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    async def close(self):
+        await self.sync()
+        with self._lock:
+            self._file.close()
+
+    # Reading
+
+    def read(self, after_lsn: int = 0) -> Iterator[Tuple[int, DTMessage]]:
+        """Logged messages with an LSN of at least after_lsn, in order, as (LSN, message)"""
+        with self._lock:
+            segments = list(self._segments)
+        for i, first_lsn in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1] <= after_lsn:
+                continue
+            with open(self._segment_path(first_lsn), "rb") as f:
+                data = f.read()
+            lsn = first_lsn
+            for payload, _ in _read_frames(data):
+                if lsn >= after_lsn:
+                    yield lsn, decode_message(payload)
+                lsn += 1
+
+    # Snapshots
+
+    def _latest_snapshot_lsn(self) -> Optional[int]:
+        lsns = [int(name[len(_SNAPSHOT_PREFIX):]) for name in os.listdir(self.directory)
+                if name.startswith(_SNAPSHOT_PREFIX) and not name.endswith(".tmp")]
+        return max(lsns) if lsns else None
+
+    async def write_snapshot(self, state: Dict[str, Any], pending: List[Tuple[str, DTMessage]]) -> int:
+        """Persist agent state and queued (agent ID, message) pairs as of now.
+
+        Replay then starts from this snapshot, and segments holding only older
+        records are deleted. State that the codec cannot encode is skipped.
+        Returns the snapshot's LSN.
+        """
+        lsn = self.next_lsn
+        encoded_state = {}
+        for name, value in state.items():
+            try:
+                encoded_state[name] = pack(value)
+            except (TypeError, OverflowError) as e:
+                logger.warning(f"Leaving {name} out of the message log snapshot: {e}")
+        snapshot = pack({
+            "lsn": lsn,
+            "state": encoded_state,
+            "pending": [[agent_id, message_to_fields(message)] for agent_id, message in pending]
+        })
+        await asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, lsn, _frame(snapshot))
+        self.snapshot_lsn = lsn
+        return lsn
+
+    def _write_snapshot(self, lsn: int, data: bytes):
+        path = self._snapshot_path(lsn)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        # Drop older snapshots and the segments the new one makes redundant
+        for name in os.listdir(self.directory):
+            if name.startswith(_SNAPSHOT_PREFIX) and name != os.path.basename(path):
+                os.remove(os.path.join(self.directory, name))
+        with self._lock:
+            while len(self._segments) > 1 and self._segments[1] <= lsn:
+                os.remove(self._segment_path(self._segments.pop(0)))
+
+    def load_snapshot(self) -> Optional[Dict[str, Any]]:
+        """The latest snapshot as {"lsn", "state", "pending"}, or None if there is none"""
+        lsn = self._latest_snapshot_lsn()
+        if lsn is None:
+            return None
+        with open(self._snapshot_path(lsn), "rb") as f:
+            frames = list(_read_frames(f.read()))
+        if not frames:
+            logger.error(f"Message log snapshot {lsn} is corrupt, ignoring it")
+            return None
+        snapshot = unpack(frames[0][0])
+        return {
+            "lsn": snapshot["lsn"],
+            "state": {name: unpack(value) for name, value in snapshot["state"].items()},
+            "pending": [(agent_id, message_from_fields(fields)) for agent_id, fields in snapshot["pending"]]
+        }
+
+    @property
+    def records_since_snapshot(self) -> int:
+        return self.next_lsn - self.snapshot_lsn
@@ -0,0 +1,163 @@
+import bisect
+import time
+from typing import Any, Dict, Optional, Sequence
+
+# Upper bounds in seconds; one more bucket catches everything slower
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing a value is a bisect and two additions"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (the max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+
+class RateCounter:
+    """Events per second over a sliding window of one-second slots"""
+
+    __slots__ = ("slots", "second")
+
+    def __init__(self, window: int = 60):
+        self.slots = [0] * window
+        self.second = 0
+
+    def add(self, now: float):
+        self._advance(int(now))
+        self.slots[self.second % len(self.slots)] += 1
+
+    def rate(self, now: float) -> float:
+        self._advance(int(now))
+        return sum(self.slots) / len(self.slots)
+
+    def _advance(self, second: int):
+        if second == self.second:
+            return
+        window = len(self.slots)
+        if second - self.second >= window:
+            self.slots[:] = [0] * window
+        else:
+            for elapsed in range(self.second + 1, second + 1):
+                self.slots[elapsed % window] = 0
+        self.second = second
+
+
+class MessageTypeMetrics:
+    """Counters for one message type handled by one agent"""
+
+    __slots__ = ("handled", "errors", "latency", "handler_time")
+
+    def __init__(self):
+        self.handled = 0
+        self.errors = 0
+        self.latency = Histogram()  # Enqueue to handler start, seconds
+        self.handler_time = Histogram()  # Handler execution, seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "handled": self.handled,
+            "errors": self.errors,
+            "latency": self.latency.snapshot(),
+            "handler_time": self.handler_time.snapshot()
+        }
+
+
+class AgentMetrics:
+    """Counters for one agent's mailbox consumer"""
+
+    __slots__ = ("message_types", "unhandled", "rate")
+
+    def __init__(self):
+        self.message_types: Dict[str, MessageTypeMetrics] = {}
+        self.unhandled = 0  # Messages of a type the agent has no handler for
+        self.rate = RateCounter()
+
+
+class DTMACMetrics:
+    """
+    Runtime metrics of DTMAC mailbox consumers, per agent and message type.
+
+    Counters and histogram buckets are allocated once per agent / message
+    type, so recording a handled message only increments existing slots.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._agents: Dict[str, AgentMetrics] = {}
+
+    def record_handled(self, agent_id: str, message_type: str, latency: float, handler_time: float, error: bool):
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            agent = self._agents[agent_id] = AgentMetrics()
+        metrics = agent.message_types.get(message_type)
+        if metrics is None:
+            metrics = agent.message_types[message_type] = MessageTypeMetrics()
+        metrics.handled += 1
+        if error:
+            metrics.errors += 1
+        metrics.latency.observe(latency)
+        metrics.handler_time.observe(handler_time)
+        agent.rate.add(time.monotonic())
+
+    def record_unhandled(self, agent_id: str):
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            agent = self._agents[agent_id] = AgentMetrics()
+        agent.unhandled += 1
+
+    def snapshot(self, agent_id: str, queue: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Metrics of one agent, with its mailbox stats as the queue entry"""
+        agent = self._agents.get(agent_id) or AgentMetrics()
+        message_types = {name: metrics.snapshot() for name, metrics in agent.message_types.items()}
+        return {
+            "queue": queue or {},
+            "messages_per_sec": agent.rate.rate(time.monotonic()),
+            "handled": sum(metrics.handled for metrics in agent.message_types.values()),
+            "errors": sum(metrics.errors for metrics in agent.message_types.values()),
+            "unhandled": agent.unhandled,
+            "message_types": message_types
+        }
+
+    def reset(self):
+        self.started = time.monotonic()
+        self._agents.clear()
@@ -1,23 +1,82 @@
-from typing import Dict, Any
+from typing import AsyncIterator, Callable, Dict, Any, Iterable, List, Optional, Tuple
 import asyncio
-from .dtmac import DTMAC
+import os
+from .dtmac import DTMAC, MessagePriority
+from .transport import ProcessTransport
+from .message_log import MessageLog
+from .pipeline import Pipeline, Stage
+from .ratelimit import RateLimiter
+from services.historic_data import DataArchiver
 from .data_analyst_agent import DataAnalystAgent
 from .trade_strategy_agent import TradeStrategyAgent
 from .trade_advisor_agent import TradeAdvisorAgent
 from .risk_advisor_agent import RiskAdvisorAgent
+from .ui_gateway_agent import UIGatewayAgent
+
+AGENT_CLASSES = {
+    "data_analyst": DataAnalystAgent,
+    "trade_strategy": TradeStrategyAgent,
+    "trade_advisor": TradeAdvisorAgent,
+    "risk_advisor": RiskAdvisorAgent
+}
+
+DATA_ARCHIVE = 'data_archive'
+MARKET_INDEX = 'SPY'  # Archived along with every ticker, the risk advisor's beta needs it
+
+# Upstream API -> (calls per second, burst); Alpha Vantage calls are paced per API key
+# by services.alpha_vantage instead
+DEFAULT_RATE_LIMITS = {
+    "yfinance": (2.0, 10)
+}
+
+
+def archive_version(context: Dict[str, Any]) -> Optional[Tuple[str, int, int]]:
+    """Fingerprint of the archived OHLCV file the agents will load for a ticker"""
+    prefix = f"{context['ticker']}_historic_data_"
+    files = [f for f in os.listdir(DATA_ARCHIVE) if f.startswith(prefix) and f.endswith('.json')]
+    if not files:
+        return None
+    # Same choice as the agents' load_historical_data: newest end date
+    latest = max(files, key=lambda f: f.split('_')[-1].replace('.json', ''))
+    stat = os.stat(os.path.join(DATA_ARCHIVE, latest))
+    return latest, stat.st_mtime_ns, stat.st_size
 
 class AgentOrchestrator:
-    def __init__(self):
+    def __init__(self,
+                 process_agents: Optional[Dict[str, int]] = None,
+                 replicas: Optional[Dict[str, int]] = None,
+                 log_dir: Optional[str] = None,
+                 rate_limits: Optional[Dict[str, Tuple[float, int]]] = None,
+                 ui_emit: Optional[Callable[[str, Dict[str, Any], str], None]] = None):
+        """
+        Args:
+            process_agents: Agent ID -> number of worker process replicas, for agents
+                            that should run outside this interpreter (e.g. CPU-heavy
+                            risk_advisor / trade_strategy). Others run in-process.
+            replicas: Agent ID -> number of in-process replicas, sharded by symbol.
+            log_dir: Directory for a durable DTMAC message log; agent state is
+                     rebuilt from it on start().
+            rate_limits: Upstream API -> (calls per second, burst), overriding
+                         DEFAULT_RATE_LIMITS for the analysis pipeline.
+            ui_emit: emit(event, data, room) pushing to SocketIO rooms; when given,
+                     a UI gateway agent ("ui_agent") forwards agent output to browsers.
+        """
         # Initialize DTMAC
-        self.dtmac = DTMAC()
+        self.dtmac = DTMAC(message_log=MessageLog(log_dir) if log_dir else None)
         
-        # Initialize agents
-        self.agents = {
-            "data_analyst": DataAnalystAgent(self.dtmac),
-            "trade_strategy": TradeStrategyAgent(self.dtmac),
-            "trade_advisor": TradeAdvisorAgent(self.dtmac),
-            "risk_advisor": RiskAdvisorAgent(self.dtmac)
-        }
+        # Initialize in-process agents
+        self.process_agents = dict(process_agents or {})
+        self.agents = {}
+        for agent_id, agent_class in AGENT_CLASSES.items():
+            if agent_id in self.process_agents:
+                continue
+            if replicas and agent_id in replicas:
+                self.scale_agent(agent_id, replicas[agent_id])
+            else:
+                self.agents[agent_id] = agent_class(self.dtmac)
+        if ui_emit is not None:
+            self.agents["ui_agent"] = UIGatewayAgent(self.dtmac, ui_emit)
+        self.transport = ProcessTransport(self.dtmac) if self.process_agents else None
         
         # Define system-wide topics
         self.system_topics = {
@@ -27,14 +86,30 @@ class AgentOrchestrator:
             "risk_alerts": ["trade_strategy", "trade_advisor"],
             "economic_data": ["trade_advisor", "risk_advisor"]
         }
+        
+        self.rate_limits = {
+            upstream: RateLimiter(rate, burst)
+            for upstream, (rate, burst) in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()
+        }
+        self.analysis_pipeline = self._build_analysis_pipeline()
     
     async def start(self):
         """Start the agent system"""
+        # Start worker processes for out-of-process agents
+        for agent_id, replicas in self.process_agents.items():
+            await self.transport.spawn(AGENT_CLASSES[agent_id], replicas=replicas)
+        
         # Register system topics
         for topic, agent_ids in self.system_topics.items():
             for agent_id in agent_ids:
-                if agent_id in self.agents:
-                    self.dtmac.register_agent(agent_id, [topic])
+                if agent_id in self.process_agents:
+                    self.dtmac.register_remote_agent(agent_id, [topic], self.transport)
+                else:
+                    self.dtmac.subscribe(agent_id, [topic])
+        
+        # Rebuild agent state from the durable message log
+        if self.dtmac.message_log is not None:
+            await self.dtmac.replay()
         
         # Start agent-specific tasks
         tasks = []
@@ -45,47 +120,190 @@ class AgentOrchestrator:
         # Wait for all tasks to complete
         await asyncio.gather(*tasks)
     
-    async def process_user_request(self, request: Dict[str, Any]):
-        """Process a user request through the agent system"""
+    def scale_agent(self, agent_id: str, replicas: int):
+        """Add or remove in-process replicas of an agent; queued messages are rebalanced"""
+        current = self.dtmac.get_replicas(agent_id)
+        for replica in range(len(current), replicas):
+            agent = AGENT_CLASSES[agent_id](self.dtmac, replica=replica)
+            self.agents[agent.agent_id] = agent
+        for replica_id in current[replicas:]:
+            self.dtmac.unregister_replica(agent_id, replica_id)
+            del self.agents[replica_id]
+    
+    async def process_user_request(self, request: Dict[str, Any], timeout: Optional[float] = 60.0) -> Dict[str, Any]:
+        """Process a user request through the agent system and return the agent's response"""
         request_type = request.get("type")
         
         if request_type == "analyze":
             # Forward to data analyst
-            await self.dtmac.send_message(
-                sender="orchestrator",
-                recipients=["data_analyst"],
-                content=request,
-                message_type="analysis_request",
-                priority=MessagePriority.HIGH
-            )
+            recipient, message_type, priority = "data_analyst", "analysis_request", MessagePriority.HIGH
         elif request_type == "trade_advice":
             # Forward to trade advisor
-            await self.dtmac.send_message(
-                sender="orchestrator",
-                recipients=["trade_advisor"],
-                content=request,
-                message_type="advice_request",
-                priority=MessagePriority.NORMAL
-            )
+            recipient, message_type, priority = "trade_advisor", "advice_request", MessagePriority.NORMAL
         elif request_type == "risk_assessment":
             # Forward to risk advisor
-            await self.dtmac.send_message(
+            recipient, message_type, priority = "risk_advisor", "risk_assessment_request", MessagePriority.HIGH
+        else:
+            return {"error": f"Unknown request type: {request_type}"}
+        
+        try:
+            response = await self.dtmac.request(
                 sender="orchestrator",
-                recipients=["risk_advisor"],
+                recipient=recipient,
                 content=request,
-                message_type="risk_assessment_request",
-                priority=MessagePriority.HIGH
+                message_type=message_type,
+                priority=priority,
+                timeout=timeout
             )
+        except asyncio.TimeoutError:
+            return {"error": f"{recipient} did not respond within {timeout} seconds"}
+        return dict(response.content)
+    
+    def _build_analysis_pipeline(self) -> Pipeline:
+        """
+        Stages of the per-ticker analysis flow.
+
+        trade_strategy, trade_advisor and risk_advisor only read the archived
+        OHLCV data, so they run concurrently once it is archived, alongside
+        data_analyst, which fetches its own overview. Their results are cached
+        until the archive file changes.
+        """
+        return Pipeline([
+            Stage("archive", self._archive_stage, ttl=15 * 60, upstreams={"yfinance": 1}),
+            Stage("data_analyst", self._data_analyst_stage, ttl=5 * 60,
+                  upstreams={"yfinance": 3}),
+            Stage("trade_strategy", self._trade_strategy_stage, depends_on=("archive",), version=archive_version),
+            Stage("trade_advisor", self._trade_advisor_stage, depends_on=("archive",), version=archive_version),
+            Stage("risk_advisor", self._risk_advisor_stage, depends_on=("archive",), version=archive_version)
+        ], rate_limits=self.rate_limits)
+    
+    def _local_agent(self, agent_id: str, ticker: str):
+        """The in-process agent (or the replica owning the ticker) for a stage"""
+        replicas = self.dtmac.replica_groups.get(agent_id)
+        if replicas:
+            agent_id = replicas.get(ticker)
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            raise RuntimeError(f"{agent_id} does not run in this process")
+        return agent
+    
+    def _archive_stage(self, context: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        # One batched download for the ticker and the market index
+        paths = DataArchiver(DATA_ARCHIVE).archive_historic_data_bulk(
+            [context['ticker'], MARKET_INDEX], context['start_date'], context['end_date']
+        )
+        path = paths[context['ticker'].strip()]
+        if not os.path.isfile(path):
+            # archive_historic_data reports failures as a message instead of a path
+            return {"error": path}
+        return {"path": path}
+    
+    def _data_analyst_stage(self, context: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        overview = self._local_agent("data_analyst", context['ticker']).get_stock_overview(context['ticker'])
+        if overview is None:
+            return {"error": "Failed to fetch stock data"}
+        return overview
+    
+    def _trade_strategy_stage(self, context: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        agent = self._local_agent("trade_strategy", context['ticker'])
+        ma_strategy = agent.moving_average_crossover_strategy(context['ticker'])
+        rsi_strategy = agent.rsi_strategy(context['ticker'])
+        if 'error' in ma_strategy or 'error' in rsi_strategy:
+            return {
+                "error": "Strategy calculation failed",
+                "ma_error": ma_strategy.get('error'),
+                "rsi_error": rsi_strategy.get('error')
+            }
+        return {"ma_strategy": ma_strategy, "rsi_strategy": rsi_strategy}
+    
+    def _trade_advisor_stage(self, context: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return self._local_agent("trade_advisor", context['ticker']).get_trading_recommendation(context['ticker'])
+    
+    def _risk_advisor_stage(self, context: Dict[str, Any], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        return self._local_agent("risk_advisor", context['ticker']).analyze_risk(context['ticker'])
+    
+    async def run_analysis(self,
+                           ticker: str,
+                           start_date: str,
+                           end_date: str,
+                           stages: Optional[Iterable[str]] = None,
+                           on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Run the analysis flow for a ticker and return every stage's result.
+
+        Independent stages run concurrently and unchanged results come from the
+        pipeline cache, keyed by ticker, date range and archived data version.
+        A failed stage's result is {"error": ...}; stages depending on it are skipped.
+        on_result is called with (stage name, result) as each stage finishes.
+        """
+        context = {"ticker": ticker, "start_date": start_date, "end_date": end_date}
+        return await self.analysis_pipeline.run(context, stages, on_result)
+    
+    async def process_watchlist(self,
+                                tickers: Iterable[str],
+                                start_date: str,
+                                end_date: str,
+                                analyses: Optional[Iterable[str]] = None,
+                                concurrency: int = 8) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the analysis flow for many tickers, yielding each ticker's results as it completes.
+        
+        At most concurrency tickers are analysed at once; upstream API calls
+        are further throttled by the pipeline's rate limits.
+        
+        Args:
+            tickers: Ticker symbols; duplicates are analysed once
+            start_date: Start of the archived price history (YYYY-MM-DD)
+            end_date: End of the archived price history (YYYY-MM-DD)
+            analyses: Pipeline stages to report, e.g. ["trade_advisor", "risk_advisor"]; all if None
+            concurrency: Tickers in flight at once
+            
+        Yields:
+            {"ticker": ..., "results": {analysis: result}} in completion order
+        """
+        analyses: Optional[List[str]] = list(analyses) if analyses is not None else None
+        unknown = set(analyses or ()) - set(self.analysis_pipeline.stages)
+        if unknown:
+            raise ValueError(f"Unknown analyses: {', '.join(sorted(unknown))}")
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze(ticker: str) -> Dict[str, Any]:
+            async with semaphore:
+                results = await self.run_analysis(ticker, start_date, end_date, analyses)
+            if analyses is not None:
+                results = {name: results[name] for name in analyses}
+            return {"ticker": ticker, "results": results}
+        
+        tasks = [asyncio.create_task(analyze(ticker)) for ticker in dict.fromkeys(tickers)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
     
     async def get_system_status(self) -> Dict[str, Any]:
-        """Get the current status of all agents"""
+        """Get the current status of all agents, with their DTMAC queue and handler metrics"""
         status = {}
         for agent_id, agent in self.agents.items():
             status[agent_id] = await agent.get_status()
+            status[agent_id]["dtmac"] = self.dtmac.get_metrics(agent_id)
+        for agent_id in self.process_agents:
+            status[agent_id] = {
+                "status": "remote",
+                "replicas": self.transport.get_replica_count(agent_id),
+                "subscribed_topics": self.dtmac.get_agent_topics(agent_id)
+            }
         return status
     
     async def stop(self):
         """Stop the agent system"""
         for agent in self.agents.values():
             if hasattr(agent, 'stop'):
-                await agent.stop() 
\ No newline at end of file
+                await agent.stop()
+        
+        # Stop worker processes and the mailbox consumers
+        if self.transport is not None:
+            await self.transport.stop()
+        await self.dtmac.stop() 
\ No newline at end of file
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from .concurrency import run_blocking
+from .ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    func is called as func(context, inputs), where inputs maps each stage in
+    depends_on to its result. Coroutine functions are awaited; plain functions
+    run in a worker thread so stages without a dependency between them overlap.
+    upstreams maps the rate-limited APIs a stage calls to the calls it makes.
+    """
+
+    def __init__(self,
+                 name: str,
+                 func: Callable[[Dict[str, Any], Dict[str, Any]], Any],
+                 depends_on: Tuple[str, ...] = (),
+                 version: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+                 ttl: Optional[float] = None,
+                 cache: bool = True,
+                 upstreams: Optional[Dict[str, int]] = None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.version = version  # Data version of a context, checked after dependencies finish
+        self.ttl = ttl  # Seconds a cached result stays valid, None for as long as the version holds
+        self.cache = cache
+        self.upstreams = dict(upstreams or {})  # Upstream name -> calls per run
+
+
+class _CacheEntry:
+    __slots__ = ("version", "created", "result")
+
+    def __init__(self, version: Hashable, result: Any):
+        self.version = version
+        self.created = time.monotonic()
+        self.result = result
+
+
+class Pipeline:
+    """
+    Dependency graph of stages run with maximal concurrency.
+
+    Each stage starts as soon as the stages it depends on have finished, so the
+    wall-clock time of a run is its longest dependency chain rather than the sum
+    of all stages. Results are cached per stage by the run context (e.g. ticker
+    and date range) and the stage's data version; failed results, i.e. dicts with
+    an "error" key, are never cached. A stage whose dependency failed is skipped.
+    Before a stage runs (on a cache miss) it waits for the rate limiters of
+    the upstreams it calls.
+    """
+
+    def __init__(self, stages: Iterable[Stage], rate_limits: Optional[Dict[str, RateLimiter]] = None):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate pipeline stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage {stage.name!r} depends on unknown stage {dependency!r}")
+        self.rate_limits = dict(rate_limits or {})
+        for stage in self.stages.values():
+            for upstream in stage.upstreams:
+                if upstream not in self.rate_limits:
+                    raise ValueError(f"Stage {stage.name!r} calls {upstream!r}, which has no rate limit")
+        self._check_acyclic()
+        self._cache: Dict[Tuple[str, Hashable], _CacheEntry] = {}
+        self._lock = threading.Lock()  # Runs may happen on several threads' event loops at once
+
+    def _check_acyclic(self):
+        done = set()
+        visiting = set()
+
+        def visit(name: str, path: Tuple[str, ...]):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline stages form a cycle: {' -> '.join(path + (name,))}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency, path + (name,))
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name, ())
+
+    def _with_dependencies(self, names: Iterable[str]) -> Dict[str, None]:
+        selected: Dict[str, None] = {}
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage {name!r}")
+            if name not in selected:
+                selected[name] = None
+                pending.extend(self.stages[name].depends_on)
+        return selected
+
+    async def run(self,
+                  context: Dict[str, Any],
+                  stages: Optional[Iterable[str]] = None,
+                  on_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Run the pipeline for one context and return {stage name: result}.
+
+        Args:
+            context: Hashable values identifying the run, e.g. ticker and dates
+            stages: Stages to run, with everything they depend on; all if None
+            on_result: Called with (stage name, result) as each stage finishes
+        """
+        selected = self._with_dependencies(stages) if stages is not None else dict.fromkeys(self.stages)
+        context_key = tuple(sorted(context.items()))
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            inputs = {}
+            for dependency in stage.depends_on:
+                inputs[dependency] = await tasks[dependency]
+                if _failed(inputs[dependency]):
+                    return {"error": f"Skipped because {dependency} failed: {inputs[dependency]['error']}"}
+            return await self._run_cached(stage, context, context_key, inputs)
+
+        async def run_and_report(stage: Stage) -> Any:
+            result = await run_stage(stage)
+            if on_result is not None:
+                try:
+                    on_result(stage.name, result)
+                except Exception as e:
+                    logger.error(f"Error reporting the result of pipeline stage {stage.name}: {e}", exc_info=True)
+            return result
+
+        for name in selected:
+            tasks[name] = asyncio.create_task(run_and_report(self.stages[name]))
+        await asyncio.gather(*tasks.values())
+        return {name: task.result() for name, task in tasks.items()}
+
+    async def _run_cached(self, stage: Stage, context: Dict[str, Any], context_key: Hashable, inputs: Dict[str, Any]) -> Any:
+        key = (stage.name, context_key)
+        version = None
+        cacheable = stage.cache
+        if cacheable:
+            try:
+                version = stage.version(context) if stage.version else None
+            except Exception as e:
+                logger.warning(f"Could not determine the data version of stage {stage.name}: {e}")
+                cacheable = False
+            else:
+                with self._lock:
+                    entry = self._cache.get(key)
+                if entry is not None and entry.version == version and (
+                        stage.ttl is None or time.monotonic() - entry.created < stage.ttl):
+                    logger.debug(f"Pipeline stage {stage.name} served from cache")
+                    return entry.result
+
+        for upstream, calls in stage.upstreams.items():
+            await self.rate_limits[upstream].acquire(calls)
+
+        started = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(stage.func):
+                result = await stage.func(context, inputs)
+            else:
+                result = await run_blocking(stage.func, context, inputs)
+        except Exception as e:
+            logger.error(f"Pipeline stage {stage.name} failed: {e}", exc_info=True)
+            return {"error": str(e)}
+        logger.info(f"Pipeline stage {stage.name} finished in {time.perf_counter() - started:.2f}s")
+
+        if cacheable and not _failed(result):
+            # Version is taken before running, so a change while running only costs a recompute
+            with self._lock:
+                self._cache[key] = _CacheEntry(version=version, result=result)
+        return result
+
+    def invalidate(self, stage: Optional[str] = None, context: Optional[Dict[str, Any]] = None):
+        """Drop cached results, optionally only those of one stage and/or one context"""
+        context_key = tuple(sorted(context.items())) if context is not None else None
+        with self._lock:
+            for key in list(self._cache):
+                if (stage is None or key[0] == stage) and (context_key is None or key[1] == context_key):
+                    del self._cache[key]
+
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and "error" in result
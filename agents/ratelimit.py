@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiting calls to an upstream API.
+
+    Tokens refill at rate per second up to burst. Callers reserve tokens
+    first-come first-served and sleep until their reservation is covered, so
+    waiters never starve each other. The bucket is thread-safe and not tied to
+    an event loop, so one limiter can be shared by every request thread.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Tokens added per second
+            burst: Tokens that can be spent at once after a quiet period
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)  # Negative while reservations are outstanding
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Take tokens now and return the seconds until they are actually available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self, tokens: int = 1):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
@@ -8,6 +8,7 @@ from datetime import datetime
 import asyncio
 from .base_agent import BaseAgent
 from .dtmac import MessagePriority, DTMessage
+from .topics import symbol_topic
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,9 @@ class RiskAdvisorAgent(BaseAgent):
     and provides risk management recommendations.
     """
 
-    def __init__(self, dtmac):
+    state_attributes = ("risk_assessments", "last_update")
+
+    def __init__(self, dtmac, replica: Optional[int] = None):
         # Define topics this agent is interested in
         topics = [
             "market_data",
@@ -25,15 +28,22 @@ class RiskAdvisorAgent(BaseAgent):
             "trading_signals",
             "economic_data"
         ]
-        super().__init__("risk_advisor", dtmac, topics)
+        super().__init__("risk_advisor", dtmac, topics, replica)
         
         # Register specific message handlers
-        self.dtmac.register_handler(self.agent_id, "new_market_data", self.handle_market_data)
-        self.dtmac.register_handler(self.agent_id, "analysis_complete", self.handle_analysis)
-        self.dtmac.register_handler(self.agent_id, "economic_update", self.handle_economic_update)
+        self.dtmac.register_handler(self.agent_id, "new_market_data", self.handle_market_data, replay=True)
+        self.dtmac.register_handler(self.agent_id, "analysis_complete", self.handle_analysis, replay=True)
+        self.dtmac.register_handler(self.agent_id, "economic_update", self.handle_economic_update, replay=True)
+        self.dtmac.register_handler(self.agent_id, "risk_assessment_request", self.handle_risk_assessment_request)
+        self.dtmac.register_handler(self.agent_id, "watch_symbol", self.handle_watch_symbol)
+        self.dtmac.register_handler(self.agent_id, "risk_rescore", self.handle_risk_rescore)
+        
+        # Risk assessments run in executor threads, so assess several symbols at once (each in order)
+        self.dtmac.configure_concurrency(self.agent_id, concurrency=4)
         
         # Initialize agent state
         self.risk_assessments = {}
+        self.watched_symbols = set()  # Symbols re-scored on a timer, set by watch_symbol messages only
         self.last_update = None
         
         self.data_archive = 'data_archive'
@@ -41,14 +51,71 @@ class RiskAdvisorAgent(BaseAgent):
         os.makedirs(self.data_archive, exist_ok=True)
         os.makedirs(self.risk_archive, exist_ok=True)
     
+    # Archived data changes at most a few times a day; jitter keeps symbols watched together apart
+    RESCORE_INTERVAL = 15 * 60
+    RESCORE_JITTER = 60
+    MAX_WATCHED_SYMBOLS = 100  # Every watched symbol costs a risk analysis per interval
+    
     async def get_status(self) -> Dict[str, Any]:
         return {
             "status": "active",
             "last_update": self.last_update,
             "active_assessments": len(self.risk_assessments),
+            "watched_symbols": len(self.watched_symbols),
             "subscribed_topics": self.get_subscribed_topics()
         }
     
+    def watch_symbol(self, symbol: str) -> bool:
+        """Re-score a symbol's risk periodically; watching it again restarts its cycle.
+
+        Returns False, without watching, once MAX_WATCHED_SYMBOLS are watched.
+        """
+        if symbol not in self.watched_symbols and len(self.watched_symbols) >= self.MAX_WATCHED_SYMBOLS:
+            logger.warning(f"Not watching {symbol}: already watching {len(self.watched_symbols)} symbols")
+            return False
+        self.watched_symbols.add(symbol)
+        self.schedule_message(
+            self.group_id,
+            content={"symbol": symbol},
+            message_type="risk_rescore",
+            delay=self.RESCORE_INTERVAL,
+            interval=self.RESCORE_INTERVAL,
+            jitter=self.RESCORE_JITTER,
+            priority=MessagePriority.LOW,
+            key=f"{self.group_id}.rescore.{symbol}"
+        )
+        return True
+    
+    def unwatch_symbol(self, symbol: str):
+        """Stop re-scoring a symbol and cancel its pending timer"""
+        self.watched_symbols.discard(symbol)
+        self.cancel_scheduled(key=f"{self.group_id}.rescore.{symbol}")
+    
+    async def handle_watch_symbol(self, message: DTMessage):
+        """Start or stop periodic re-scoring of a symbol"""
+        symbol = message.content.get("symbol")
+        if not symbol:
+            return
+        if message.content.get("watch", True):
+            self.watch_symbol(symbol)
+        else:
+            self.unwatch_symbol(symbol)
+    
+    async def handle_risk_rescore(self, message: DTMessage):
+        """Re-run the risk analysis of a watched symbol and broadcast it"""
+        symbol = message.content.get("symbol")
+        assessment = await self.run_blocking(self.analyze_risk, symbol)
+        if "error" in assessment:
+            logger.warning(f"Risk re-score of {symbol} failed: {assessment['error']}")
+            return
+        
+        await self.broadcast_to_topic(
+            topic=symbol_topic("risk_alerts", symbol),
+            content={"symbol": symbol, "assessment": assessment},
+            message_type="risk_update",
+            priority=MessagePriority.LOW
+        )
+    
     async def handle_market_data(self, message: DTMessage):
         """Handle new market data"""
         market_data = message.content
@@ -64,7 +131,7 @@ class RiskAdvisorAgent(BaseAgent):
         # Broadcast risk alert if necessary
         if risk_metrics["risk_score"] > 0.7:  # High risk threshold
             await self.broadcast_to_topic(
-                topic="risk_alerts",
+                topic=symbol_topic("risk_alerts", symbol),
                 content={
                     "symbol": symbol,
                     "risk_metrics": risk_metrics,
@@ -92,7 +159,7 @@ class RiskAdvisorAgent(BaseAgent):
             # Broadcast risk alert if necessary
             if updated_metrics["risk_score"] > 0.7:
                 await self.broadcast_to_topic(
-                    topic="risk_alerts",
+                    topic=symbol_topic("risk_alerts", symbol),
                     content={
                         "symbol": symbol,
                         "risk_metrics": updated_metrics,
@@ -102,6 +169,20 @@ class RiskAdvisorAgent(BaseAgent):
                     priority=MessagePriority.HIGH
                 )
     
+    async def handle_risk_assessment_request(self, message: DTMessage):
+        """Handle risk assessment requests"""
+        symbol = message.content.get("symbol")
+        
+        # The analysis is computed from archived data with pandas, keep it off the event loop
+        assessment = await self.run_blocking(self.analyze_risk, symbol)
+        
+        await self.reply(
+            message,
+            content={"symbol": symbol, "assessment": assessment},
+            message_type="risk_assessment_response",
+            priority=MessagePriority.HIGH
+        )
+    
     async def handle_economic_update(self, message: DTMessage):
         """Handle economic data updates"""
         economic_data = message.content
@@ -119,7 +200,7 @@ class RiskAdvisorAgent(BaseAgent):
             # Broadcast risk alert if necessary
             if updated_metrics["risk_score"] > 0.7:
                 await self.broadcast_to_topic(
-                    topic="risk_alerts",
+                    topic=symbol_topic("risk_alerts", symbol),
                     content={
                         "symbol": symbol,
                         "risk_metrics": updated_metrics,
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ("timer_id", "due", "interval", "jitter", "action", "key", "cancelled")
+
+    def __init__(self,
+                 timer_id: int,
+                 due: float,
+                 interval: Optional[float],
+                 jitter: float,
+                 action: Callable[[], Awaitable[None]],
+                 key: Optional[Hashable]):
+        self.timer_id = timer_id
+        self.due = due  # Monotonic time of the next firing
+        self.interval = interval  # Seconds between firings, None for a one-shot timer
+        self.jitter = jitter  # Up to this many seconds are added to or taken from each delay
+        self.action = action
+        self.key = key
+        self.cancelled = False
+
+
+def _jittered(delay: float, jitter: float) -> float:
+    return max(0.0, delay + random.uniform(-jitter, jitter)) if jitter else delay
+
+
+class TimerScheduler:
+    """
+    Delayed and recurring actions, driven by one task for any number of timers.
+
+    Timers sit in a heap ordered by due time; the task sleeps until the
+    earliest one and fires everything due in one pass, so thousands of
+    per-symbol timers cost a heap entry each rather than a task each.
+    Cancelling only marks a timer; cancelled entries are dropped when they
+    reach the top of the heap, or all at once when they make up most of it.
+    Recurring timers keep their schedule (due + interval) unless they fall a
+    whole interval behind, in which case missed firings are skipped.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._timers: Dict[int, Timer] = {}  # Timer ID -> active timer
+        self._keys: Dict[Hashable, int] = {}  # Key -> timer ID
+        self._ids = itertools.count(1)
+        self._cancelled = 0  # Cancelled timers still in the heap
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()  # Set when a timer is due earlier than the one slept for
+        self._firing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def schedule(self,
+                 action: Callable[[], Awaitable[None]],
+                 delay: float,
+                 interval: Optional[float] = None,
+                 jitter: float = 0.0,
+                 key: Optional[Hashable] = None) -> int:
+        """Run action after delay seconds, then every interval seconds if given.
+
+        A timer scheduled with the key of an active timer replaces it.
+        Must be called with the event loop running. Returns the timer ID.
+        """
+        if interval is not None and interval <= 0:
+            raise ValueError("interval must be positive")
+        if key is not None:
+            self.cancel_key(key)
+        timer = Timer(next(self._ids), time.monotonic() + _jittered(delay, jitter), interval, jitter, action, key)
+        self._timers[timer.timer_id] = timer
+        if key is not None:
+            self._keys[key] = timer.timer_id
+        self._push(timer)
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+        return timer.timer_id
+
+    def _push(self, timer: Timer):
+        heapq.heappush(self._heap, (timer.due, timer.timer_id, timer))
+        if self._heap[0][2] is timer:
+            self._wakeup.set()
+
+    def cancel(self, timer_id: int) -> bool:
+        """Stop a timer; False if it already fired (one-shot) or was cancelled"""
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        if timer.key is not None and self._keys.get(timer.key) == timer_id:
+            del self._keys[timer.key]
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def cancel_key(self, key: Hashable) -> bool:
+        timer_id = self._keys.get(key)
+        return timer_id is not None and self.cancel(timer_id)
+
+    async def _run(self):
+        while self._heap:
+            due, _, timer = self._heap[0]
+            if timer.cancelled:
+                heapq.heappop(self._heap)
+                self._cancelled -= 1
+                continue
+            now = time.monotonic()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self._fire(timer)
+            if timer.interval is None:
+                self._timers.pop(timer.timer_id, None)
+                if timer.key is not None and self._keys.get(timer.key) == timer.timer_id:
+                    del self._keys[timer.key]
+            elif not timer.cancelled:
+                next_due = due + timer.interval
+                if next_due <= now:
+                    next_due = now + timer.interval
+                if timer.jitter:
+                    next_due = max(now, next_due + random.uniform(-timer.jitter, timer.jitter))
+                timer.due = next_due
+                self._push(timer)
+
+    def _fire(self, timer: Timer):
+        task = asyncio.create_task(timer.action())
+        self._firing.add(task)
+        task.add_done_callback(self._fired)
+
+    def _fired(self, task: asyncio.Task):
+        self._firing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Scheduled action failed: {task.exception()}", exc_info=task.exception())
+
+    def stop(self):
+        """Cancel the scheduler task and actions still running; timers stay scheduled"""
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+        for task in list(self._firing):
+            task.cancel()
@@ -0,0 +1,72 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+
+def symbol_shard_key(message) -> Optional[str]:
+    """Shard messages by the symbol they are about; None for symbol-less messages"""
+    content = message.content
+    symbol = content.get("symbol") if hasattr(content, "get") else None
+    return None if symbol is None else str(symbol)
+
+
+def _hash(value: str) -> int:
+    # Stable across processes and runs, unlike hash()
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping keys (symbols) to nodes (agent replicas).
+
+    Each node is placed on the ring at several virtual points, so keys spread
+    evenly and adding or removing a node only moves the keys that node gains
+    or loses (about 1/N of them).
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 64):
+        self.virtual_nodes = virtual_nodes
+        self._points: List[int] = []  # Sorted hashes of the virtual nodes
+        self._owners: List[str] = []  # Node at the same index of _points
+        self._nodes: List[str] = []
+        self._lookups: Dict[str, str] = {}  # Key -> node, cleared whenever the ring changes
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for i in range(self.virtual_nodes):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+        self._lookups.clear()
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        keep = [i for i, owner in enumerate(self._owners) if owner != node]
+        self._points = [self._points[i] for i in keep]
+        self._owners = [self._owners[i] for i in keep]
+        self._lookups.clear()
+
+    def get(self, key: str) -> Optional[str]:
+        """Node owning a key, None if the ring is empty"""
+        node = self._lookups.get(key)
+        if node is None and self._points:
+            index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+            node = self._lookups[key] = self._owners[index]
+        return node
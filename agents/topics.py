@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional
+
+WILDCARD = "*"  # Matches exactly one topic segment
+
+
+def symbol_segment(symbol: str) -> str:
+    """A symbol as a single topic segment; dotted tickers use Yahoo's dash form, e.g. BRK.B -> BRK-B"""
+    return symbol.replace(".", "-")
+
+
+def symbol_topic(topic: str, symbol: Optional[str]) -> str:
+    """Per-symbol subtopic, e.g. market_data.AAPL; the topic itself if there is no symbol"""
+    return topic if symbol is None else f"{topic}.{symbol_segment(symbol)}"
+
+
+class _Node:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}  # Segment -> child node
+        self.subscribers: List[str] = []  # Agents subscribed to the pattern ending here
+
+
+class TopicIndex:
+    """
+    Segment trie of topic subscriptions.
+
+    Topics are dot-separated paths such as "market_data.AAPL". A subscription
+    matches its topic and every subtopic below it, so agents subscribed to
+    "market_data" still receive "market_data.AAPL", while "market_data.AAPL"
+    subscribers only get AAPL traffic. "*" matches any single segment, e.g.
+    "risk_alerts.*". Build per-symbol topics with symbol_topic() so dotted
+    tickers stay one segment. Matching costs O(topic depth), and results are cached
+    until the subscriptions change.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._matches: Dict[str, List[str]] = {}  # Topic -> subscribers, cleared on every change
+
+    def subscribe(self, pattern: str, agent_id: str):
+        node = self._root
+        for segment in pattern.split("."):
+            node = node.children.setdefault(segment, _Node())
+        if agent_id not in node.subscribers:
+            node.subscribers.append(agent_id)
+            self._matches.clear()
+
+    def unsubscribe(self, pattern: str, agent_id: str):
+        path = [self._root]
+        for segment in pattern.split("."):
+            node = path[-1].children.get(segment)
+            if node is None:
+                return
+            path.append(node)
+        if agent_id not in path[-1].subscribers:
+            return
+        path[-1].subscribers.remove(agent_id)
+        self._matches.clear()
+
+        # Prune branches left without subscribers
+        segments = pattern.split(".")
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if node.subscribers or node.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+
+    def match(self, topic: str) -> List[str]:
+        """Agents subscribed to a topic, to any of its parents, or via wildcards"""
+        subscribers = self._matches.get(topic)
+        if subscribers is None:
+            found: Dict[str, None] = {}
+            nodes = [self._root]
+            for segment in topic.split("."):
+                next_nodes = []
+                for node in nodes:
+                    for child in (node.children.get(segment), node.children.get(WILDCARD)):
+                        if child is not None:
+                            found.update(dict.fromkeys(child.subscribers))
+                            next_nodes.append(child)
+                if not next_nodes:
+                    break
+                nodes = next_nodes
+            subscribers = self._matches[topic] = list(found)
+        return subscribers
@@ -8,7 +8,9 @@ from datetime import datetime, timedelta
 import re
 import asyncio
 from .base_agent import BaseAgent
-from .dtmac import MessagePriority, DTMessage
+from .dtmac import MessagePriority, DTMessage, OverflowPolicy
+from .mailbox import symbol_coalesce_key
+from services.transcript_store import store as transcript_store
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,9 @@ class TradeAdvisorAgent(BaseAgent):
     forecast market trends and provide trading recommendations.
     """
 
-    def __init__(self, dtmac):
+    state_attributes = ("advice", "last_update")
+
+    def __init__(self, dtmac, replica: Optional[int] = None):
         # Define topics this agent is interested in
         topics = [
             "trading_signals",
@@ -26,12 +30,17 @@ class TradeAdvisorAgent(BaseAgent):
             "economic_data",
             "risk_alerts"
         ]
-        super().__init__("trade_advisor", dtmac, topics)
+        super().__init__("trade_advisor", dtmac, topics, replica)
         
         # Register specific message handlers
-        self.dtmac.register_handler(self.agent_id, "strategy_update", self.handle_strategy_update)
-        self.dtmac.register_handler(self.agent_id, "economic_update", self.handle_economic_update)
-        self.dtmac.register_handler(self.agent_id, "risk_alert", self.handle_risk_alert)
+        self.dtmac.register_handler(self.agent_id, "strategy_update", self.handle_strategy_update, replay=True)
+        self.dtmac.register_handler(self.agent_id, "economic_update", self.handle_economic_update, replay=True)
+        self.dtmac.register_handler(self.agent_id, "risk_alert", self.handle_risk_alert, replay=True)
+        self.dtmac.register_handler(self.agent_id, "advice_request", self.handle_advice_request)
+        
+        # Only the latest queued strategy update / risk alert per symbol is worth handling
+        self.dtmac.configure_mailbox(self.agent_id, capacity=1000, overflow_policy=OverflowPolicy.COALESCE,
+                                     coalesce_key=self.coalesce_key)
         
         # Initialize agent state
         self.advice = {}
@@ -42,6 +51,13 @@ class TradeAdvisorAgent(BaseAgent):
         os.makedirs(self.data_archive, exist_ok=True)
         os.makedirs(self.predictions_archive, exist_ok=True)
     
+    @staticmethod
+    def coalesce_key(message: DTMessage):
+        """Coalesce strategy updates and risk alerts per symbol; every other message is handled"""
+        if message.message_type not in ("strategy_update", "risk_alert"):
+            return None
+        return symbol_coalesce_key(message)
+    
     async def get_status(self) -> Dict[str, Any]:
         return {
             "status": "active",
@@ -129,6 +145,24 @@ class TradeAdvisorAgent(BaseAgent):
                 priority=MessagePriority.HIGH
             )
     
+    async def handle_advice_request(self, message: DTMessage):
+        """Handle trade advice requests"""
+        symbol = message.content.get("symbol")
+        
+        # The recommendation is computed from archived data with pandas, keep it off the event loop
+        recommendation = await self.run_blocking(self.get_trading_recommendation, symbol)
+        
+        await self.reply(
+            message,
+            content={
+                "symbol": symbol,
+                "recommendation": recommendation,
+                "timestamp": datetime.now().isoformat()
+            },
+            message_type="advice_response",
+            priority=MessagePriority.NORMAL
+        )
+    
     async def generate_advice(self, strategy_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate trading advice based on strategy and market conditions"""
         advice = {
@@ -336,21 +370,16 @@ class TradeAdvisorAgent(BaseAgent):
         Analyze earnings call transcript for a ticker
         """
         try:
-            # If quarter not specified, look for the most recent transcript
+            # If quarter not specified, use the most recent stored transcript
             if quarter is None:
-                files = [f for f in os.listdir(self.data_archive) if f.startswith(f"{ticker}_earnings_transcript_") and f.endswith('.json')]
-                if not files:
+                quarters = transcript_store.quarters(ticker)
+                if not quarters:
                     return {"error": f"No earnings transcript found for {ticker}"}
-                
-                file_path = os.path.join(self.data_archive, sorted(files)[-1])
+                data = transcript_store.get(ticker, quarters[0])
             else:
-                quarter_clean = quarter.replace(' ', '_').replace('/', '_')
-                file_path = os.path.join(self.data_archive, f"{ticker}_earnings_transcript_{quarter_clean}.json")
-                if not os.path.exists(file_path):
-                    return {"error": f"No earnings transcript found for {ticker} {quarter}"}
-            
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+                data = transcript_store.get(ticker, quarter)
+            if data is None:
+                return {"error": f"No earnings transcript found for {ticker}" + (f" {quarter}" if quarter else "")}
             
             if 'transcript' not in data:
                 return {"error": "Invalid transcript data format"}
@@ -358,7 +387,9 @@ class TradeAdvisorAgent(BaseAgent):
             transcript = data.get('transcript', '')
             # Handle case where transcript might be a list
             if isinstance(transcript, list):
-                transcript = ' '.join(transcript)
+                # Alpha Vantage returns one {speaker, title, content, ...} entry per remark
+                transcript = ' '.join(part.get('content', '') if isinstance(part, dict) else str(part)
+                                      for part in transcript)
             quarter_info = data.get('quarter', '')
             year = data.get('year', '')
             
@@ -9,6 +9,7 @@ from datetime import datetime
 import asyncio
 from .base_agent import BaseAgent
 from .dtmac import MessagePriority, DTMessage
+from .topics import symbol_topic
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,9 @@ class TradeStrategyAgent(BaseAgent):
     analyzed data and market trends.
     """
 
-    def __init__(self, dtmac):
+    state_attributes = ("strategies", "last_update")
+
+    def __init__(self, dtmac, replica: Optional[int] = None):
         # Define topics this agent is interested in
         topics = [
             "analysis_results",
@@ -26,11 +29,11 @@ class TradeStrategyAgent(BaseAgent):
             "risk_alerts",
             "trading_signals"
         ]
-        super().__init__("trade_strategy", dtmac, topics)
+        super().__init__("trade_strategy", dtmac, topics, replica)
         
         # Register specific message handlers
-        self.dtmac.register_handler(self.agent_id, "analysis_complete", self.handle_analysis)
-        self.dtmac.register_handler(self.agent_id, "risk_alert", self.handle_risk_alert)
+        self.dtmac.register_handler(self.agent_id, "analysis_complete", self.handle_analysis, replay=True)
+        self.dtmac.register_handler(self.agent_id, "risk_alert", self.handle_risk_alert, replay=True)
         
         # Initialize agent state
         self.strategies = {}
@@ -63,7 +66,7 @@ class TradeStrategyAgent(BaseAgent):
         
         # Broadcast strategies to interested agents
         await self.broadcast_to_topic(
-            topic="trading_signals",
+            topic=symbol_topic("trading_signals", symbol),
             content={
                 "symbol": symbol,
                 "strategies": strategies,
@@ -90,7 +93,7 @@ class TradeStrategyAgent(BaseAgent):
             
             # Notify other agents of adjusted strategies
             await self.broadcast_to_topic(
-                topic="trading_signals",
+                topic=symbol_topic("trading_signals", symbol),
                 content={
                     "symbol": symbol,
                     "strategies": adjusted_strategies,
@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .codec import pack, unpack, message_to_fields, message_from_fields
+from .dtmac import DTMAC, DTMessage
+from .sharding import HashRing, symbol_shard_key
+
+logger = logging.getLogger(__name__)
+
+# Frame kinds; every frame is pack([kind, agent ID or topic, message fields])
+_HELLO = 1      # worker -> parent: [agent ID, topics] once the agent is constructed
+_DELIVER = 2    # parent -> worker: message for the hosted agent
+_SEND = 3       # worker -> parent: message for agents hosted elsewhere
+_BROADCAST = 4  # worker -> parent: message for every subscriber of a topic
+_SUBSCRIBE = 5  # worker -> parent: [agent ID, topics] subscribed to after registering
+_UNSUBSCRIBE = 6  # worker -> parent: [agent ID, topics] unsubscribed from
+
+
+class Transport(ABC):
+    """Carries DTMAC messages to agents hosted outside the local event loop"""
+
+    @abstractmethod
+    async def deliver(self, agent_id: str, message: DTMessage):
+        """Deliver a message to an agent hosted by this transport"""
+        pass
+
+    async def stop(self):
+        """Release the transport's resources"""
+        pass
+
+
+def _read_frames(conn, loop: asyncio.AbstractEventLoop, inbox: asyncio.Queue):
+    """Blocking reader thread: hand every frame received on conn to the event loop"""
+    try:
+        while True:
+            data = conn.recv_bytes()
+            loop.call_soon_threadsafe(inbox.put_nowait, data)
+    except (EOFError, OSError):
+        pass
+    try:
+        loop.call_soon_threadsafe(inbox.put_nowait, None)
+    except RuntimeError:
+        pass  # Event loop already closed
+
+
+class _FrameWriter:
+    """Sends frames on a pipe from a dedicated thread, in call order, without blocking the event loop"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dtmac-pipe")
+
+    async def send(self, frame: bytes):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.conn.send_bytes, frame)
+
+    def send_nowait(self, frame: bytes):
+        """Queue a frame behind the ones already being sent, without waiting for it"""
+        self._executor.submit(self.conn.send_bytes, frame)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class _Worker:
+    """Parent-side handle on one agent worker process"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.writer = _FrameWriter(conn)
+        self.agent_id: Optional[str] = None
+        self.name: Optional[str] = None  # Replica name on the pool's hash ring
+        self.hello: Optional[asyncio.Future] = None
+        self._pump: Optional[asyncio.Task] = None
+
+    def start(self, handle_frame):
+        loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+        self.hello = loop.create_future()
+        threading.Thread(target=_read_frames, args=(self.conn, loop, inbox), daemon=True).start()
+        self._pump = asyncio.create_task(self._pump_frames(inbox, handle_frame))
+
+    async def send_frame(self, frame: bytes):
+        await self.writer.send(frame)
+
+    async def _pump_frames(self, inbox: asyncio.Queue, handle_frame):
+        """Process frames from the worker strictly in the order they were sent"""
+        while True:
+            data = await inbox.get()
+            if data is None:
+                if not self.hello.done():
+                    self.hello.set_exception(RuntimeError("Agent worker exited before registering"))
+                logger.info(f"Agent worker {self.agent_id} (pid {self.process.pid}) disconnected")
+                return
+            try:
+                await handle_frame(self, unpack(data))
+            except Exception as e:
+                logger.error(f"Error handling frame from agent worker {self.agent_id}: {e}", exc_info=True)
+
+    async def stop(self, timeout: float = 5.0):
+        self.writer.close()
+        self.conn.close()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.process.join, timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self._pump is not None:
+            self._pump.cancel()
+
+
+class ProcessTransport(Transport):
+    """
+    Hosts agents, or pools of agent replicas, in worker processes.
+
+    Each worker runs its own event loop and DTMAC with the agent registered
+    locally, so CPU-heavy handlers no longer block the parent's message
+    handling. Frames travel over multiprocessing pipes encoded with
+    agents.codec. Sends and broadcasts made inside a worker are routed by the
+    parent DTMAC, so BaseAgent.send_to_agent/broadcast_to_topic behave as if
+    every agent shared one bus; the agent's start() runs in the worker once
+    it is registered, and later subscription changes reach the parent. In a replica pool, messages about a symbol
+    always go to the same replica (consistent hashing, so spawning more
+    replicas later only moves the symbols they take over); messages without a
+    symbol go to all of them.
+    """
+
+    def __init__(self, dtmac: DTMAC, start_method: str = "spawn"):
+        self.dtmac = dtmac
+        self._context = multiprocessing.get_context(start_method)
+        self._pools: Dict[str, List[_Worker]] = {}  # Agent ID -> worker replicas
+        self._rings: Dict[str, HashRing] = {}  # Agent ID -> ring of replica names
+        self._replicas: Dict[str, _Worker] = {}  # Replica name -> worker
+
+    async def spawn(self, agent_class, replicas: int = 1, timeout: float = 60.0, **agent_kwargs) -> str:
+        """Start replicas of an agent in worker processes and register them with DTMAC.
+
+        agent_class is constructed in each worker as agent_class(dtmac, **agent_kwargs),
+        so it and its arguments must be importable/picklable. Returns the agent ID.
+        """
+        workers = []
+        for _ in range(replicas):
+            parent_conn, child_conn = self._context.Pipe()
+            process = self._context.Process(
+                target=_worker_main,
+                args=(child_conn, agent_class, agent_kwargs),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            worker = _Worker(process, parent_conn)
+            worker.start(self._handle_frame)
+            workers.append(worker)
+
+        try:
+            hellos = await asyncio.wait_for(asyncio.gather(*(worker.hello for worker in workers)), timeout)
+        except BaseException:
+            await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+            raise
+
+        agent_id, topics = hellos[0]
+        pool = self._pools.setdefault(agent_id, [])
+        ring = self._rings.setdefault(agent_id, HashRing())
+        for worker in workers:
+            worker.name = f"{agent_id}#{len(pool)}"
+            pool.append(worker)
+            ring.add(worker.name)
+            self._replicas[worker.name] = worker
+        self.dtmac.register_remote_agent(agent_id, topics, self)
+        logger.info(f"Started {replicas} worker process(es) for {agent_id}")
+        return agent_id
+
+    def get_replica_count(self, agent_id: str) -> int:
+        return len(self._pools.get(agent_id, []))
+
+    async def deliver(self, agent_id: str, message: DTMessage):
+        workers = self._pools.get(agent_id)
+        if not workers:
+            return
+        frame = pack([_DELIVER, agent_id, message_to_fields(message)])
+        key = symbol_shard_key(message) if len(workers) > 1 else None
+        if key is None:
+            for worker in workers:
+                await worker.send_frame(frame)
+        else:
+            await self._replicas[self._rings[agent_id].get(key)].send_frame(frame)
+
+    async def _handle_frame(self, worker: _Worker, frame: List[Any]):
+        kind, target, fields = frame
+        if kind == _HELLO:
+            worker.agent_id = target
+            worker.hello.set_result((target, fields))
+        elif kind == _SEND:
+            await self.dtmac.route_message(message_from_fields(fields))
+        elif kind == _BROADCAST:
+            message = message_from_fields(fields)
+            message.recipients = list(self.dtmac.get_topic_subscribers(target))
+            if message.recipients:
+                await self.dtmac.route_message(message)
+        elif kind == _SUBSCRIBE:
+            self.dtmac.subscribe(target, fields)
+        elif kind == _UNSUBSCRIBE:
+            self.dtmac.unsubscribe(target, fields)
+        else:
+            logger.warning(f"Unknown frame kind {kind} from agent worker {worker.agent_id}")
+
+    async def stop(self):
+        """Close the pipes and wait for the worker processes to exit"""
+        workers = [worker for pool in self._pools.values() for worker in pool]
+        self._pools.clear()
+        self._rings.clear()
+        self._replicas.clear()
+        await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+
+
+class WorkerUplink:
+    """Worker-side link handing messages for agents outside the worker to the parent"""
+
+    def __init__(self, conn):
+        self.writer = _FrameWriter(conn)
+        self.registered = False  # Subscription changes are forwarded once the parent knows the agent
+
+    async def forward(self, message: DTMessage, topic: Optional[str] = None):
+        if topic is None:
+            frame = pack([_SEND, None, message_to_fields(message)])
+        else:
+            frame = pack([_BROADCAST, topic, message_to_fields(message)])
+        await self.writer.send(frame)
+
+    def subscribe(self, agent_id: str, topics: List[str]):
+        if self.registered:
+            self.writer.send_nowait(pack([_SUBSCRIBE, agent_id, list(topics)]))
+
+    def unsubscribe(self, agent_id: str, topics: List[str]):
+        if self.registered:
+            self.writer.send_nowait(pack([_UNSUBSCRIBE, agent_id, list(topics)]))
+
+    def close(self):
+        self.writer.close()
+
+
+def _worker_main(conn, agent_class, agent_kwargs: Dict[str, Any]):
+    """Entry point of an agent worker process"""
+    try:
+        asyncio.run(_run_worker(conn, agent_class, agent_kwargs))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _run_worker(conn, agent_class, agent_kwargs: Dict[str, Any]):
+    loop = asyncio.get_running_loop()
+    dtmac = DTMAC()
+    uplink = dtmac.uplink = WorkerUplink(conn)
+    agent = agent_class(dtmac, **agent_kwargs)
+    await uplink.writer.send(pack([_HELLO, agent.agent_id, dtmac.get_agent_topics(agent.agent_id)]))
+    uplink.registered = True
+
+    # Registered with the parent, so the agent can set up its timers and subscriptions
+    started = asyncio.create_task(agent.start()) if hasattr(agent, "start") else None
+
+    inbox: asyncio.Queue = asyncio.Queue()
+    threading.Thread(target=_read_frames, args=(conn, loop, inbox), daemon=True).start()
+    while True:
+        data = await inbox.get()
+        if data is None:
+            break
+        kind, agent_id, fields = unpack(data)
+        if kind != _DELIVER:
+            logger.warning(f"Unexpected frame kind {kind} in agent worker {agent.agent_id}")
+            continue
+        message = message_from_fields(fields)
+        dtmac.message_history.append(message)
+        if not dtmac.resolve_response(message):
+            await dtmac.deliver_local(agent_id, message)
+
+    if started is not None and not started.done():
+        started.cancel()
+    if hasattr(agent, "stop"):
+        await agent.stop()
+    await dtmac.stop()
+    uplink.close()
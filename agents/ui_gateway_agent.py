@@ -0,0 +1,209 @@
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+from .base_agent import BaseAgent
+from .dtmac import DTMessage
+
+logger = logging.getLogger(__name__)
+
+# Messages pushed to browsers; anything else the gateway receives is ignored
+UI_MESSAGE_TYPES = (
+    "trading_advice",
+    "analysis_complete",
+    "strategy_update",
+    "risk_alert",
+    "risk_update",
+    "economic_update",
+    "analysis_stage"
+)
+
+UpdateKey = Tuple[str, str, str]  # Message type, symbol ("" if none), sender
+
+MARKET_ROOM = "market"  # Updates that are not about one symbol, e.g. economic data
+
+
+def ticker_room(symbol: str) -> str:
+    return f"ticker:{symbol}"
+
+
+def session_room(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def diff(old: Mapping[str, Any], new: Mapping[str, Any], path: Tuple[str, ...] = ()) -> Tuple[Dict[str, Any], List[List[str]]]:
+    """Changed or added values of new against old, nested dicts diffed recursively,
+    and the key paths removed from old"""
+    changes = {}
+    removed = []
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        if isinstance(value, Mapping) and isinstance(old.get(key), Mapping):
+            nested_changes, nested_removed = diff(old[key], value, path + (key,))
+            changes[key] = nested_changes
+            removed.extend(nested_removed)
+        else:
+            changes[key] = value
+    removed.extend([list(path + (key,)) for key in old if key not in new])
+    return changes, removed
+
+
+class UIGatewayAgent(BaseAgent):
+    """
+    UI Gateway Agent - Bridges DTMAC to browsers over SocketIO.
+
+    Updates are pushed to one room per ticker and, for messages carrying a
+    session_id in their metadata, to that session's room. Within a flush
+    interval only the latest update per room, message type, symbol and sender
+    is kept; each flush then sends one batch per room holding, per update,
+    only what changed since that room was last sent it. The state of a ticker
+    or session room is forgotten once it has been idle for room_ttl seconds,
+    or when more than max_rooms are kept (least recently used first), so
+    rooms of sessions that never connect don't accumulate; a forgotten room's
+    next update is sent in full.
+    """
+
+    def __init__(self,
+                 dtmac,
+                 emit: Callable[[str, Dict[str, Any], str], None],
+                 flush_interval: float = 0.25,
+                 replica: Optional[int] = None,
+                 room_ttl: float = 60 * 60,
+                 max_rooms: int = 1000):
+        """
+        Args:
+            emit: Called as emit(event, data, room) to push to a SocketIO room
+            flush_interval: Seconds updates are batched for
+            room_ttl: Seconds an idle ticker or session room's state is kept
+            max_rooms: Most ticker and session rooms whose state is kept
+        """
+        # Define topics this agent is interested in
+        topics = [
+            "analysis_results",
+            "trading_signals",
+            "risk_alerts",
+            "economic_data"
+        ]
+        super().__init__("ui_agent", dtmac, topics, replica)
+
+        for message_type in UI_MESSAGE_TYPES:
+            self.dtmac.register_handler(self.agent_id, message_type, self.handle_update)
+
+        self.emit = emit
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Dict[UpdateKey, Dict[str, Any]]] = {}  # Room -> {key: latest content}
+        self._sent: Dict[str, Dict[UpdateKey, Dict[str, Any]]] = {}  # Room -> {key: content last sent}
+        self._versions: Dict[Tuple[str, UpdateKey], int] = {}  # (Room, key) -> updates sent, for gap detection
+        self._room_used: 'OrderedDict[str, float]' = OrderedDict()  # Room -> monotonic time last used, oldest first
+        self.room_ttl = room_ttl
+        self.max_rooms = max_rooms
+        self._flusher: Optional[asyncio.Task] = None
+        self.updates_received = 0
+        self.batches_sent = 0
+        self.last_update = None
+
+    async def get_status(self) -> Dict[str, Any]:
+        return {
+            "status": "active",
+            "last_update": self.last_update,
+            "updates_received": self.updates_received,
+            "batches_sent": self.batches_sent,
+            "rooms": len(self._sent),
+            "subscribed_topics": self.get_subscribed_topics()
+        }
+
+    async def handle_update(self, message: DTMessage):
+        """Queue a message for the rooms interested in it"""
+        symbol = message.content.get("symbol")
+        rooms = [ticker_room(symbol) if symbol else MARKET_ROOM]
+        if message.metadata and message.metadata.get("session_id"):
+            rooms.append(session_room(message.metadata["session_id"]))
+
+        key = (message.message_type, symbol or "", message.sender)
+        # Copied so senders mutating their state afterwards can't hide changes from the diff
+        content = copy.deepcopy(dict(message.content))
+        for room in rooms:
+            self._pending.setdefault(room, {})[key] = content
+            self._touch(room)
+        self.updates_received += 1
+        self.last_update = datetime.now()
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_after_interval())
+
+    async def _flush_after_interval(self):
+        await asyncio.sleep(self.flush_interval)
+        self.flush()
+
+    def flush(self):
+        """Emit the batched updates of every room now"""
+        pending, self._pending = self._pending, {}
+        for room, updates in pending.items():
+            sent = self._sent.setdefault(room, {})
+            batch = []
+            for key, content in updates.items():
+                previous = sent.get(key)
+                version = self._versions.get((room, key), 0) + 1
+                update = {"type": key[0], "symbol": key[1] or None, "source": key[2], "version": version}
+                if previous is None:
+                    update.update(full=True, changes=content, removed=[])
+                else:
+                    changes, removed = diff(previous, content)
+                    if not changes and not removed:
+                        continue
+                    update.update(full=False, changes=changes, removed=removed)
+                batch.append(update)
+                sent[key] = content
+                self._versions[(room, key)] = version
+            if batch:
+                self._emit(room, batch)
+        self._expire_rooms()
+
+    def _emit(self, room: str, batch: List[Dict[str, Any]]):
+        try:
+            self.emit("dtmac_updates", {"room": room, "updates": batch}, room)
+            self.batches_sent += 1
+        except Exception as e:
+            logger.error(f"Error pushing updates to {room}: {e}", exc_info=True)
+
+    def room_state(self, room: str) -> Dict[str, Any]:
+        """Full latest state of a room, sent to a client when it joins so later deltas apply"""
+        if room in self._room_used:
+            self._touch(room)
+        updates = [
+            {"type": key[0], "symbol": key[1] or None, "source": key[2],
+             "version": self._versions.get((room, key), 0), "full": True, "changes": content, "removed": []}
+            for key, content in self._sent.get(room, {}).items()
+        ]
+        return {"room": room, "updates": updates}
+
+    def forget_room(self, room: str):
+        """Drop delta state kept for a room nobody listens to any more, e.g. a closed session"""
+        self._pending.pop(room, None)
+        self._room_used.pop(room, None)
+        for key in self._sent.pop(room, {}):
+            self._versions.pop((room, key), None)
+
+    def _touch(self, room: str):
+        if room != MARKET_ROOM:
+            self._room_used[room] = time.monotonic()
+            self._room_used.move_to_end(room)
+
+    def _expire_rooms(self):
+        """Forget rooms idle for longer than room_ttl, and the least recently used beyond max_rooms"""
+        now = time.monotonic()
+        while self._room_used:
+            room, used = next(iter(self._room_used.items()))
+            if now - used < self.room_ttl and len(self._room_used) <= self.max_rooms:
+                break
+            self.forget_room(room)
+
+    async def stop(self):
+        """Flush what is still batched"""
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        self.flush()
@@ -1,21 +1,22 @@
 import os
+import re
 import json
+import asyncio
+import threading
+import uuid
 import logging
 import numpy as np
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 import pandas as pd
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
-from agents.dtmac import DTMAC
-from agents.data_analyst_agent import DataAnalystAgent
-from agents.trade_strategy_agent import TradeStrategyAgent
-from agents.trade_advisor_agent import TradeAdvisorAgent
-from agents.risk_advisor_agent import RiskAdvisorAgent
+from agents.orchestrator import AgentOrchestrator
+from agents.ui_gateway_agent import MARKET_ROOM, session_room, ticker_room
 
-from services.historic_data import DataArchiver
 from services.stock_data import fetch_stock_basics
 from services.stock_overview import get_stock_overview, get_refined_data
+from services import alpha_vantage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -51,14 +52,40 @@ os.makedirs('strategies_archive', exist_ok=True)
 os.makedirs('predictions_archive', exist_ok=True)
 os.makedirs('risk_archive', exist_ok=True)
 
-# Initialize DTMAC
-dtmac = DTMAC()
+def json_safe(data):
+    """Copy of data with NumPy / pandas values converted for SocketIO"""
+    return json.loads(json.dumps(data, default=np_encoder))
 
-# Initialize agents with DTMAC
-data_analyst = DataAnalystAgent(dtmac)
-trade_strategy = TradeStrategyAgent(dtmac)
-trade_advisor = TradeAdvisorAgent(dtmac)
-risk_advisor = RiskAdvisorAgent(dtmac)
+def push_to_browsers(event, data, room):
+    """Emit to a SocketIO room"""
+    socketio.emit(event, json_safe(data), to=room)
+
+# Initialize the agents and their DTMAC
+orchestrator = AgentOrchestrator(ui_emit=push_to_browsers)
+dtmac = orchestrator.dtmac
+data_analyst = orchestrator.agents['data_analyst']
+ui_gateway = orchestrator.agents['ui_agent']
+
+# Agent message handling runs on its own event loop thread, independent of requests
+agent_loop = asyncio.new_event_loop()
+threading.Thread(target=agent_loop.run_forever, name='dtmac', daemon=True).start()
+asyncio.run_coroutine_threadsafe(orchestrator.start(), agent_loop)
+
+def call_on_agent_loop(func, *args, timeout=5.0):
+    """Call func on the agent loop thread, where agent state is safe to read"""
+    async def call():
+        return func(*args)
+    return asyncio.run_coroutine_threadsafe(call(), agent_loop).result(timeout)
+
+def publish_to_ui(agent_name, ticker, result, session_id=None):
+    """Send an agent's result to the UI gateway, which pushes it to the ticker's and session's rooms"""
+    asyncio.run_coroutine_threadsafe(dtmac.send_message(
+        sender=agent_name,
+        recipients=['ui_agent'],
+        content={'symbol': ticker, 'result': result},
+        message_type='analysis_stage',
+        metadata={'session_id': session_id} if session_id else None
+    ), agent_loop)
 
 # Default tickers for the dashboard
 DEFAULT_TICKERS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'JPM', 'V', 'WMT']
@@ -66,6 +93,65 @@ DEFAULT_TICKERS = ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'META', 'TSLA', 'NVDA', 'JPM
 # Default symbols for top stocks section
 DEFAULT_SYMBOLS = ['AAPL', 'AMZN', 'GOOGL', 'JPM', 'META', 'MSFT']
 
+# Most watchlist tickers analysed at once by one request
+MAX_WATCHLIST_CONCURRENCY = 32
+
+# Tickers a SocketIO client can subscribe to: letters and digits, optionally with a class or exchange suffix
+TICKER_PATTERN = re.compile(r'^[A-Z0-9^][A-Z0-9]{0,9}([.\-=][A-Z0-9]{1,4})?$')
+MAX_SUBSCRIPTIONS_PER_CLIENT = 20
+
+# Ticker -> SocketIO session IDs subscribed to it, and the reverse; risk_advisor watches a ticker while it has subscribers
+ticker_subscribers = {}
+client_subscriptions = {}
+subscriptions_lock = threading.Lock()
+
+# Session room -> SocketIO session IDs in it, and the reverse; the UI gateway forgets a room once it is empty
+session_room_members = {}
+client_session_rooms = {}
+
+def normalize_ticker(value):
+    """Upper-cased ticker, or None if it does not look like one"""
+    ticker = str(value or '').strip().upper()
+    return ticker if TICKER_PATTERN.match(ticker) else None
+
+def set_risk_watch(ticker, watch):
+    """Start or stop risk_advisor's periodic re-scoring of a ticker"""
+    asyncio.run_coroutine_threadsafe(dtmac.send_message(
+        sender='ui_agent',
+        recipients=['risk_advisor'],
+        content={'symbol': ticker, 'watch': watch},
+        message_type='watch_symbol'
+    ), agent_loop)
+
+def drop_subscription(sid, ticker):
+    """Forget a client's subscription; unwatch the ticker when its last subscriber leaves"""
+    with subscriptions_lock:
+        client_subscriptions.get(sid, set()).discard(ticker)
+        subscribers = ticker_subscribers.get(ticker)
+        if subscribers is None or sid not in subscribers:
+            return
+        subscribers.discard(sid)
+        last = not subscribers
+        if last:
+            del ticker_subscribers[ticker]
+    if last:
+        set_risk_watch(ticker, False)
+        call_on_agent_loop(ui_gateway.forget_room, ticker_room(ticker))
+
+def leave_session_room(sid):
+    """Forget a client's session room membership; drop the room's state when its last member leaves"""
+    with subscriptions_lock:
+        room = client_session_rooms.pop(sid, None)
+        members = session_room_members.get(room)
+        if members is None:
+            return
+        members.discard(sid)
+        last = not members
+        if last:
+            del session_room_members[room]
+    if last:
+        call_on_agent_loop(ui_gateway.forget_room, room)
+
 @app.route('/')
 def index():
     """Render the main dashboard"""
@@ -107,15 +193,17 @@ def analyze():
     """Handle analysis request and render results page"""
     if request.method == 'POST':
         # Get form inputs
-        ticker = request.form.get('ticker', 'AAPL')
+        ticker = request.form.get('ticker', 'AAPL').strip().upper()
         start_date = request.form.get('start_date', (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'))
         end_date = request.form.get('end_date', datetime.now().strftime('%Y-%m-%d'))
         quarter = request.form.get('quarter', '2023Q1')
         
-        save_historic_data = DataArchiver()
-        historic_data = save_historic_data.archive_historic_data(ticker, start_date, end_date)
+        # Archive through the analysis pipeline so the agents reuse it
+        archive = asyncio.run(orchestrator.run_analysis(ticker, start_date, end_date, stages=['archive']))['archive']
+        historic_data = archive.get('path', archive.get('error'))
         
         # Save inputs to session
+        session.setdefault('session_id', uuid.uuid4().hex)
         session['analysis_inputs'] = {
             'ticker': ticker,
             'start_date': start_date,
@@ -139,6 +227,181 @@ def analyze():
     
     return render_template('index.html')
 
+ANALYSIS_AGENTS = ['data_analyst', 'trade_strategy', 'trade_advisor', 'risk_advisor']
+
+def format_data_analyst(ticker, raw_stock_data):
+    """Build the data analyst's frontend result from its stock overview"""
+    if raw_stock_data is None or raw_stock_data.get('error'):
+        error = raw_stock_data['error'] if raw_stock_data else 'Failed to fetch stock data'
+        if raw_stock_data is None:
+            logger.error("Stock overview returned None")
+        else:
+            logger.warning(f"Error in stock overview: {error}")
+        return {
+            'status': 'error',
+            'message': error,
+            'data': {
+                'company_info': {
+                    'ticker': ticker,
+                    'name': 'N/A',
+                    'sector': 'N/A',
+                    'industry': 'N/A'
+                },
+                'error': error
+            }
+        }
+    
+    company_info = raw_stock_data.get('company_info', {})
+    try:
+        # Transform data for frontend
+        frontend_data = data_analyst.get_refined_data(raw_stock_data)
+        if not frontend_data.get('error'):
+            return {
+                'status': 'completed',
+                'data': frontend_data
+            }
+        logger.warning(f"Error in data transformation: {frontend_data['error']}")
+        error, message = frontend_data['error'], frontend_data['error']
+    except Exception as e:
+        logger.error(f"Error transforming data: {str(e)}")
+        error, message = f"Error transforming data: {str(e)}", str(e)
+    
+    return {
+        'status': 'error',
+        'message': message,
+        'data': {
+            'company_info': {
+                'ticker': ticker,
+                'name': company_info.get('name', 'N/A'),
+                'sector': company_info.get('sector', 'N/A'),
+                'industry': company_info.get('industry', 'N/A')
+            },
+            'error': error
+        }
+    }
+
+def format_trade_strategy(strategies):
+    """Build the trade strategy frontend result from the MA and RSI strategies"""
+    if 'error' in strategies:
+        logger.error(f"Error in strategy calculation: {strategies['error']}")
+        return {
+            'status': 'error',
+            'error': strategies['error'],
+            'ma_error': strategies.get('ma_error'),
+            'rsi_error': strategies.get('rsi_error')
+        }
+    
+    # Structure the response as expected by frontend
+    return {
+        'status': 'completed',
+        'data': {
+            'ma_strategy': strategies['ma_strategy'],
+            'rsi_strategy': strategies['rsi_strategy']
+        }
+    }
+
+def format_trade_advisor(ticker, recommendation):
+    """Build the trade advisor frontend result from a trading recommendation"""
+    if 'error' in recommendation:
+        logger.error(f"Error in trading recommendation: {recommendation['error']}")
+        return {
+            'status': 'completed',
+            'recommendation': {
+                'error': recommendation['error'],
+                'ticker': ticker
+            }
+        }
+    
+    logger.info(f"Successfully generated recommendation for {ticker}")
+    
+    # Map the signals to sentiment
+    signal_to_sentiment = {
+        'BUY': 'bullish',
+        'SELL': 'bearish',
+        'HOLD': 'neutral'
+    }
+    
+    # Get the technical indicators
+    tech_indicators = recommendation.get('technical_indicators', {})
+    
+    # Calculate confidence based on multiple factors
+    rsi_confidence = abs(tech_indicators.get('rsi', 50) - 50) * 2  # RSI deviation from neutral
+    macd_confidence = 100 if tech_indicators.get('macd', 0) > tech_indicators.get('macd_signal', 0) else 0
+    momentum_confidence = min(abs(tech_indicators.get('momentum', 0) * 100), 100)  # Scale momentum to 0-100
+    
+    # Average confidence
+    confidence = (rsi_confidence + macd_confidence + momentum_confidence) / 3
+    
+    return {
+        'status': 'completed',
+        'recommendation': {
+            'ticker': ticker,
+            'signal': signal_to_sentiment.get(recommendation['overall'], 'neutral'),
+            'confidence': round(confidence, 2),
+            'technical_analysis': {
+                'current_price': round(tech_indicators.get('close', 0), 2),
+                'RSI': round(tech_indicators.get('rsi', 0), 2),
+                'MA20': None,  # Add if available
+                'MA50': None,  # Add if available
+                'MA200': None,  # Add if available
+                'overall_signal': recommendation['overall']
+            },
+            'sentiment_analysis': {
+                'sentiment': 'neutral',  # Add actual sentiment if available
+                'sentiment_score': 0,  # Add actual score if available
+                'articles_count': 0  # Add actual count if available
+            },
+            'price_momentum': {
+                'momentum': tech_indicators.get('momentum', 0),
+                'error': None
+            },
+            'earnings_analysis': {
+                'quarter': recommendation.get('timestamp', '').split('T')[0],
+                'summary': "Latest technical analysis indicates " + 
+                         f"RSI at {round(tech_indicators.get('rsi', 0), 2)}, " +
+                         f"MACD at {round(tech_indicators.get('macd', 0), 2)}, " +
+                         f"with {round(tech_indicators.get('momentum', 0) * 100, 2)}% momentum.",
+                'error': None
+            }
+        }
+    }
+
+def format_risk_advisor(risk_assessment):
+    """Build the risk advisor frontend result from a risk assessment"""
+    return {
+        'status': 'completed',
+        'risk_assessment': risk_assessment
+    }
+
+def format_agent_result(agent_name, ticker, result):
+    """Frontend result of one analysis pipeline stage"""
+    if agent_name == 'data_analyst':
+        return format_data_analyst(ticker, result)
+    if agent_name == 'trade_strategy':
+        return format_trade_strategy(result)
+    if agent_name == 'trade_advisor':
+        return format_trade_advisor(ticker, result)
+    return format_risk_advisor(result)
+
+def run_analysis(inputs, stages=None):
+    """Run (part of) the analysis pipeline for the session's inputs from a request thread.
+    
+    Returns each agent's frontend result; each is also pushed to the browser as
+    soon as its stage finishes.
+    """
+    formatted = {}
+    session_id = session.get('session_id')
+    
+    def on_result(stage, result):
+        if stage in ANALYSIS_AGENTS:
+            formatted[stage] = format_agent_result(stage, inputs['ticker'], result)
+            publish_to_ui(stage, inputs['ticker'], formatted[stage], session_id)
+    
+    asyncio.run(orchestrator.run_analysis(
+        inputs['ticker'], inputs['start_date'], inputs['end_date'], stages=stages, on_result=on_result
+    ))
+    return formatted
+
 @app.route('/run_agent/<agent_name>', methods=['POST'])
 def run_agent(agent_name):
     """Run a specific agent and return its results"""
@@ -149,238 +412,19 @@ def run_agent(agent_name):
     results = session.get('analysis_results', {})
     
     try:
-        if agent_name == 'data_analyst':
-            logger.info(f"Starting data analysis for {inputs['ticker']}")
-            
-            # Run data analyst agent
-            raw_stock_data = data_analyst.get_stock_overview(inputs['ticker'])
-            
-            # Initialize the result structure
-            results['data_analyst'] = {
-                'status': 'processing',  # Start with processing status
-                'data': {}
-            }
-            
-            # Handle stock overview errors
-            if raw_stock_data is None:
-                logger.error("Stock overview returned None")
-                results['data_analyst'].update({
-                    'status': 'error',
-                    'message': 'Failed to fetch stock data',
-                    'data': {
-                        'company_info': {
-                            'ticker': inputs['ticker'],
-                            'name': 'N/A',
-                            'sector': 'N/A',
-                            'industry': 'N/A'
-                        },
-                        'error': 'Failed to fetch stock data'
-                    }
-                })
-            elif raw_stock_data.get('error'):
-                logger.warning(f"Error in stock overview: {raw_stock_data['error']}")
-                results['data_analyst'].update({
-                    'status': 'error',
-                    'message': raw_stock_data['error'],
-                    'data': {
-                        'company_info': {
-                            'ticker': inputs['ticker'],
-                            'name': 'N/A',
-                            'sector': 'N/A',
-                            'industry': 'N/A'
-                        },
-                        'error': raw_stock_data['error']
-                    }
-                })
-            else:
-                # Transform data for frontend
-                try:
-                    frontend_data = data_analyst.get_refined_data(raw_stock_data)
-                    if frontend_data.get('error'):
-                        logger.warning(f"Error in data transformation: {frontend_data['error']}")
-                        results['data_analyst'].update({
-                            'status': 'error',
-                            'message': frontend_data['error'],
-                            'data': {
-                                'company_info': {
-                                    'ticker': inputs['ticker'],
-                                    'name': raw_stock_data.get('company_info', {}).get('name', 'N/A'),
-                                    'sector': raw_stock_data.get('company_info', {}).get('sector', 'N/A'),
-                                    'industry': raw_stock_data.get('company_info', {}).get('industry', 'N/A')
-                                },
-                                'error': frontend_data['error']
-                            }
-                        })
-                    else:
-                        results['data_analyst'].update({
-                            'status': 'completed',
-                            'data': frontend_data
-                        })
-                except Exception as e:
-                    logger.error(f"Error transforming data: {str(e)}")
-                    results['data_analyst'].update({
-                        'status': 'error',
-                        'message': str(e),
-                        'data': {
-                            'company_info': {
-                                'ticker': inputs['ticker'],
-                                'name': raw_stock_data.get('company_info', {}).get('name', 'N/A'),
-                                'sector': raw_stock_data.get('company_info', {}).get('sector', 'N/A'),
-                                'industry': raw_stock_data.get('company_info', {}).get('industry', 'N/A')
-                            },
-                            'error': f"Error transforming data: {str(e)}"
-                        }
-                    })
-            
-            # Always set next agent unless there's a critical error
-            if results['data_analyst']['status'] != 'error':
-                results['current_agent'] = 'trade_strategy'
-            else:
-                results['current_agent'] = 'failed'
-            
-            # Save results to session
-            session['analysis_results'] = results
-            
-            return jsonify({
-                'status': 'success',
-                'results': results
-            })
-            
-        elif agent_name == 'trade_strategy':
-            # Run trade strategy agent
-            try:
-                # Get both strategies
-                ma_strategy = trade_strategy.moving_average_crossover_strategy(inputs['ticker'])
-                rsi_strategy = trade_strategy.rsi_strategy(inputs['ticker'])
-            
-                # Check for errors in either strategy
-                if 'error' in ma_strategy or 'error' in rsi_strategy:
-                    logger.error("Error in strategy calculation")
-                    results['trade_strategy'] = {
-                        'status': 'error',
-                        'error': 'Strategy calculation failed',
-                        'ma_error': ma_strategy.get('error'),
-                        'rsi_error': rsi_strategy.get('error')
-                    }
-                else:
-                    # Structure the response as expected by frontend
-                    results['trade_strategy'] = {
-                            'status': 'completed',
-                                'data': {
-                            'ma_strategy': ma_strategy,
-                            'rsi_strategy': rsi_strategy
-                        }
-                    }
-            
-            except Exception as e:
-                logger.error(f"Error in trade strategy: {str(e)}")
-                results['trade_strategy'] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
-            
-            if results['trade_strategy']['status'] != 'error':
-                results['current_agent'] = 'trade_advisor'
-            else:
-                results['current_agent'] = 'failed'
-            
-        elif agent_name == 'trade_advisor':
-            logger.info(f"Starting trade advisor analysis for {inputs['ticker']}")
-            try:
-                # Get trading recommendation
-                recommendation = trade_advisor.get_trading_recommendation(inputs['ticker'])
-            
-                if 'error' in recommendation:
-                    logger.error(f"Error in trading recommendation: {recommendation['error']}")
-                    results['trade_advisor'] = {
-                        'status': 'completed',
-                        'recommendation': {
-                            'error': recommendation['error'],
-                            'ticker': inputs['ticker']
-                        }
-                    }
-                else:
-                    logger.info(f"Successfully generated recommendation for {inputs['ticker']}")
-                    
-                    # Map the signals to sentiment
-                    signal_to_sentiment = {
-                        'BUY': 'bullish',
-                        'SELL': 'bearish',
-                        'HOLD': 'neutral'
-                    }
-                    
-                    # Get the technical indicators
-                    tech_indicators = recommendation.get('technical_indicators', {})
-                    
-                    # Calculate confidence based on multiple factors
-                    rsi_confidence = abs(tech_indicators.get('rsi', 50) - 50) * 2  # RSI deviation from neutral
-                    macd_confidence = 100 if tech_indicators.get('macd', 0) > tech_indicators.get('macd_signal', 0) else 0
-                    momentum_confidence = min(abs(tech_indicators.get('momentum', 0) * 100), 100)  # Scale momentum to 0-100
-                    
-                    # Average confidence
-                    confidence = (rsi_confidence + macd_confidence + momentum_confidence) / 3
-                    
-                    results['trade_advisor'] = {
-                        'status': 'completed',
-                        'recommendation': {
-                            'ticker': inputs['ticker'],
-                            'signal': signal_to_sentiment.get(recommendation['overall'], 'neutral'),
-                            'confidence': round(confidence, 2),
-                            'technical_analysis': {
-                                'current_price': round(tech_indicators.get('close', 0), 2),
-                                'RSI': round(tech_indicators.get('rsi', 0), 2),
-                                'MA20': None,  # Add if available
-                                'MA50': None,  # Add if available
-                                'MA200': None,  # Add if available
-                                'overall_signal': recommendation['overall']
-                            },
-                            'sentiment_analysis': {
-                                'sentiment': 'neutral',  # Add actual sentiment if available
-                                'sentiment_score': 0,  # Add actual score if available
-                                'articles_count': 0  # Add actual count if available
-                            },
-                            'price_momentum': {
-                                'momentum': tech_indicators.get('momentum', 0),
-                                'error': None
-                            },
-                            'earnings_analysis': {
-                                'quarter': recommendation.get('timestamp', '').split('T')[0],
-                                'summary': "Latest technical analysis indicates " + 
-                                         f"RSI at {round(tech_indicators.get('rsi', 0), 2)}, " +
-                                         f"MACD at {round(tech_indicators.get('macd', 0), 2)}, " +
-                                         f"with {round(tech_indicators.get('momentum', 0) * 100, 2)}% momentum.",
-                                'error': None
-                            }
-                        }
-                    }
-            except Exception as e:
-                logger.error(f"Error in trade advisor: {str(e)}", exc_info=True)
-                results['trade_advisor'] = {
-                    'status': 'completed',
-                    'recommendation': {
-                        'error': str(e),
-                        'ticker': inputs['ticker']
-                    }
-                }
-            
-            if results['trade_advisor']['status'] != 'error':
-                results['current_agent'] = 'risk_advisor'
-            else:
-                results['current_agent'] = 'failed'
-            
-        elif agent_name == 'risk_advisor':
-            # Run risk advisor agent
-            try:
-                risk_assessment = risk_advisor.analyze_risk(inputs['ticker'])
-            except Exception as e:
-                logger.error(f"Error in risk assessment: {str(e)}")
-                risk_assessment = {'error': str(e)}
-            
-            results['risk_advisor'] = {
-                'status': 'completed',
-                'risk_assessment': risk_assessment
-            }
+        if agent_name not in ANALYSIS_AGENTS:
+            raise ValueError(f"Unknown agent: {agent_name}")
+        
+        logger.info(f"Running {agent_name} for {inputs['ticker']}")
+        results[agent_name] = run_analysis(inputs, stages=[agent_name])[agent_name]
+        
+        # Move on to the next agent unless this one failed
+        if results[agent_name]['status'] == 'error':
+            results['current_agent'] = 'failed'
+        elif agent_name == ANALYSIS_AGENTS[-1]:
             results['current_agent'] = 'completed'
+        else:
+            results['current_agent'] = ANALYSIS_AGENTS[ANALYSIS_AGENTS.index(agent_name) + 1]
             
         # Save results to session
         session['analysis_results'] = results
@@ -418,6 +462,38 @@ def run_agent(agent_name):
                 'results': results
         })
 
+@app.route('/run_all_agents', methods=['POST'])
+def run_all_agents():
+    """Run the whole analysis pipeline in one call; independent agents run concurrently"""
+    if 'analysis_inputs' not in session:
+        return jsonify({'error': 'No analysis in progress. Please start a new analysis.'})
+    
+    inputs = session['analysis_inputs']
+    results = session.get('analysis_results', {})
+    
+    try:
+        logger.info(f"Running the analysis pipeline for {inputs['ticker']}")
+        agent_results = run_analysis(inputs)
+    except Exception as e:
+        logger.error(f"Error running the analysis pipeline: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': f"Error running the analysis pipeline: {str(e)}",
+            'results': results
+        })
+    
+    for agent_name in ANALYSIS_AGENTS:
+        results[agent_name] = agent_results[agent_name]
+    failed = any(results[agent_name]['status'] == 'error' for agent_name in ANALYSIS_AGENTS)
+    results['current_agent'] = 'failed' if failed else 'completed'
+    
+    session['analysis_results'] = results
+    
+    return jsonify({
+        'status': 'success',
+        'results': results
+    })
+
 
 @app.route('/technical_indicators', methods=['GET', 'POST'])
 def technical_indicators():
@@ -534,7 +610,7 @@ def top_stocks_api():
     try:
         from services.stock_data import fetch_stock_basics
         import concurrent.futures
-        import yfinance as yf
+        from services.yf_cache import get_info, get_history
         
         logger.info("Fetching top stocks data...")
         stocks_list = []
@@ -546,8 +622,7 @@ def top_stocks_api():
                 stock_data = fetch_stock_basics(symbol)
                 
                 # Get company info
-                ticker = yf.Ticker(symbol)
-                info = ticker.info
+                info = get_info(symbol)
                 
                 # Create complete stock data including company name and sector
                 stock_obj = {
@@ -575,7 +650,7 @@ def top_stocks_api():
                     stock_obj['percent_change'] = 0
                     
                 # Get recent price history for mini charts (7 days)
-                history = ticker.history(period="10d")
+                history = get_history(symbol, period="10d")
                 if not history.empty:
                     recent_prices = []
                     for date, row in history.iterrows():
@@ -627,10 +702,123 @@ def server_error(e):
 @socketio.on('connect')
 def handle_connect():
     logger.info('Client connected')
+    join_room(MARKET_ROOM)
+    if session.get('session_id'):
+        room = session_room(session['session_id'])
+        join_room(room)
+        with subscriptions_lock:
+            session_room_members.setdefault(room, set()).add(request.sid)
+            client_session_rooms[request.sid] = room
+        emit('dtmac_updates', json_safe(call_on_agent_loop(ui_gateway.room_state, room)))
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """Join a ticker's room; the client gets its current state, then deltas"""
+    ticker = normalize_ticker((data or {}).get('ticker'))
+    if ticker is None:
+        emit('subscribe_error', {'error': 'Invalid ticker'})
+        return
+    sid = request.sid
+    with subscriptions_lock:
+        tickers = client_subscriptions.setdefault(sid, set())
+        if ticker not in tickers and len(tickers) >= MAX_SUBSCRIPTIONS_PER_CLIENT:
+            emit('subscribe_error', {'ticker': ticker, 'error': f'At most {MAX_SUBSCRIPTIONS_PER_CLIENT} subscriptions'})
+            return
+        tickers.add(ticker)
+        subscribers = ticker_subscribers.setdefault(ticker, set())
+        first = not subscribers
+        subscribers.add(sid)
+    room = ticker_room(ticker)
+    join_room(room)
+    emit('dtmac_updates', json_safe(call_on_agent_loop(ui_gateway.room_state, room)))
+    if first:
+        # Keep the risk assessment of a ticker someone is looking at fresh
+        set_risk_watch(ticker, True)
+
+@socketio.on('unsubscribe')
+def handle_unsubscribe(data):
+    ticker = normalize_ticker((data or {}).get('ticker'))
+    if ticker:
+        leave_room(ticker_room(ticker))
+        drop_subscription(request.sid, ticker)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     logger.info('Client disconnected')
+    with subscriptions_lock:
+        tickers = client_subscriptions.pop(request.sid, set())
+    for ticker in tickers:
+        drop_subscription(request.sid, ticker)
+    leave_session_room(request.sid)
+
+def iterate_async(async_iterator):
+    """Drive an async iterator from a synchronous (streaming response) generator"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(async_iterator.aclose())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
+
+@app.route('/api/watchlist', methods=['POST'])
+def watchlist():
+    """Analyse a list of tickers, streaming one JSON line per ticker as it completes"""
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    tickers = payload.get('tickers', DEFAULT_TICKERS)
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    if not isinstance(tickers, list) or not all(isinstance(ticker, str) for ticker in tickers):
+        return jsonify({'error': 'tickers must be a list of strings'}), 400
+    tickers = [ticker.strip() for ticker in tickers if ticker.strip()]
+    invalid = [ticker for ticker in tickers if normalize_ticker(ticker) is None]
+    if invalid:
+        return jsonify({'error': f"Invalid tickers: {', '.join(invalid)}"}), 400
+    tickers = [normalize_ticker(ticker) for ticker in tickers]
+    analyses = payload.get('analyses')
+    if analyses is not None and (not isinstance(analyses, list)
+                                 or not all(isinstance(name, str) for name in analyses)):
+        return jsonify({'error': 'analyses must be a list of stage names'}), 400
+    start_date = payload.get('start_date', (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'))
+    end_date = payload.get('end_date', datetime.now().strftime('%Y-%m-%d'))
+    try:
+        concurrency = int(payload.get('concurrency', 8))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer'}), 400
+    concurrency = min(max(concurrency, 1), MAX_WATCHLIST_CONCURRENCY)
+    
+    if not tickers:
+        return jsonify({'error': 'No tickers given'}), 400
+    unknown = set(analyses or ()) - set(orchestrator.analysis_pipeline.stages)
+    if unknown:
+        return jsonify({'error': f"Unknown analyses: {', '.join(sorted(unknown))}"}), 400
+    
+    logger.info(f"Analysing a watchlist of {len(tickers)} tickers")
+    results = orchestrator.process_watchlist(tickers, start_date, end_date,
+                                             analyses=analyses, concurrency=concurrency)
+    
+    def generate():
+        for result in iterate_async(results):
+            yield json.dumps(result, default=np_encoder) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/dtmac/metrics')
+def dtmac_metrics():
+    """Message bus metrics: queue depth, latency and handler time histograms, rates and errors"""
+    agent_id = request.args.get('agent')
+    return jsonify(call_on_agent_loop(dtmac.get_metrics, agent_id))
+
+@app.route('/api/alpha_vantage/quota')
+def alpha_vantage_quota():
+    """Remaining Alpha Vantage budget of each API key and the scheduler's queue"""
+    return jsonify(alpha_vantage.scheduler.quota_state())
 
 @app.route('/about')
 def about():
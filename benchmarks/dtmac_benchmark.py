@@ -0,0 +1,412 @@
+"""
+Load generator and throughput benchmark for the DTMAC message bus.
+
+Synthetic BaseAgent subclasses with a configurable handler cost are wired
+into a random (seeded) topic topology, then driven with send_message,
+broadcast_to_topic or a mix of both. History queries are measured on their
+own. Everything runs in-process and offline; results are written as JSON so
+runs on different commits can be compared:
+
+    python benchmarks/dtmac_benchmark.py --output before.json
+    python benchmarks/dtmac_benchmark.py --compare before.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Get the absolute path to the project root
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.base_agent import BaseAgent
+from agents.dtmac import DTMAC, DTMessage, MessagePriority
+
+logger = logging.getLogger(__name__)
+
+RESULT_FORMAT = 1
+SCENARIOS = ("send", "broadcast", "mixed", "history")
+MESSAGE_TYPE = "bench"
+
+# Metric -> True if higher is better; compared by --compare
+COMPARED_METRICS = {
+    ("messages_per_sec",): True,
+    ("deliveries_per_sec",): True,
+    ("queries_per_sec",): True,
+    ("latency_us", "p50"): False,
+    ("latency_us", "p99"): False,
+    ("latency_us", "p999"): False,
+    ("memory", "growth_bytes"): False
+}
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """Exact p50/p99/p999 of samples, plus mean and max"""
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "p999": 0.0, "mean": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {
+        "p50": ordered[min(last, int(0.5 * len(ordered)))],
+        "p99": ordered[min(last, int(0.99 * len(ordered)))],
+        "p999": ordered[min(last, int(0.999 * len(ordered)))],
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1]
+    }
+
+
+class DeliveryRecorder:
+    """Counts deliveries and their latency (creation to handler start)"""
+
+    def __init__(self, window: int):
+        self.window = window  # Deliveries allowed in flight before the producer waits
+        self.latencies_ns: List[int] = []
+        self.sent = 0  # Deliveries expected so far
+        self._progress = asyncio.Event()
+
+    @property
+    def handled(self) -> int:
+        return len(self.latencies_ns)
+
+    def record(self, message: DTMessage):
+        self.latencies_ns.append(time.monotonic_ns() - message.timestamp_ns)
+        self._progress.set()
+
+    async def wait_for_window(self):
+        while self.sent - self.handled > self.window:
+            self._progress.clear()
+            await self._progress.wait()
+
+    async def wait_for_all(self):
+        while self.handled < self.sent:
+            self._progress.clear()
+            await self._progress.wait()
+
+
+class SyntheticAgent(BaseAgent):
+    """Agent whose handler only records the delivery and burns a fixed cost"""
+
+    def __init__(self, agent_id: str, dtmac: DTMAC, topics: List[str], recorder: DeliveryRecorder,
+                 handler_cost_us: float = 0.0, handler_sleep_us: float = 0.0):
+        super().__init__(agent_id, dtmac, topics)
+        self.recorder = recorder
+        self.handler_cost_ns = int(handler_cost_us * 1000)  # Busy CPU per message
+        self.handler_sleep = handler_sleep_us / 1e6  # Awaited I/O-like wait per message
+        self.dtmac.register_handler(self.agent_id, MESSAGE_TYPE, self.handle_bench)
+
+    async def get_status(self) -> Dict[str, Any]:
+        return {"agent_id": self.agent_id, "topics": self.get_subscribed_topics()}
+
+    async def handle_bench(self, message: DTMessage):
+        self.recorder.record(message)
+        if self.handler_cost_ns:
+            end = time.perf_counter_ns() + self.handler_cost_ns
+            while time.perf_counter_ns() < end:
+                pass
+        if self.handler_sleep:
+            await asyncio.sleep(self.handler_sleep)
+
+
+def build_topology(config: argparse.Namespace, rng: random.Random) -> List[Tuple[str, List[str]]]:
+    """(agent ID, subscribed topics) per synthetic agent.
+
+    Each subscription is a whole topic, a wildcard ("bench3.*") or a single
+    symbol's subtopic ("bench3.SYM7"), so broadcasts exercise every kind of match.
+    """
+    topology = []
+    for i in range(config.agents):
+        topics = []
+        for topic in rng.sample(range(config.topics), min(config.subscriptions, config.topics)):
+            kind = rng.random()
+            if kind < config.wildcard_ratio:
+                topics.append(f"bench{topic}.*")
+            elif kind < config.wildcard_ratio + config.symbol_ratio:
+                topics.append(f"bench{topic}.SYM{rng.randrange(config.symbols)}")
+            else:
+                topics.append(f"bench{topic}")
+        topology.append((f"agent{i}", topics))
+    return topology
+
+
+def build_plan(config: argparse.Namespace, scenario: str, rng: random.Random) -> List[Tuple[str, str, str]]:
+    """(operation, target agent or topic, symbol) per message, drawn before timing starts"""
+    if scenario == "mixed":
+        weights = parse_mix(config.mix)
+        operations = rng.choices(list(weights), weights=list(weights.values()), k=config.messages)
+    else:
+        operations = [scenario] * config.messages
+    plan = []
+    for operation in operations:
+        symbol = f"SYM{rng.randrange(config.symbols)}"
+        if operation == "send":
+            plan.append((operation, f"agent{rng.randrange(config.agents)}", symbol))
+        else:
+            plan.append((operation, f"bench{rng.randrange(config.topics)}.{symbol}", symbol))
+    return plan
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        operation, _, weight = part.partition("=")
+        if operation not in ("send", "broadcast"):
+            raise ValueError(f"Unknown operation {operation!r} in --mix, expected send or broadcast")
+        weights[operation] = float(weight)
+    return weights
+
+
+async def run_traffic(config: argparse.Namespace, scenario: str, trace_memory: bool) -> Dict[str, Any]:
+    """Drive one traffic scenario to completion and measure it"""
+    rng = random.Random(config.seed)
+    dtmac = DTMAC(history_size=config.history_size, history_max_age=None)
+    recorder = DeliveryRecorder(config.window)
+    for agent_id, topics in build_topology(config, rng):
+        SyntheticAgent(agent_id, dtmac, topics, recorder, config.handler_cost_us, config.handler_sleep_us)
+    plan = build_plan(config, scenario, rng)
+
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    interval = 1.0 / config.rate if config.rate else 0.0
+    for i, (operation, target, symbol) in enumerate(plan):
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        content = {"symbol": symbol, "seq": i}
+        if operation == "send":
+            recorder.sent += 1
+            await dtmac.send_message("load_generator", [target], content, MESSAGE_TYPE, MessagePriority.NORMAL)
+        else:
+            recorder.sent += len(dtmac.get_topic_subscribers(target))
+            await dtmac.broadcast_to_topic("load_generator", target, content, MESSAGE_TYPE, MessagePriority.NORMAL)
+        await recorder.wait_for_window()
+    await recorder.wait_for_all()
+    elapsed = time.perf_counter() - started
+
+    result: Dict[str, Any] = {
+        "messages": len(plan),
+        "deliveries": recorder.handled,
+        "seconds": elapsed,
+        "messages_per_sec": len(plan) / elapsed,
+        "deliveries_per_sec": recorder.handled / elapsed,
+        "latency_us": {name: value / 1000 for name, value in percentiles(recorder.latencies_ns).items()},
+        "handler_errors": sum(dtmac.get_metrics(agent_id)["errors"] for agent_id in dtmac.message_queue)
+    }
+    if trace_memory:
+        result["memory"] = memory_growth(baseline, len(dtmac.message_history))
+    await dtmac.stop()
+    return result
+
+
+def memory_growth(baseline: tracemalloc.Snapshot, history_messages: int) -> Dict[str, Any]:
+    current = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    growth = sum(stat.size_diff for stat in current.compare_to(baseline, "filename"))
+    return {
+        "growth_bytes": growth,
+        "peak_bytes": peak,
+        "history_messages": history_messages,
+        "bytes_per_history_message": growth / history_messages if history_messages else None
+    }
+
+
+def fill_history(config: argparse.Namespace, rng: random.Random, message_types: List[str]) -> DTMAC:
+    dtmac = DTMAC(history_size=config.history_size, history_max_age=None)
+    for i in range(config.history_size):
+        dtmac.message_history.append(DTMessage(
+            f"agent{rng.randrange(config.agents)}", [f"agent{rng.randrange(config.agents)}"],
+            {"symbol": f"SYM{rng.randrange(config.symbols)}", "seq": i}, rng.choice(message_types)
+        ))
+    return dtmac
+
+
+async def run_history(config: argparse.Namespace, trace_memory: bool) -> Dict[str, Any]:
+    """Fill the message history to capacity, then time lookups by agent, type and both"""
+    message_types = [f"{MESSAGE_TYPE}{i}" for i in range(config.message_types)]
+    memory = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        traced = fill_history(config, random.Random(config.seed), message_types)
+        memory = memory_growth(baseline, len(traced.message_history))
+        del traced
+
+    rng = random.Random(config.seed)
+    gc.collect()
+    fill_started = time.perf_counter()
+    dtmac = fill_history(config, rng, message_types)
+    fill_elapsed = time.perf_counter() - fill_started
+
+    queries = []
+    for _ in range(config.history_queries):
+        agent_id = f"agent{rng.randrange(config.agents)}"
+        message_type = rng.choice(message_types)
+        queries.append(rng.choice([(agent_id, None), (None, message_type), (agent_id, message_type)]))
+    latencies = []
+    returned = 0
+    started = time.perf_counter()
+    for agent_id, message_type in queries:
+        query_started = time.perf_counter_ns()
+        returned += len(dtmac.get_message_history(agent_id, message_type))
+        latencies.append(time.perf_counter_ns() - query_started)
+    elapsed = time.perf_counter() - started
+
+    result: Dict[str, Any] = {
+        "history_messages": len(dtmac.message_history),
+        "appends_per_sec": config.history_size / fill_elapsed,
+        "queries": len(queries),
+        "seconds": elapsed,
+        "queries_per_sec": len(queries) / elapsed,
+        "mean_messages_returned": returned / len(queries) if queries else 0,
+        "latency_us": {name: value / 1000 for name, value in percentiles(latencies).items()}
+    }
+    if memory is not None:
+        result["memory"] = memory
+    await dtmac.stop()
+    return result
+
+
+async def run_scenario(config: argparse.Namespace, scenario: str) -> Dict[str, Any]:
+    if scenario == "history":
+        return await run_history(config, trace_memory=not config.no_memory)
+    # Tracing allocations slows the bus down, so throughput and memory are measured in separate runs
+    result = await run_traffic(config, scenario, trace_memory=False)
+    if not config.no_memory:
+        result["memory"] = (await run_traffic(config, scenario, trace_memory=True))["memory"]
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_metric(result: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    value: Any = result
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print metric changes against a baseline run; returns the regressions beyond threshold"""
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if before is None:
+            continue
+        for path, higher_is_better in COMPARED_METRICS.items():
+            old, new = get_metric(before, path), get_metric(result, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            name = f"{scenario}.{'.'.join(path)}"
+            flag = "REGRESSION" if worse > threshold else ""
+            print(f"{name:40} {old:14.2f} -> {new:14.2f} {change:+8.1%} {flag}", file=sys.stderr)
+            if flag:
+                regressions.append(name)
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated scenarios to run, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--messages", type=int, default=20000, help="Messages sent per traffic scenario")
+    parser.add_argument("--rate", type=float, default=0.0, help="Offered messages per second; 0 sends as fast as possible")
+    parser.add_argument("--window", type=int, default=1000, help="Deliveries in flight before the generator waits")
+    parser.add_argument("--mix", default="send=0.7,broadcast=0.3", help="Operation weights of the mixed scenario")
+    parser.add_argument("--agents", type=int, default=16, help="Synthetic agents")
+    parser.add_argument("--topics", type=int, default=8, help="Top-level topics")
+    parser.add_argument("--symbols", type=int, default=50, help="Symbols, i.e. subtopics per topic")
+    parser.add_argument("--subscriptions", type=int, default=3, help="Topics each agent subscribes to")
+    parser.add_argument("--wildcard-ratio", type=float, default=0.1, help="Share of subscriptions using topic.*")
+    parser.add_argument("--symbol-ratio", type=float, default=0.3, help="Share of subscriptions to a single symbol")
+    parser.add_argument("--handler-cost-us", type=float, default=0.0, help="Busy CPU time per handled message")
+    parser.add_argument("--handler-sleep-us", type=float, default=0.0, help="Awaited sleep per handled message")
+    parser.add_argument("--history-size", type=int, default=10000, help="Message history capacity")
+    parser.add_argument("--history-queries", type=int, default=5000, help="History lookups in the history scenario")
+    parser.add_argument("--message-types", type=int, default=8, help="Message types in the history scenario")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for topology and traffic")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc memory runs")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change counted as a regression by --compare (exit status 1)")
+    config = parser.parse_args(argv)
+    for scenario in config.scenarios.split(","):
+        if scenario not in SCENARIOS:
+            parser.error(f"Unknown scenario {scenario!r}")
+    try:
+        parse_mix(config.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    return config
+
+
+async def run(config: argparse.Namespace) -> Dict[str, Any]:
+    results = {
+        "format": RESULT_FORMAT,
+        "benchmark": "dtmac",
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {name: value for name, value in vars(config).items() if name not in ("output", "compare")},
+        "scenarios": {}
+    }
+    for scenario in config.scenarios.split(","):
+        logger.info(f"Running {scenario} scenario")
+        results["scenarios"][scenario] = await run_scenario(config, scenario)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+    config = parse_args(argv)
+    results = asyncio.run(run(config))
+
+    output = json.dumps(results, indent=2)
+    if config.output:
+        with open(config.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if config.compare:
+        with open(config.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, config.threshold)
+        if regressions:
+            logger.warning(f"{len(regressions)} metrics regressed by more than {config.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .http_client import Timeout, client
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+BASE_URL = "https://www.alphavantage.co/query"
+
+# Request priorities, lower runs first
+INTERACTIVE = 0  # A user is waiting on the result
+NORMAL = 1
+BATCH = 2  # Refreshes and watchlists; may not spend a key's last INTERACTIVE_RESERVE daily calls
+
+CALLS_PER_MINUTE = float(os.environ.get('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))
+CALLS_PER_DAY = int(os.environ.get('ALPHA_VANTAGE_CALLS_PER_DAY', 25))
+INTERACTIVE_RESERVE = int(os.environ.get('ALPHA_VANTAGE_INTERACTIVE_RESERVE', 5))
+
+# Primary key plus comma-separated backups
+API_KEYS = [key.strip() for key in [os.environ.get('ALPHA_VANTAGE_API_KEY')] +
+            os.environ.get('ALPHA_VANTAGE_BACKUP_KEYS', '').split(',') if key and key.strip()]
+
+
+class QuotaExhausted(Exception):
+    """No API key has budget left for a request"""
+
+
+def _next_utc_midnight() -> float:
+    """Wall-clock time the daily quotas reset"""
+    now = datetime.now(timezone.utc)
+    return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+
+def quota_message(data: Any) -> Optional[str]:
+    """The rate limit notice Alpha Vantage returns instead of data, if data is one"""
+    if not isinstance(data, dict):
+        return None
+    for field in ('Note', 'Information'):
+        message = data.get(field)
+        if isinstance(message, str) and ('rate limit' in message or 'call frequency' in message
+                                         or 'requests per day' in message):
+            return message
+    return None
+
+
+class _KeyState:
+    """Token bucket and daily budget of one API key"""
+    __slots__ = ('key', 'tokens', 'updated', 'calls_today', 'resets_at', 'cooldown_until')
+
+    def __init__(self, key: str):
+        self.key = key
+        self.tokens = CALLS_PER_MINUTE  # Refills at CALLS_PER_MINUTE per minute
+        self.updated = time.monotonic()
+        self.calls_today = 0
+        self.resets_at = _next_utc_midnight()
+        self.cooldown_until = 0.0  # Monotonic time until which the API said to back off
+
+    def refill(self, now: float):
+        self.tokens = min(CALLS_PER_MINUTE, self.tokens + (now - self.updated) * CALLS_PER_MINUTE / 60)
+        self.updated = now
+        if time.time() >= self.resets_at:
+            self.calls_today = 0
+            self.resets_at = _next_utc_midnight()
+
+    def remaining_today(self) -> int:
+        return max(0, CALLS_PER_DAY - self.calls_today)
+
+    def wait(self, now: float) -> float:
+        """Seconds until this key can make a call, ignoring the daily budget"""
+        return max(self.cooldown_until - now, (1 - self.tokens) * 60 / CALLS_PER_MINUTE, 0.0)
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'priority')
+
+    def __init__(self, priority: int):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.priority = priority  # Of the most urgent caller waiting on it
+
+
+class AlphaVantageScheduler:
+    """
+    Shared gateway for Alpha Vantage calls.
+
+    Each API key has a token bucket (CALLS_PER_MINUTE) and a daily budget
+    (CALLS_PER_DAY). Callers queue by priority and the head of the queue is
+    given the key with the most daily budget left that has a token now.
+    Batch requests leave each key's last INTERACTIVE_RESERVE daily calls to
+    interactive ones, so user requests keep working during refreshes.
+    Identical requests in flight are coalesced into one call, which queues at
+    the priority of its most urgent caller. A rate limit
+    notice in a response puts its key in cooldown (until the daily reset for
+    the daily limit) and the request is retried on another key.
+    """
+
+    def __init__(self, keys: List[str]):
+        self._keys: Dict[str, _KeyState] = {key: _KeyState(key) for key in keys}
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []  # Heap of (priority, ticket) queued for a key
+        self._tickets = itertools.count()
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def has_keys(self) -> bool:
+        return bool(self._keys)
+
+    def add_key(self, key: str):
+        with self._cond:
+            if key and key not in self._keys:
+                self._keys[key] = _KeyState(key)
+                self._cond.notify_all()
+
+    def request(self, params: Dict[str, Any], priority: int = INTERACTIVE,
+                timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+        """
+        Call the API with params (without apikey) and return the decoded JSON.
+
+        Raises QuotaExhausted if no key has budget left for this priority, or
+        requests.RequestException if the call itself fails.
+        """
+        flight_key = tuple(sorted(params.items()))
+        with self._cond:
+            flight = self._in_flight.get(flight_key)
+            leader = flight is None
+            lifted = False
+            if leader:
+                flight = self._in_flight[flight_key] = _Flight(priority)
+            else:
+                self.coalesced += 1
+                if priority < flight.priority:
+                    # Don't leave a more urgent caller behind a batch request's queue position or reserve
+                    flight.priority = priority
+                    lifted = True
+                    self._cond.notify_all()
+        if not leader:
+            flight.done.wait()
+            if lifted and isinstance(flight.error, QuotaExhausted):
+                # It may have given up at its lower priority before this caller joined
+                return self.request(params, priority, timeout)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._call(params, flight, timeout)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._cond:
+                self._in_flight.pop(flight_key, None)
+            flight.done.set()
+
+    def _call(self, params: Dict[str, Any], flight: _Flight, timeout: Optional[Timeout]) -> Dict[str, Any]:
+        tried = set()
+        data = None
+        while True:
+            try:
+                state = self._acquire(flight, exclude=tried)
+            except QuotaExhausted:
+                if data is None:
+                    raise
+                # The keys not tried yet have no budget left; callers handle the notice as before
+                return data
+            data = client.get_json(BASE_URL, {**params, 'apikey': state.key}, timeout)
+            message = quota_message(data)
+            if message is None:
+                return data
+            self._throttled(state, message)
+            tried.add(state.key)
+
+    def _acquire(self, flight: _Flight, exclude: set) -> _KeyState:
+        """Wait until this request is first in line and a key can take it, then spend a call"""
+        with self._cond:
+            if not self._keys:
+                raise QuotaExhausted("No Alpha Vantage API key is configured")
+            ticket = (flight.priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if flight.priority < ticket[0]:
+                        # A more urgent caller joined the request while it waited
+                        self._waiting.remove(ticket)
+                        ticket = (flight.priority, ticket[1])
+                        self._waiting.append(ticket)
+                        heapq.heapify(self._waiting)
+                    priority = ticket[0]
+                    if self._waiting[0] == ticket:
+                        state, wait = self._pick(priority, exclude)
+                        if state is not None:
+                            state.tokens -= 1
+                            state.calls_today += 1
+                            self.calls += 1
+                            return state
+                        if wait is None:
+                            raise QuotaExhausted(
+                                "Alpha Vantage daily quota exhausted for all API keys"
+                                if priority < BATCH else
+                                "Alpha Vantage quota left is reserved for interactive requests")
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _pick(self, priority: int, exclude: set) -> Tuple[Optional[_KeyState], Optional[float]]:
+        """(Key to use now, None) or (None, seconds to wait); (None, None) if no key has budget left"""
+        now = time.monotonic()
+        reserve = INTERACTIVE_RESERVE if priority >= BATCH else 0
+        usable = []
+        for state in self._keys.values():
+            state.refill(now)
+            if state.key not in exclude and state.remaining_today() > reserve:
+                usable.append(state)
+        if not usable:
+            return None, None
+        ready = [state for state in usable if state.wait(now) == 0]
+        if ready:
+            return max(ready, key=lambda state: (state.remaining_today(), state.tokens)), None
+        return None, min(state.wait(now) for state in usable)
+
+    def _throttled(self, state: _KeyState, message: str):
+        with self._cond:
+            # The per-minute notice also quotes the daily limit, so check for it first
+            if 'call frequency' in message or 'per minute' in message:
+                state.cooldown_until = time.monotonic() + 60
+                logger.warning(f"Alpha Vantage key {_mask(state.key)} throttled, cooling down for a minute")
+            else:
+                state.calls_today = CALLS_PER_DAY
+                logger.warning(f"Alpha Vantage key {_mask(state.key)} hit its daily limit")
+            self._cond.notify_all()
+
+    def quota_state(self) -> Dict[str, Any]:
+        """Budget of each key and queue state, with keys masked"""
+        with self._cond:
+            now = time.monotonic()
+            keys = []
+            for state in self._keys.values():
+                state.refill(now)
+                keys.append({
+                    'key': _mask(state.key),
+                    'tokens': round(state.tokens, 2),
+                    'calls_today': state.calls_today,
+                    'remaining_today': state.remaining_today(),
+                    'cooldown_seconds': round(max(0.0, state.cooldown_until - now), 1),
+                    'resets_at': datetime.fromtimestamp(state.resets_at, timezone.utc).isoformat()
+                })
+            return {
+                'keys': keys,
+                'waiting': len(self._waiting),
+                'in_flight': len(self._in_flight),
+                'calls': self.calls,
+                'coalesced': self.coalesced
+            }
+
+
+def _mask(key: str) -> str:
+    return f"{key[:4]}…" if len(key) > 4 else "…"
+
+
+scheduler = AlphaVantageScheduler(API_KEYS)
@@ -1,40 +1,74 @@
-import os
 import requests
 import logging
-import json
+import threading
+import time
+from typing import Dict, Iterable, Tuple
 from dotenv import load_dotenv
 
+from .alpha_vantage import BATCH, INTERACTIVE, QuotaExhausted, quota_message, scheduler
+from .transcript_store import normalize_quarter, recent_quarters, store
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Get the API key from the environment
-API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
+MISSING_TTL = 6 * 60 * 60  # Seconds a quarter without a transcript is not asked for again
+
+_missing: Dict[Tuple[str, str], float] = {}  # (Symbol, quarter) -> monotonic time the API had no transcript
+_missing_lock = threading.Lock()
+
 
-def get_earnings_call_transcript(symbol, quarter):
+def _known_missing(symbol, quarter):
+    with _missing_lock:
+        checked = _missing.get((symbol, quarter))
+        if checked is not None and time.monotonic() - checked >= MISSING_TTL:
+            del _missing[(symbol, quarter)]
+            checked = None
+    return checked is not None
+
+
+def get_earnings_call_transcript(symbol, quarter, priority=INTERACTIVE):
     """
     Get earnings call transcript for a company
     
+    Transcripts are read through the transcript store: a stored one is
+    returned without an API call, a fetched one is stored.
+    
     Args:
         symbol (str): Stock ticker symbol
         quarter (str): Quarter in format YYYYQN (e.g. 2023Q1)
+        priority (int): Alpha Vantage scheduler priority (INTERACTIVE, NORMAL or BATCH)
         
     Returns:
         dict: Earnings call transcript data
     """
-    if not API_KEY:
+    try:
+        return _load_transcript(symbol, quarter, priority)
+    except QuotaExhausted as e:
+        logger.warning(f"Transcript request not sent: {e}")
+        return {"error": str(e)}
+
+
+def _load_transcript(symbol, quarter, priority):
+    """get_earnings_call_transcript, raising QuotaExhausted when Alpha Vantage is out of budget or rate limiting"""
+    symbol, quarter = symbol.upper(), normalize_quarter(quarter)
+    data = store.get(symbol, quarter)
+    if data is not None:
+        logger.info(f"Serving stored transcript for {symbol} {quarter}")
+        return data
+    if _known_missing(symbol, quarter):
+        return {"error": f"No transcript available for {symbol} {quarter}"}
+    
+    if not scheduler.has_keys():
         logger.error("Alpha Vantage API key is missing")
         return {"error": "API key is missing! Make sure to set ALPHA_VANTAGE_API_KEY in the environment."}
     
     logger.info(f"Fetching earnings call transcript for {symbol} {quarter}")
-    url = f"https://www.alphavantage.co/query?function=EARNINGS_CALL_TRANSCRIPT&symbol={symbol}&quarter={quarter}&apikey={API_KEY}"
-    
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = scheduler.request(
+            {'function': 'EARNINGS_CALL_TRANSCRIPT', 'symbol': symbol, 'quarter': quarter}, priority
+        )
         
         # Check for error messages
         if 'Error Message' in data:
@@ -43,28 +77,25 @@ def get_earnings_call_transcript(symbol, quarter):
             
         if 'Information' in data:
             logger.warning(f"Alpha Vantage API Information: {data['Information']}")
-            if 'call frequency' in data['Information']:
-                return {"error": "API call frequency exceeded. Please wait and try again."}
+        if quota_message(data):
+            raise QuotaExhausted("API call frequency exceeded. Please wait and try again.")
         
         # Check if transcript is available
         if not data.get('transcript'):
             logger.warning(f"No transcript available for {symbol} {quarter}")
+            if 'Information' not in data and 'Note' not in data:
+                # Not a quota notice, so the transcript isn't published (yet)
+                with _missing_lock:
+                    _missing[(symbol, quarter)] = time.monotonic()
             return {"error": f"No transcript available for {symbol} {quarter}"}
         
-        # Save the transcript data to a JSON file
-        try:
-            os.makedirs('data_archive', exist_ok=True)
-            quarter_clean = quarter.replace(' ', '_').replace('/', '_')
-            file_path = os.path.join('data_archive', f"{symbol}_earnings_transcript_{quarter_clean}.json")
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            logger.info(f"Saved transcript to {file_path}")
-        except Exception as e:
-            logger.error(f"Error saving transcript to file: {str(e)}")
+        store.put(symbol, quarter, data)
             
         logger.info(f"Successfully fetched transcript for {symbol} {quarter}")
         return data
         
+    except QuotaExhausted:
+        raise
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error: {str(e)}")
         return {"error": f"Failed to fetch data from Alpha Vantage API: {str(e)}"}
@@ -72,3 +103,44 @@ def get_earnings_call_transcript(symbol, quarter):
         logger.error(f"Unexpected error: {str(e)}")
         return {"error": f"An unexpected error occurred: {str(e)}"}
 
+
+def prefetch_transcripts(tickers: Iterable[str], quarters: int = 4, priority: int = BATCH) -> Dict[str, Dict[str, str]]:
+    """
+    Store the transcripts of the last completed quarters for tickers.
+    
+    Quarters already stored cost no API call, so this can be run repeatedly,
+    e.g. by a nightly job, to fill in transcripts as they are published.
+    Errors about one ticker are recorded and the prefetch moves on; it stops
+    when Alpha Vantage is out of budget or rate limiting, since every later
+    call would fail the same way.
+    
+    Args:
+        tickers: Stock ticker symbols
+        quarters (int): Number of completed quarters to fetch, newest first
+        priority (int): Alpha Vantage scheduler priority, BATCH by default
+        
+    Returns:
+        dict: {ticker: {quarter: "stored", "fetched" or the error}}
+    """
+    wanted = recent_quarters(quarters)
+    results = {}
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers):
+        results[ticker] = {}
+        for quarter in wanted:
+            if store.has(ticker, quarter):
+                results[ticker][quarter] = "stored"
+                continue
+            if not scheduler.has_keys():
+                results[ticker][quarter] = "API key is missing! Make sure to set ALPHA_VANTAGE_API_KEY in the environment."
+                logger.warning("Stopping transcript prefetch: no Alpha Vantage API key")
+                return results
+            try:
+                data = _load_transcript(ticker, quarter, priority)
+            except QuotaExhausted as e:
+                results[ticker][quarter] = str(e)
+                logger.warning(f"Stopping transcript prefetch: {e}")
+                return results
+            results[ticker][quarter] = data["error"] if "error" in data else "fetched"
+            if "error" in data and not data["error"].startswith("No transcript available"):
+                logger.warning(f"Transcript prefetch of {ticker} {quarter} failed: {data['error']}")
+    return results
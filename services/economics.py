@@ -1,15 +1,205 @@
+import asyncio
 import os
 import logging
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .http_client import AsyncHTTPClient, client
 
 logger = logging.getLogger(__name__)
 
+FRED_URL = "https://api.stlouisfed.org/fred/series/observations"
+
+# FRED series -> (name, release frequency: D daily, W weekly, M monthly, Q quarterly)
+INDICATORS = {
+    'GDP': ('GDP', 'Q'),  # Gross Domestic Product
+    'UNRATE': ('Unemployment Rate', 'M'),  # Unemployment Rate
+    'CPIAUCSL': ('Consumer Price Index', 'M'),  # Consumer Price Index for All Urban Consumers
+    'FEDFUNDS': ('Federal Funds Rate', 'M'),  # Federal Funds Effective Rate
+    'T10Y2Y': ('Treasury Yield Spread', 'D'),  # 10-Year Treasury Constant Maturity Minus 2-Year Treasury Constant Maturity
+    'INDPRO': ('Industrial Production', 'M'),  # Industrial Production Index
+    'HOUST': ('Housing Starts', 'M'),  # Housing Starts
+    'UMCSENT': ('Consumer Sentiment', 'M'),  # University of Michigan Consumer Sentiment
+    'RSAFS': ('Retail Sales', 'M'),  # Retail Sales
+    'RRSFS': ('Real Retail Sales', 'M'),  # Real Retail and Food Services Sales
+    'USREC': ('Recession Indicator', 'M')  # Recession Indicator (1 = recession, 0 = no recession)
+}
+
+# Seconds a cached series is reused for, by release frequency
+FREQUENCY_TTLS = {
+    'D': 60 * 60,
+    'W': 6 * 60 * 60,
+    'M': 12 * 60 * 60,
+    'Q': 24 * 60 * 60
+}
+
+HISTORY_DAYS = 730  # Observations kept per series (past 2 years)
+
+
+class _CachedSeries:
+    __slots__ = ('observations', 'expires')
+
+    def __init__(self, observations: List[Dict[str, str]], expires: float):
+        self.observations = observations  # FRED observations, newest first
+        self.expires = expires
+
+
+_series_cache: Dict[str, _CachedSeries] = {}
+_series_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=len(INDICATORS), thread_name_prefix='fred')
+
+
+def _cached_series(series_id: str) -> Tuple[Optional[_CachedSeries], bool]:
+    """The cached series, if any, and whether it is still fresh"""
+    with _series_lock:
+        cached = _series_cache.get(series_id)
+    return cached, cached is not None and cached.expires > time.monotonic()
+
+
+def _series_params(series_id: str, api_key: str, cached: Optional[_CachedSeries]) -> Dict[str, Any]:
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    window_start = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime('%Y-%m-%d')
+    # The latest cached observation is requested again, it may have been revised
+    start_date = cached.observations[0]['date'] if cached and cached.observations else window_start
+    return {
+        'series_id': series_id,
+        'api_key': api_key,
+        'file_type': 'json',
+        'observation_start': start_date,
+        'observation_end': end_date,
+        'sort_order': 'desc',
+        'limit': 1000  # Get all available data points
+    }
+
+
+def _merge_series(series_id: str, cached: Optional[_CachedSeries], data: Any) -> Optional[List[Dict[str, str]]]:
+    """Merge a FRED response into the cached series; the stale series if the response has no observations"""
+    if not isinstance(data, dict) or 'observations' not in data:
+        logger.warning(f"No observations found for {INDICATORS[series_id][0]}")
+        return cached.observations if cached else None
+    
+    window_start = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime('%Y-%m-%d')
+    by_date = {obs['date']: obs for obs in (cached.observations if cached else [])}
+    by_date.update((obs['date'], obs) for obs in data['observations'])
+    observations = [by_date[date] for date in sorted(by_date, reverse=True) if date >= window_start]
+    
+    ttl = FREQUENCY_TTLS.get(INDICATORS[series_id][1], FREQUENCY_TTLS['M'])
+    with _series_lock:
+        _series_cache[series_id] = _CachedSeries(observations, time.monotonic() + ttl)
+    return observations
+
+
+def _fetch_series(series_id: str, api_key: str) -> Tuple[Optional[List[Dict[str, str]]], bool]:
+    """
+    Observations of a series, newest first, and whether the network was used.
+
+    Fresh cached series are served as they are. Stale ones are refreshed with
+    only the observations from their latest cached date on, and kept as they
+    are if the refresh fails.
+    """
+    cached, fresh = _cached_series(series_id)
+    if fresh:
+        return cached.observations, False
+    
+    name = INDICATORS[series_id][0]
+    try:
+        response = client.get(FRED_URL, _series_params(series_id, api_key, cached))
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch {name} data: {response.status_code}")
+            return (cached.observations if cached else None), True
+        data = response.json()
+    except Exception as e:
+        logger.warning(f"Failed to fetch {name} data: {e}")
+        return (cached.observations if cached else None), True
+    return _merge_series(series_id, cached, data), True
+
+
+async def _fetch_series_async(http: AsyncHTTPClient,
+                              series_id: str,
+                              api_key: str) -> Tuple[Optional[List[Dict[str, str]]], bool]:
+    """_fetch_series on the running event loop"""
+    cached, fresh = _cached_series(series_id)
+    if fresh:
+        return cached.observations, False
+    
+    try:
+        data = await http.get_json(FRED_URL, _series_params(series_id, api_key, cached))
+    except Exception as e:
+        logger.warning(f"Failed to fetch {INDICATORS[series_id][0]} data: {e}")
+        return (cached.observations if cached else None), True
+    return _merge_series(series_id, cached, data), True
+
+
+def _summarize(series: Dict[str, Optional[List[Dict[str, str]]]]) -> Dict[str, Any]:
+    """Latest value, change and recent values of each series that has observations"""
+    results = {}
+    for series_id, observations in series.items():
+        name = INDICATORS[series_id][0]
+        if observations is None:
+            continue
+            
+        # Extract data points
+        values = []
+        for obs in observations:
+            if obs['value'] == '.':  # Missing data
+                continue
+                
+            values.append({
+                'date': obs['date'],
+                'value': float(obs['value']) if obs['value'] not in ['.', ''] else None
+            })
+            
+        if not values:
+            logger.warning(f"No valid values found for {name}")
+            continue
+            
+        # Calculate changes
+        if len(values) > 1:
+            current = values[0]['value']
+            previous = values[1]['value']
+            
+            if current is not None and previous is not None and previous != 0:
+                change_pct = ((current - previous) / previous) * 100
+            else:
+                change_pct = None
+        else:
+            change_pct = None
+            
+        # Store results
+        results[series_id] = {
+            'name': name,
+            'current_value': values[0]['value'] if values else None,
+            'change_pct': change_pct,
+            'latest_date': values[0]['date'] if values else None,
+            'values': values[:20]  # Limit to recent values
+        }
+    return results
+
+
+def _archive_results(results: Dict[str, Any]):
+    """Save results to a timestamped JSON file"""
+    try:
+        os.makedirs('data_archive', exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        file_path = os.path.join('data_archive', f'economics_fred_{timestamp}.json')
+        with open(file_path, 'w') as f:
+            json.dump(results, f, indent=4)
+        logger.info(f"Saved FRED economic data to {file_path}")
+    except Exception as e:
+        logger.error(f"Error saving FRED economic data to file: {str(e)}")
+
+
 def get_economic_indicators():
     """
     Get economic indicators from FRED API
     
+    Series are fetched concurrently and cached for a time based on how often
+    they are released, so a call with every series fresh needs no network.
+    
     Returns:
         dict: Economic indicators data
     """
@@ -20,106 +210,48 @@ def get_economic_indicators():
             logger.warning("FRED API key not set, returning sample data")
             return get_sample_economic_data()
         
-        # Define indicators to fetch
-        indicators = {
-            'GDP': 'GDP',  # Gross Domestic Product
-            'UNRATE': 'Unemployment Rate',  # Unemployment Rate
-            'CPIAUCSL': 'Consumer Price Index',  # Consumer Price Index for All Urban Consumers
-            'FEDFUNDS': 'Federal Funds Rate',  # Federal Funds Effective Rate
-            'T10Y2Y': 'Treasury Yield Spread',  # 10-Year Treasury Constant Maturity Minus 2-Year Treasury Constant Maturity
-            'INDPRO': 'Industrial Production',  # Industrial Production Index
-            'HOUST': 'Housing Starts',  # Housing Starts
-            'UMCSENT': 'Consumer Sentiment',  # University of Michigan Consumer Sentiment
-            'RSAFS': 'Retail Sales',  # Retail Sales
-            'RRSFS': 'Real Retail Sales',  # Real Retail and Food Services Sales
-            'USREC': 'Recession Indicator'  # Recession Indicator (1 = recession, 0 = no recession)
-        }
+        # Fetch data for each indicator
+        futures = {series_id: _executor.submit(_fetch_series, series_id, api_key) for series_id in INDICATORS}
+        fetched = {series_id: future.result() for series_id, future in futures.items()}
+        results = _summarize({series_id: observations for series_id, (observations, _) in fetched.items()})
+            
+        if not results:
+            logger.warning("No economic data retrieved, returning sample data")
+            return get_sample_economic_data()
         
-        # Initialize results
-        results = {}
+        # Served from cache means already archived
+        if any(used_network for _, used_network in fetched.values()):
+            _archive_results(results)
+        return results
         
-        # FRED API base URL
-        base_url = "https://api.stlouisfed.org/fred/series/observations"
+    except Exception as e:
+        logger.error(f"Error getting economic indicators: {e}")
+        return get_sample_economic_data()
+
+
+async def get_economic_indicators_async(http: AsyncHTTPClient):
+    """
+    get_economic_indicators for asyncio callers: the series are requested
+    concurrently on the running event loop through http, without threads,
+    and share the same cache.
+    """
+    try:
+        api_key = os.environ.get('FRED_API_KEY')
+        if not api_key:
+            logger.warning("FRED API key not set, returning sample data")
+            return get_sample_economic_data()
         
-        # Get date range (past 2 years)
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
+        fetched = dict(zip(INDICATORS, await asyncio.gather(
+            *(_fetch_series_async(http, series_id, api_key) for series_id in INDICATORS)
+        )))
+        results = _summarize({series_id: observations for series_id, (observations, _) in fetched.items()})
         
-        # Fetch data for each indicator
-        for series_id, name in indicators.items():
-            params = {
-                'series_id': series_id,
-                'api_key': api_key,
-                'file_type': 'json',
-                'observation_start': start_date,
-                'observation_end': end_date,
-                'sort_order': 'desc',
-                'limit': 1000  # Get all available data points
-            }
-            
-            response = requests.get(base_url, params=params)
-            
-            if response.status_code != 200:
-                logger.warning(f"Failed to fetch {name} data: {response.status_code}")
-                continue
-                
-            data = response.json()
-            
-            if 'observations' not in data:
-                logger.warning(f"No observations found for {name}")
-                continue
-                
-            # Extract data points
-            values = []
-            for obs in data['observations']:
-                if obs['value'] == '.':  # Missing data
-                    continue
-                    
-                values.append({
-                    'date': obs['date'],
-                    'value': float(obs['value']) if obs['value'] not in ['.', ''] else None
-                })
-                
-            if not values:
-                logger.warning(f"No valid values found for {name}")
-                continue
-                
-            # Calculate changes
-            if len(values) > 1:
-                current = values[0]['value']
-                previous = values[1]['value']
-                
-                if current is not None and previous is not None and previous != 0:
-                    change_pct = ((current - previous) / previous) * 100
-                else:
-                    change_pct = None
-            else:
-                change_pct = None
-                
-            # Store results
-            results[series_id] = {
-                'name': name,
-                'current_value': values[0]['value'] if values else None,
-                'change_pct': change_pct,
-                'latest_date': values[0]['date'] if values else None,
-                'values': values[:20]  # Limit to recent values
-            }
-            
         if not results:
             logger.warning("No economic data retrieved, returning sample data")
             return get_sample_economic_data()
-            
-        # Save results to JSON file
-        try:
-            os.makedirs('data_archive', exist_ok=True)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            file_path = os.path.join('data_archive', f'economics_fred_{timestamp}.json')
-            with open(file_path, 'w') as f:
-                json.dump(results, f, indent=4)
-            logger.info(f"Saved FRED economic data to {file_path}")
-        except Exception as e:
-            logger.error(f"Error saving FRED economic data to file: {str(e)}")
-            
+        
+        if any(used_network for _, used_network in fetched.values()):
+            await asyncio.get_running_loop().run_in_executor(None, _archive_results, results)
         return results
         
     except Exception as e:
@@ -1,5 +1,4 @@
 import logging
-import yfinance as yf
 # import yfinance_cache as yf
 import pandas as pd
 import numpy as np
@@ -7,6 +6,8 @@ from datetime import datetime
 import os
 import json
 
+from .yf_cache import get_statement
+
 logger = logging.getLogger(__name__)
 
 def get_financials(ticker):
@@ -20,13 +21,10 @@ def get_financials(ticker):
         list: Financial statements as list of dictionaries
     """
     try:
-        # Initialize ticker object
-        stock = yf.Ticker(ticker)
-        
         # Get financial data
-        income_stmt = stock.income_stmt
-        balance_sheet = stock.balance_sheet
-        cash_flow = stock.cashflow
+        income_stmt = get_statement(ticker, 'income_stmt')
+        balance_sheet = get_statement(ticker, 'balance_sheet')
+        cash_flow = get_statement(ticker, 'cashflow')
         
         if income_stmt.empty and balance_sheet.empty and cash_flow.empty:
             logger.warning(f"No financial data available for {ticker}")
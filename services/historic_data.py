@@ -1,14 +1,55 @@
 import logging
 import json
+import math
 import os
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import pandas as pd
 import yfinance as yf
 # import yfinance_cache as yf
 from datetime import datetime, timedelta
 import numpy as np
 
+from .yf_cache import download
+
 logger = logging.getLogger(__name__)
 
+# Tickers per yf.download call in bulk downloads; yfinance fetches a batch's tickers concurrently
+BULK_BATCH_SIZE = 100
+
+def _default_range(start_date: Optional[str], end_date: Optional[str]):
+    # Default to past year if no dates provided
+    if not start_date:
+        start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+    if not end_date:
+        end_date = datetime.now().strftime('%Y-%m-%d')
+    return start_date, end_date
+
+def _prepare_frame(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Turn downloaded OHLCV data into the archive format: a 'Date' string column and JSON-safe values"""
+    # Reset index to make 'Date' a column
+    df = df.reset_index()
+    if 'Date' not in df.columns:
+        logger.error(f"Could not find 'Date' column in DataFrame for {ticker}")
+        return pd.DataFrame()
+    
+    # Remove the extra 'date' column if it exists and is not the same as 'Date'
+    if 'date' in df.columns and 'Date' in df.columns:
+        df = df.drop(columns=['date'])
+    
+    # Convert 'Date' to string format
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    
+    # Convert numeric columns to float for JSON serialization
+    numeric_columns = df.select_dtypes(include=[np.number]).columns
+    for col in numeric_columns:
+        df[col] = df[col].astype(float)
+    
+    # Replace NaN values with None for JSON serialization
+    return df.replace({np.nan: None})
+
 def get_historic_data(ticker: str,
                       start_date: str = None,
                       end_date: str = None,
@@ -26,48 +67,142 @@ def get_historic_data(ticker: str,
         DataFrame with OHLCV data
     """
     try:
-        # Default to past year if no dates provided
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
+        start_date, end_date = _default_range(start_date, end_date)
             
         # Fetch data
-        df = yf.download(ticker, start=start_date, end=end_date, interval=interval, 
-                         progress=False, auto_adjust=True, multi_level_index=False)
+        df = download(ticker, start=start_date, end=end_date, interval=interval,
+                      progress=False, auto_adjust=True, multi_level_index=False)
         
         if df.empty:
             logger.warning(f"No data found for {ticker} from {start_date} to {end_date}")
             return pd.DataFrame()
             
-        # Reset index to make 'Date' a column
-        df = df.reset_index()
-        if 'Date' not in df.columns:
-            logger.error(f"Could not find 'Date' column in DataFrame for {ticker}")
-            return pd.DataFrame()
-        
-        # Remove the extra 'date' column if it exists and is not the same as 'Date'
-        if 'date' in df.columns and 'Date' in df.columns:
-            df = df.drop(columns=['date'])
-        
-        # Convert 'Date' to string format
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-        
-        # Convert numeric columns to float for JSON serialization
-        numeric_columns = df.select_dtypes(include=[np.number]).columns
-        for col in numeric_columns:
-            df[col] = df[col].astype(float)
-        
-        # Replace NaN values with None for JSON serialization
-        df = df.replace({np.nan: None})
-        
-        return df
+        return _prepare_frame(df, ticker)
         
     except Exception as e:
         logger.error(f"Error fetching historic data for {ticker}: {e}")
         return pd.DataFrame()
 
 
+def get_historic_data_bulk(tickers: Iterable[str],
+                           start_date: str = None,
+                           end_date: str = None,
+                           interval: str = '1d',
+                           batch_size: int = BULK_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Fetch historical OHLCV data of many tickers in batched requests.
+
+    Args:
+        tickers: Stock ticker symbols
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        interval (str): Data interval (1d, 1wk, 1mo, etc.)
+        batch_size: Tickers per yf.download call
+
+    Returns:
+        Panel DataFrame indexed by date with (ticker, field) columns, aligned
+        on the union of all tickers' dates; panel[ticker] is one ticker's data.
+        Tickers without data are left out.
+    """
+    start_date, end_date = _default_range(start_date, end_date)
+    tickers = list(dict.fromkeys(ticker.strip().upper() for ticker in tickers if ticker.strip()))
+    
+    frames = []
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        try:
+            df = yf.download(batch, start=start_date, end=end_date, interval=interval,
+                             group_by='ticker', threads=True, progress=False, auto_adjust=True)
+        except Exception as e:
+            logger.error(f"Error fetching historic data for {', '.join(batch)}: {e}")
+            continue
+        if df.empty:
+            logger.warning(f"No data found for {', '.join(batch)} from {start_date} to {end_date}")
+            continue
+        # Failed tickers come back as all-NaN columns
+        df = df.dropna(axis=1, how='all')
+        frames.append(df)
+    
+    if not frames:
+        return pd.DataFrame()
+    panel = pd.concat(frames, axis=1).sort_index()
+    panel.index.name = 'Date'
+    missing = set(tickers) - set(panel.columns.get_level_values(0))
+    if missing:
+        logger.warning(f"No data found for {', '.join(sorted(missing))} from {start_date} to {end_date}")
+    return panel
+
+
+def panel_ticker_frame(panel: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """One ticker's data from a bulk panel, in the format get_historic_data returns"""
+    # Panel columns hold tickers upper-cased, as yfinance reports them
+    if panel.empty or ticker.upper() not in panel.columns.get_level_values(0):
+        return pd.DataFrame()
+    # Dates the ticker didn't trade on (e.g. before listing) are only there for alignment
+    df = panel[ticker.upper()].dropna(how='all')
+    if df.empty:
+        return pd.DataFrame()
+    return _prepare_frame(df, ticker)
+
+
+# Rows at the end of an archive that may be replaced in place; more and the file is rewritten
+TAIL_REWRITE_ROWS = 5
+
+# Prices compared to tell whether archived rows were adjusted like freshly downloaded ones
+PRICE_FIELDS = ('Open', 'High', 'Low', 'Close')
+
+def _same_prices(archived: Dict[str, Any], fresh: Dict[str, Any]) -> bool:
+    for field in PRICE_FIELDS:
+        old, new = archived.get(field), fresh.get(field)
+        if old is None or new is None:
+            if old is not new:
+                return False
+        elif not math.isclose(old, new, rel_tol=1e-6, abs_tol=1e-9):
+            return False
+    return True
+
+def _write_atomic(filepath: str, data: bytes):
+    """Replace a file with data so readers, and a crash, see either the old or the new content"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _dump_rows(rows: List[Dict[str, Any]]) -> bytes:
+    return json.dumps(rows, indent=2).encode()
+
+# Serializes archive updates per (archive dir, ticker) within this process
+_archive_locks: Dict[Tuple[str, str], threading.Lock] = defaultdict(threading.Lock)
+_archive_locks_guard = threading.Lock()
+
+def _archive_lock(archive_dir: str, ticker: str) -> threading.Lock:
+    with _archive_locks_guard:
+        return _archive_locks[(os.path.abspath(archive_dir), ticker)]
+
+
+class _IncrementalPlan:
+    """An archive of a ticker and the date ranges to download to extend it to a requested range"""
+    __slots__ = ('ticker', 'start_date', 'end_date', 'src_path', 'mtime', 'archived', 'written', 'head', 'tail')
+
+    def __init__(self, ticker: str, start_date: Optional[str], end_date: Optional[str],
+                 src_path: str, mtime: float, archived: List[Dict[str, Any]], written: str):
+        self.ticker = ticker
+        self.start_date = start_date
+        self.end_date = end_date
+        self.src_path = src_path
+        self.mtime = mtime
+        self.archived = archived  # Rows of src_path, sorted by date
+        self.written = written  # Day src_path was written; rows before it are settled
+        self.head: Optional[Tuple[str, str]] = None  # (start, end) to download before the archive
+        self.tail: Optional[Tuple[str, str]] = None  # (start, end) to download after its last settled day
+
+
 class DataArchiver:
     """Archive fetched data as a timestamped, timezone-aware JSON file."""
     
@@ -90,11 +225,219 @@ class DataArchiver:
         else:
             return str(value)
         
+    def _rows(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convert DataFrame to list of dictionaries"""
+        data_list = []
+        for _, row in df.iterrows():  # Use _ instead of date for index
+            row_dict = {}
+            for col in df.columns:
+                value = row[col]
+                row_dict[col] = self._convert_to_json_serializable(value)
+            data_list.append(row_dict)
+        return data_list
+    
+    def _archived_ranges(self, ticker: str) -> List[Tuple[str, str, str]]:
+        """(start date, end date, path) of the ticker's archives named with a date range"""
+        prefix = f"{ticker}_historic_data_"
+        ranges = []
+        for filename in os.listdir(self.archive_dir):
+            if not (filename.startswith(prefix) and filename.endswith('.json')):
+                continue
+            parts = filename[len(prefix):-len('.json')].split('_')
+            try:
+                start, end = [datetime.strptime(part, '%Y-%m-%d').strftime('%Y-%m-%d') for part in parts]
+            except ValueError:
+                continue  # Not a date range, e.g. archived with default dates
+            ranges.append((start, end, os.path.join(self.archive_dir, filename)))
+        return ranges
+    
+    def _plan_incremental(self, ticker: str, start_date: Optional[str], end_date: Optional[str]) -> Optional[_IncrementalPlan]:
+        """
+        Work out what the archive of the ticker that best covers a range lacks.
+        
+        Only dates before the archived range, and from its last settled day on
+        (the last archived day may have been partial when written), need to be
+        downloaded; both ranges overlap the archive by a settled day so its
+        prices can be checked. Returns None if no archive overlaps the range.
+        """
+        start, end = _default_range(start_date, end_date)
+        overlapping = [r for r in self._archived_ranges(ticker) if r[0] < end and r[1] > start]
+        if not overlapping:
+            return None
+        
+        # The archive covering the requested range furthest, ties going to the latest
+        src_start, src_end, src_path = max(overlapping, key=lambda r: (r[0] <= start, min(r[1], end), r[1]))
+        mtime = os.path.getmtime(src_path)
+        with open(src_path, 'r') as f:
+            archived = json.load(f)
+        if not archived or not isinstance(archived, list):
+            return None
+        archived.sort(key=lambda row: row['Date'])
+        
+        # Data is only final up to the day it was written on
+        written = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d')
+        settled = [row['Date'] for row in archived if row['Date'] < written]
+        if not settled:
+            return None
+        
+        plan = _IncrementalPlan(ticker, start_date, end_date, src_path, mtime, archived, written)
+        if start < src_start:
+            # Through the first archived day (end dates are exclusive), to check it against the archive
+            plan.head = (start, (datetime.strptime(archived[0]['Date'], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d'))
+        if end > min(src_end, written):
+            plan.tail = (settled[-1], end)
+        return plan
+    
+    def _apply_incremental(self,
+                           plan: _IncrementalPlan,
+                           head: List[Dict[str, Any]],
+                           tail: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Archive plan's range from its source archive and the head and tail rows
+        downloaded for it. Prices are split and dividend adjusted as of download
+        time, so if the overlapping settled day's prices changed the archive is
+        not reused. The archive is left untouched if nothing changed and, when
+        only its last rows changed, updated in place. Returns None if the update
+        can't be made, so the caller downloads the range in full.
+        """
+        ticker = plan.ticker
+        if os.path.getmtime(plan.src_path) != plan.mtime:
+            logger.info(f"{plan.src_path} changed while {ticker} was being downloaded")
+            return None
+        if plan.head and not head:
+            logger.warning(f"Incremental download of {ticker} before {plan.archived[0]['Date']} returned nothing")
+            return None
+        if plan.tail and not tail:
+            logger.warning(f"Incremental download of {ticker} from {plan.tail[0]} returned nothing")
+            return None
+        
+        archived = plan.archived
+        by_date = {row['Date']: row for row in archived}
+        fetched = head + tail
+        if fetched:
+            overlap = [row for row in fetched if row['Date'] in by_date and row['Date'] < plan.written]
+            if not overlap:
+                logger.warning(f"Incremental download of {ticker} doesn't overlap {plan.src_path}, can't check its prices")
+                return None
+            if not all(_same_prices(by_date[row['Date']], row) for row in overlap):
+                logger.info(f"Prices in {plan.src_path} were adjusted before a later split or dividend, not reusing it")
+                return None
+        
+        by_date.update((row['Date'], row) for row in fetched)
+        start, end = _default_range(plan.start_date, plan.end_date)
+        # End dates are exclusive, as for yf.download
+        rows = [by_date[date] for date in sorted(by_date) if start <= date < end]
+        if not rows:
+            return None
+        
+        filename = f"{ticker}_historic_data_{plan.start_date}_{plan.end_date}.json"
+        filepath = os.path.join(self.archive_dir, filename)
+        if filepath == plan.src_path:
+            if rows == archived:
+                logger.info(f"Archive {filepath} is up to date")
+                return filepath
+            if self._rewrite_tail(filepath, archived, rows):
+                logger.info(f"Updated the last rows of {filepath}")
+                return filepath
+        
+        _write_atomic(filepath, _dump_rows(rows))
+        logger.info(f"Archived data for {ticker} to {filepath} from {plan.src_path} and {len(fetched)} downloaded rows")
+        return filepath
+    
+    def _archive_incremental(self, ticker: str, start_date: Optional[str], end_date: Optional[str]) -> Optional[str]:
+        """Archive a range by extending what is already archived for the ticker; None if that can't be done"""
+        plan = self._plan_incremental(ticker, start_date, end_date)
+        if plan is None:
+            return None
+        head = self._rows(get_historic_data(ticker, *plan.head)) if plan.head else []
+        tail = self._rows(get_historic_data(ticker, *plan.tail)) if plan.tail else []
+        return self._apply_incremental(plan, head, tail)
+    
+    def _extend_archive(self, ticker: str, start_date: Optional[str], end_date: Optional[str]) -> Optional[str]:
+        with _archive_lock(self.archive_dir, ticker):
+            try:
+                return self._archive_incremental(ticker, start_date, end_date)
+            except Exception as e:
+                logger.warning(f"Incremental archive of {ticker} failed, downloading in full: {e}")
+                return None
+    
+    def _extend_archives_bulk(self, tickers: List[str], start_date: Optional[str], end_date: Optional[str]) -> Dict[str, str]:
+        """
+        _extend_archive for many tickers: the ranges their archives lack are
+        downloaded in bulk, one request per distinct range. Returns ticker ->
+        archive path for the tickers extended.
+        """
+        plans = []
+        for ticker in tickers:
+            with _archive_lock(self.archive_dir, ticker):
+                try:
+                    plan = self._plan_incremental(ticker, start_date, end_date)
+                except Exception as e:
+                    logger.warning(f"Incremental archive of {ticker} failed, downloading in full: {e}")
+                    continue
+            if plan is not None:
+                plans.append(plan)
+        
+        heads = self._download_ranges({plan.ticker: plan.head for plan in plans if plan.head})
+        tails = self._download_ranges({plan.ticker: plan.tail for plan in plans if plan.tail})
+        results = {}
+        for plan in plans:
+            with _archive_lock(self.archive_dir, plan.ticker):
+                try:
+                    filepath = self._apply_incremental(plan, heads.get(plan.ticker, []), tails.get(plan.ticker, []))
+                except Exception as e:
+                    logger.warning(f"Incremental archive of {plan.ticker} failed, downloading in full: {e}")
+                    continue
+            if filepath is not None:
+                results[plan.ticker] = filepath
+        return results
+    
+    def _download_ranges(self, ranges: Dict[str, Tuple[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Rows of each ticker's (start, end) range, with one bulk download per distinct range"""
+        by_range: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for ticker, date_range in ranges.items():
+            by_range[date_range].append(ticker)
+        rows = {}
+        for (start, end), tickers in by_range.items():
+            panel = get_historic_data_bulk(tickers, start, end)
+            for ticker in tickers:
+                rows[ticker] = self._rows(panel_ticker_frame(panel, ticker))
+        return rows
+    
+    def _rewrite_tail(self, filepath: str, archived: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> bool:
+        """
+        Turn an archive holding archived into one holding rows, re-serializing only
+        the rows after their common prefix; the prefix is copied as bytes. Relies on
+        the layout json.dump(indent=2) writes; returns False, changing nothing, when
+        that can't be done. The file is replaced atomically.
+        """
+        keep = 0
+        while keep < min(len(archived), len(rows)) and archived[keep] == rows[keep]:
+            keep += 1
+        drop = len(archived) - keep
+        if keep == 0 or drop > TAIL_REWRITE_ROWS:
+            return False
+        
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        if not data.endswith(b'\n]'):
+            return False
+        cut = len(data) - 2
+        for _ in range(drop):
+            # Each row after the first starts with ",\n  {"
+            cut = data.rfind(b',\n  {', 0, cut)
+            if cut < 0:
+                return False
+        added = json.dumps(rows[keep:], indent=2)[1:] if keep < len(rows) else '\n]'
+        _write_atomic(filepath, data[:cut] + ((',' if keep < len(rows) else '') + added).encode())
+        return True
+    
     def archive_historic_data(self,
                               ticker: str,
                               start_date: str = None,
                               end_date: str = None,
-                              df: pd.DataFrame = None) -> str:
+                              df: pd.DataFrame = None,
+                              incremental: bool = True) -> str:
         """
         Archive historical data to a JSON file.
         
@@ -103,6 +446,8 @@ class DataArchiver:
             start_date: Start date (YYYY-MM-DD)
             end_date: End date (YYYY-MM-DD)
             df: DataFrame with historical data (will be fetched if not provided)
+            incremental: When fetching, only download what existing archives
+                         of the ticker lack
             
         Returns:
             Path to the archived JSON file
@@ -110,6 +455,9 @@ class DataArchiver:
         try:
             # Fetch data if not provided
             if df is None or df.empty:
+                filepath = self._extend_archive(ticker, start_date, end_date) if incremental else None
+                if filepath is not None:
+                    return filepath
                 df = get_historic_data(ticker, start_date, end_date)
             
             if df.empty:
@@ -123,18 +471,11 @@ class DataArchiver:
             filename = f"{ticker}_historic_data_{start_date}_{end_date}.json"
             filepath = os.path.join(self.archive_dir, filename)
         
-            # Convert DataFrame to list of dictionaries
-            data_list = []
-            for _, row in df.iterrows():  # Use _ instead of date for index
-                row_dict = {}
-                for col in df.columns:
-                    value = row[col]
-                    row_dict[col] = self._convert_to_json_serializable(value)
-                data_list.append(row_dict)
+            data_list = self._rows(df)
             
             # Save to JSON
-            with open(filepath, 'w') as f:
-                json.dump(data_list, f, indent=2)
+            with _archive_lock(self.archive_dir, ticker):
+                _write_atomic(filepath, _dump_rows(data_list))
             
             logger.info(f"Archived data for {ticker} to {filepath}")
             return filepath
@@ -142,6 +483,47 @@ class DataArchiver:
         except Exception as e:
             logger.error(f"Error archiving data for {ticker}: {e}")
             return f"Error archiving data: {str(e)}"
+    
+    def archive_historic_data_bulk(self,
+                                   tickers: Iterable[str],
+                                   start_date: str = None,
+                                   end_date: str = None,
+                                   panel: pd.DataFrame = None,
+                                   incremental: bool = True) -> Dict[str, str]:
+        """
+        Archive historical data of many tickers from one bulk download.
+        
+        Args:
+            tickers: Stock ticker symbols
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            panel: Panel from get_historic_data_bulk (will be fetched if not provided)
+            incremental: When fetching, extend existing archives of a ticker
+                         instead of downloading it in full; the ranges they
+                         lack are downloaded in bulk too
+            
+        Returns:
+            Ticker -> path to its archived JSON file, or an error message as
+            archive_historic_data reports it
+        """
+        tickers = list(dict.fromkeys(ticker.strip() for ticker in tickers if ticker.strip()))
+        results = {}
+        if panel is None:
+            if incremental:
+                results.update(self._extend_archives_bulk(tickers, start_date, end_date))
+            remaining = [ticker for ticker in tickers if ticker not in results]
+            panel = get_historic_data_bulk(remaining, start_date, end_date) if remaining else pd.DataFrame()
+        
+        for ticker in tickers:
+            if ticker in results:
+                continue
+            df = panel_ticker_frame(panel, ticker)
+            if df.empty:
+                logger.error(f"No data to archive for {ticker}")
+                results[ticker] = f"No data available for {ticker}"
+                continue
+            results[ticker] = self.archive_historic_data(ticker, start_date, end_date, df=df)
+        return results
 
 if __name__ == "__main__":
     ticker = "TSLA"
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds; connect is short so a dead host fails fast
+DEFAULT_TIMEOUT = (5.0, 30.0)
+MAX_CONNECTIONS_PER_HOST = 10
+MAX_CONNECTIONS = 100  # Async client only; the sync pools are bounded per host
+RETRIES = 2  # For connection errors and 502/503/504 on GET, with backoff
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HTTPClient:
+    """
+    Shared keep-alive HTTP client for the REST services.
+
+    Connections are pooled per host and reused across calls and threads, so
+    only the first call to a host pays for the TCP and TLS handshakes. At most
+    max_per_host connections are open to a host; further callers wait for one
+    to be free. Every call has a timeout, responses are gzip-decoded
+    transparently, and idempotent requests are retried on connection errors
+    and gateway failures.
+    """
+
+    def __init__(self,
+                 max_per_host: int = MAX_CONNECTIONS_PER_HOST,
+                 timeout: Timeout = DEFAULT_TIMEOUT,
+                 retries: int = RETRIES):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,  # Hosts whose pools are kept
+            pool_maxsize=max_per_host,
+            pool_block=True,
+            max_retries=Retry(total=retries, read=0, backoff_factor=0.5,
+                              status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET"}),
+                              raise_on_status=False)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[Timeout] = None,
+            **kwargs) -> requests.Response:
+        return self.session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[Timeout] = None) -> Any:
+        """GET and decode JSON, raising requests.HTTPError on error statuses"""
+        response = self.get(url, params, timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPClient:
+    """
+    asyncio counterpart of HTTPClient, built on aiohttp.
+
+    Requests are awaited on the event loop without worker threads, so many
+    upstream calls can be in flight at once; the connector caps them at
+    max_per_host per host and max_connections overall. Create it inside the
+    event loop that uses it and close it when done:
+
+        async with AsyncHTTPClient() as client:
+            data = await client.get_json(url, params)
+    """
+
+    def __init__(self,
+                 max_per_host: int = MAX_CONNECTIONS_PER_HOST,
+                 max_connections: int = MAX_CONNECTIONS,
+                 timeout: Timeout = DEFAULT_TIMEOUT,
+                 retries: int = RETRIES):
+        # Only needed by async callers, so the sync client works without it
+        import aiohttp
+        self._aiohttp = aiohttp
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self.retries = retries
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_per_host, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+            auto_decompress=True
+        )
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET and decode JSON, raising aiohttp.ClientResponseError on error statuses"""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status in (502, 503, 504) and attempt < self.retries:
+                        await asyncio.sleep(0.5 * 2 ** attempt)
+                        continue
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+            except (self._aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"Retrying GET {url} after {e!r}")
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self) -> "AsyncHTTPClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+client = HTTPClient()
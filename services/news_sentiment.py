@@ -1,9 +1,14 @@
 import logging
 import requests
 import os
+import threading
+import time
 from datetime import datetime
+from typing import Any, Dict, Iterable, List
 from dotenv import load_dotenv
 
+from .alpha_vantage import INTERACTIVE, QuotaExhausted, scheduler
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,12 +16,152 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-def get_news_sentiment(tickers):
+NEWS_CACHE_TTL = int(os.environ.get('NEWS_CACHE_TTL', 300))  # Seconds a ticker's feed is reused for
+ARTICLE_TTL = int(os.environ.get('NEWS_ARTICLE_TTL', 1800))  # Seconds an article counts towards aggregates
+
+
+class NewsStore:
+    """
+    Articles from NEWS_SENTIMENT feeds, stored once per URL.
+
+    Articles about several tickers come back in the feed of each of them; the
+    store keeps one copy and indexes it under every ticker it has a sentiment
+    for, so a ticker's aggregate also uses articles fetched for related
+    tickers. A ticker's feed is fresh for NEWS_CACHE_TTL seconds, and articles
+    drop out of the store ARTICLE_TTL seconds after they were last seen.
+    """
+
+    def __init__(self, cache_ttl: float = NEWS_CACHE_TTL, article_ttl: float = ARTICLE_TTL):
+        self.cache_ttl = cache_ttl
+        self.article_ttl = article_ttl
+        self._articles: Dict[str, Dict[str, Any]] = {}  # URL -> article
+        self._seen: Dict[str, float] = {}  # URL -> monotonic time last returned in a feed
+        self._by_ticker: Dict[str, set] = {}  # Ticker -> URLs of articles with a sentiment for it
+        self._fetched: Dict[str, float] = {}  # Ticker -> monotonic time its feed was fetched
+        self._lock = threading.Lock()
+
+    def is_fresh(self, ticker: str) -> bool:
+        with self._lock:
+            return time.monotonic() - self._fetched.get(ticker, float('-inf')) < self.cache_ttl
+
+    def add_feed(self, ticker: str, feed: Iterable[Dict[str, Any]]):
+        now = time.monotonic()
+        with self._lock:
+            for article in feed:
+                url = article.get('url') or f"{article.get('title', '')}|{article.get('time_published', '')}"
+                previous = self._articles.get(url)
+                if previous is not None:
+                    self._unindex(url, previous)
+                self._articles[url] = article
+                self._seen[url] = now
+                for item in article.get('ticker_sentiment', []):
+                    if item.get('ticker'):
+                        self._by_ticker.setdefault(item['ticker'], set()).add(url)
+            self._fetched[ticker] = now
+            self._prune(now)
+
+    def articles(self, ticker: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._articles[url] for url in self._by_ticker.get(ticker, ())]
+
+    def _unindex(self, url: str, article: Dict[str, Any]):
+        for item in article.get('ticker_sentiment', []):
+            urls = self._by_ticker.get(item.get('ticker'))
+            if urls is not None:
+                urls.discard(url)
+                if not urls:
+                    del self._by_ticker[item['ticker']]
+
+    def _prune(self, now: float):
+        for url in [url for url, seen in self._seen.items() if now - seen >= self.article_ttl]:
+            self._unindex(url, self._articles.pop(url))
+            del self._seen[url]
+
+    def clear(self):
+        with self._lock:
+            self._articles.clear()
+            self._seen.clear()
+            self._by_ticker.clear()
+            self._fetched.clear()
+
+
+store = NewsStore()
+
+
+def _ticker_sentiment(ticker: str, articles: List[Dict[str, Any]]):
+    """Aggregate sentiment of ticker over articles, None if none has a usable score for it"""
+    sentiment_scores = []
+    ticker_news = []
+    
+    for article in articles:
+        ticker_sentiment = None
+        
+        # Find the sentiment for this specific ticker
+        for ticker_sentiment_item in article.get('ticker_sentiment', []):
+            if ticker_sentiment_item.get('ticker') == ticker:
+                ticker_sentiment = ticker_sentiment_item
+                break
+        
+        if not ticker_sentiment:
+            continue
+        
+        try:
+            sentiment_score = float(ticker_sentiment.get('ticker_sentiment_score', 0))
+            relevance_score = float(ticker_sentiment.get('relevance_score', 0))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Error parsing sentiment scores for {ticker}: {e}")
+            continue
+        
+        sentiment_scores.append(sentiment_score)
+        
+        # Keep the article if it's relevant enough (relevance > 0.2)
+        if relevance_score > 0.2:  # Lowered threshold to get more news
+            ticker_news.append({
+                'title': article.get('title', 'No title'),
+                'summary': article.get('summary', 'No summary'),
+                'sentiment_score': sentiment_score,
+                'relevance_score': relevance_score,
+                'url': article.get('url', ''),
+                'time_published': article.get('time_published', ''),
+                'authors': article.get('authors', []),
+                'source': article.get('source', 'Unknown')
+            })
+    
+    if not sentiment_scores:
+        return None
+    
+    # Calculate average sentiment
+    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
+    
+    # Classify overall sentiment
+    sentiment_label = "Neutral"
+    if avg_sentiment > 0.25:
+        sentiment_label = "Bullish"
+    elif avg_sentiment > 0.1:
+        sentiment_label = "Somewhat Bullish"
+    elif avg_sentiment < -0.25:
+        sentiment_label = "Bearish"
+    elif avg_sentiment < -0.1:
+        sentiment_label = "Somewhat Bearish"
+    
+    return {
+        'sentiment_score': avg_sentiment,
+        'sentiment_label': sentiment_label,
+        'news_count': len(ticker_news),
+        'news': sorted(ticker_news, key=lambda x: x['relevance_score'], reverse=True)[:10]  # Top 10 most relevant news
+    }
+
+
+def get_news_sentiment(tickers, priority=INTERACTIVE):
     """
     Get news sentiment for specified tickers
     
+    Only tickers whose feed is not cached in the article store are requested;
+    aggregates are computed from every stored article about the ticker.
+    
     Args:
         tickers (str): Comma-separated list of stock ticker symbols
+        priority (int): Alpha Vantage scheduler priority (INTERACTIVE, NORMAL or BATCH)
         
     Returns:
         dict: News sentiment data with whatever was successfully fetched
@@ -24,13 +169,13 @@ def get_news_sentiment(tickers):
     try:
         # Split tickers if provided as comma-separated string
         if isinstance(tickers, str):
-            ticker_list = [t.strip().upper() for t in tickers.split(',')]
+            ticker_list = [t.strip().upper() for t in tickers.split(',') if t.strip()]
         else:
-            ticker_list = [tickers.strip().upper()]
+            ticker_list = [t.strip().upper() for t in tickers]
+        ticker_list = list(dict.fromkeys(ticker_list))
         
         # Check for Alpha Vantage API key
-        api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
-        if not api_key:
+        if not scheduler.has_keys():
             error_msg = "Alpha Vantage API key not set. Please set ALPHA_VANTAGE_API_KEY in your environment variables."
             logger.error(error_msg)
             return {
@@ -39,20 +184,16 @@ def get_news_sentiment(tickers):
                 "results": {}
             }
         
-        # Fetch sentiment for each ticker
-        results = {}
+        # Fetch the feeds not cached yet
         has_error = False
         error_message = None
         
         for ticker in ticker_list:
+            if store.is_fresh(ticker):
+                continue
             logger.info(f"Fetching news sentiment for {ticker}")
-            url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={ticker}&apikey={api_key}"
-            
             try:
-                response = requests.get(url)
-                response.raise_for_status()
-                
-                data = response.json()
+                data = scheduler.request({'function': 'NEWS_SENTIMENT', 'tickers': ticker}, priority)
                 logger.debug(f"Response for {ticker}: {data}")
                 
                 # Check if we got valid data
@@ -75,79 +216,22 @@ def get_news_sentiment(tickers):
                         logger.warning(f"No news data found for {ticker}. Response: {data}")
                         continue
                 
-                # Process the news feed
-                news_feed = data['feed']
-                sentiment_scores = []
-                relevance_scores = []
-                ticker_news = []
-                
-                for article in news_feed:
-                    ticker_sentiment = None
-                    
-                    # Find the sentiment for this specific ticker
-                    for ticker_sentiment_item in article.get('ticker_sentiment', []):
-                        if ticker_sentiment_item.get('ticker') == ticker:
-                            ticker_sentiment = ticker_sentiment_item
-                            break
-                    
-                    if not ticker_sentiment:
-                        continue
-                    
-                    try:
-                        sentiment_score = float(ticker_sentiment.get('ticker_sentiment_score', 0))
-                        relevance_score = float(ticker_sentiment.get('relevance_score', 0))
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"Error parsing sentiment scores for {ticker}: {e}")
-                        continue
-                    
-                    sentiment_scores.append(sentiment_score)
-                    relevance_scores.append(relevance_score)
-                    
-                    # Keep the article if it's relevant enough (relevance > 0.2)
-                    if relevance_score > 0.2:  # Lowered threshold to get more news
-                        ticker_news.append({
-                            'title': article.get('title', 'No title'),
-                            'summary': article.get('summary', 'No summary'),
-                            'sentiment_score': sentiment_score,
-                            'relevance_score': relevance_score,
-                            'url': article.get('url', ''),
-                            'time_published': article.get('time_published', ''),
-                            'authors': article.get('authors', []),
-                            'source': article.get('source', 'Unknown')
-                        })
+                store.add_feed(ticker, data['feed'])
                 
-                if sentiment_scores:
-                    # Calculate average sentiment
-                    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores)
-                    
-                    # Classify overall sentiment
-                    sentiment_label = "Neutral"
-                    if avg_sentiment > 0.25:
-                        sentiment_label = "Bullish"
-                    elif avg_sentiment > 0.1:
-                        sentiment_label = "Somewhat Bullish"
-                    elif avg_sentiment < -0.25:
-                        sentiment_label = "Bearish"
-                    elif avg_sentiment < -0.1:
-                        sentiment_label = "Somewhat Bearish"
-                    
-                    # Save results
-                    results[ticker] = {
-                        'sentiment_score': avg_sentiment,
-                        'sentiment_label': sentiment_label,
-                        'news_count': len(ticker_news),
-                        'news': sorted(ticker_news, key=lambda x: x['relevance_score'], reverse=True)[:10]  # Top 10 most relevant news
-                    }
-                    
-                    logger.info(f"Successfully processed news sentiment for {ticker}")
-                
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, QuotaExhausted) as e:
                 error_msg = f"Error fetching data for {ticker}: {str(e)}"
                 logger.error(error_msg)
                 has_error = True
                 error_message = error_msg
                 continue  # Continue with other tickers
         
+        results = {}
+        for ticker in ticker_list:
+            sentiment = _ticker_sentiment(ticker, store.articles(ticker))
+            if sentiment is not None:
+                results[ticker] = sentiment
+                logger.info(f"Successfully processed news sentiment for {ticker}")
+        
         # Return both results and error status
         return {
             "has_error": has_error,
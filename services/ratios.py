@@ -1,5 +1,4 @@
 import logging
-import yfinance as yf
 # import yfinance_cache as yf
 import pandas as pd
 import numpy as np
@@ -7,6 +6,8 @@ from datetime import datetime
 import os
 import json
 
+from .yf_cache import get_info, get_statement
+
 logger = logging.getLogger(__name__)
 
 def get_financial_ratios(ticker_symbol):
@@ -22,14 +23,11 @@ def get_financial_ratios(ticker_symbol):
     try:
         logger.info(f"Calculating financial ratios for {ticker_symbol}")
         
-        # Initialize ticker object
-        ticker = yf.Ticker(ticker_symbol)
-        
         # Get financial data
-        info = ticker.info
-        income_stmt = ticker.income_stmt
-        balance_sheet = ticker.balance_sheet
-        cash_flow = ticker.cashflow
+        info = get_info(ticker_symbol)
+        income_stmt = get_statement(ticker_symbol, 'income_stmt')
+        balance_sheet = get_statement(ticker_symbol, 'balance_sheet')
+        cash_flow = get_statement(ticker_symbol, 'cashflow')
         
         ratios = {}
         
@@ -4,12 +4,13 @@ import os
 from collections import OrderedDict
 from datetime import datetime, timedelta
 
-import yfinance as yf
 # import yfinance_cache as yf
 import pandas as pd
 import numpy as np
 import requests
 
+from .yf_cache import get_info
+
 logger = logging.getLogger(__name__)
 
 def fetch_stock_basics(ticker):
@@ -19,8 +20,7 @@ def fetch_stock_basics(ticker):
         stock_data = OrderedDict()
         
         # Get ticker data
-        ticker_obj = yf.Ticker(ticker)
-        info = ticker_obj.info
+        info = get_info(ticker)
         
         # Basic company info
         stock_data['company_name'] = info.get('shortName', 'N/A')
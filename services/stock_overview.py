@@ -2,7 +2,9 @@ import json
 import logging
 from collections import OrderedDict
 import os
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Any, Optional
 
 from .stock_data import fetch_stock_basics
 from .financial_statement import get_company_financials
@@ -12,6 +14,51 @@ from .news_sentiment import get_news_sentiment
 
 logger = logging.getLogger(__name__)
 
+# Seconds each source may take before its section of the overview is given up on
+SOURCE_TIMEOUTS = {
+    'stock_data': 15,
+    'financials': 20,
+    'ratios': 20,
+    'news': 10  # Alpha Vantage, the slowest and most often throttled
+}
+DEFAULT_SOURCE_TIMEOUT = 15
+
+# Sources are I/O-bound; a source that times out keeps its worker until it returns
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='overview')
+
+def fetch_sources(ticker_symbol: str,
+                  sources: Dict[str, Callable[[str], Any]],
+                  timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Call every source with the ticker concurrently and return {source name: result}.
+    
+    Timeouts run from the same start, so the whole fetch takes about as long as
+    the slowest source that answers in time. A source that raises or times out
+    gets {'error': ...} as its result without affecting the others.
+    """
+    timeouts = {**SOURCE_TIMEOUTS, **(timeouts or {})}
+    started = time.monotonic()
+    futures = {name: _executor.submit(func, ticker_symbol) for name, func in sources.items()}
+    
+    results = {}
+    for name, future in futures.items():
+        timeout = timeouts.get(name, DEFAULT_SOURCE_TIMEOUT)
+        try:
+            results[name] = future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+        except FutureTimeout:
+            future.cancel()
+            logger.warning(f"{name} for {ticker_symbol} timed out after {timeout}s")
+            results[name] = {'error': f'{name} timed out after {timeout}s'}
+        except Exception as e:
+            logger.error(f"Error fetching {name} for {ticker_symbol}: {e}")
+            results[name] = {'error': str(e)}
+    logger.info(f"Fetched {', '.join(futures)} for {ticker_symbol} in {time.monotonic() - started:.2f}s")
+    return results
+
+def news_failure(news: Dict[str, Any]) -> Dict[str, Any]:
+    """News sentiment result for a source failure, in the shape get_news_sentiment reports errors"""
+    return {'has_error': True, 'error': news.get('error'), 'results': {}}
+
 def get_stock_overview(ticker_symbol: str) -> Dict[str, Any]:
     """
     Provides a comprehensive overview of a stock by aggregating data from various services
@@ -26,23 +73,24 @@ def get_stock_overview(ticker_symbol: str) -> Dict[str, Any]:
     try:
         logger.info(f"Fetching stock overview for {ticker_symbol}")
         
-        # Get basic stock data
-        stock_data = fetch_stock_basics(ticker_symbol)
-        if 'error' in stock_data:
-            return stock_data
-            
-        # Get key financial statements (most recent quarter)
-        financials = get_company_financials(ticker_symbol)
-        # financials = get_company_financials(ticker_symbol, period='quarterly', limit=1)
-        
-        # Get important financial ratios
-        ratios = get_financial_ratios(ticker_symbol)
-        
-        # Get economic indicators
+        # Basic stock data, key financial statements, important financial ratios
+        # and news sentiment, fetched at once; a slow source only loses its section
+        fetched = fetch_sources(ticker_symbol, {
+            'stock_data': fetch_stock_basics,
+            'financials': get_company_financials,
+            'ratios': get_financial_ratios,
+            'news': get_news_sentiment
+        })
         # economic = get_economic_indicators(ticker_symbol)
         
-        # Get news sentiment
-        news = get_news_sentiment(ticker_symbol)
+        stock_data = fetched['stock_data']
+        if 'error' in stock_data:
+            return stock_data
+        financials = fetched['financials']
+        ratios = fetched['ratios']
+        news = fetched['news']
+        if 'error' in news and 'has_error' not in news:
+            news = news_failure(news)
         
         # Combine all data into a comprehensive overview
         overview = OrderedDict([
@@ -146,6 +194,9 @@ def get_refined_data(stock_data):
 
         # Financial Statements
         financial_highlights = stock_data.get("financial_highlights", [])
+        if not isinstance(financial_highlights, list):
+            # {'error': ...} when the statements could not be fetched
+            financial_highlights = []
         
         # Initialize with default values (expanded with critical metrics)
         financial_statements = {
@@ -1,19 +1,18 @@
 import logging
 import os
 import requests
-import time
 from typing import Dict, Any, List
 from datetime import datetime
 import json
 
+from .alpha_vantage import API_KEYS, INTERACTIVE, QuotaExhausted, scheduler
+
 logger = logging.getLogger(__name__)
 
-# List of backup API keys - these would typically be stored securely, not in code
-BACKUP_KEYS = [
-    os.environ.get('ALPHA_VANTAGE_API_KEY'),  # Primary key from environment
-]
+# Keys the Alpha Vantage scheduler rotates across: ALPHA_VANTAGE_API_KEY, then ALPHA_VANTAGE_BACKUP_KEYS
+BACKUP_KEYS = API_KEYS
 
-def fetch_indicator(symbol, function, interval, time_period, series_type='close', apikey=None):
+def fetch_indicator(symbol, function, interval, time_period, series_type='close', apikey=None, priority=INTERACTIVE):
     """
     Fetches a technical indicator from Alpha Vantage.
 
@@ -23,60 +22,44 @@ def fetch_indicator(symbol, function, interval, time_period, series_type='close'
     - interval: Data interval ('1min', '5min', '15min', '30min', '60min', 'daily', 'weekly', 'monthly').
     - time_period: Time period (integer, e.g., 10).
     - series_type: Price type ('close', 'open', 'high', 'low').
-    - apikey: Alpha Vantage API key (defaults to env var ALPHA_VANTAGE_API_KEY).
+    - apikey: Additional Alpha Vantage API key for the scheduler to rotate across.
+    - priority: Scheduler priority (alpha_vantage.INTERACTIVE, NORMAL or BATCH).
 
     Returns a dict mapping timestamp -> indicator values.
     """
-    # Try with the provided key first
     if apikey:
-        result = try_fetch_with_key(symbol, function, interval, time_period, series_type, apikey)
-        if result and "Error Message" not in result and "Information" not in result:
-            # Save successful API response to JSON file
-            try:
-                os.makedirs('data_archive', exist_ok=True)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                file_path = os.path.join('data_archive', f'{symbol}_{function}_{interval}_{timestamp}.json')
-                with open(file_path, 'w') as f:
-                    json.dump(result, f, indent=4)
-                logger.info(f"Technical indicator data saved to {file_path}")
-            except Exception as e:
-                logger.error(f"Error saving technical indicator data to file: {str(e)}")
-            return result
+        scheduler.add_key(apikey)
     
-    # Try with backup keys
-    for key in BACKUP_KEYS:
-        if key and key != apikey:  # Skip if same as provided key
-            result = try_fetch_with_key(symbol, function, interval, time_period, series_type, key)
-            if result and "Error Message" not in result and "Information" not in result:
-                # Save successful API response to JSON file
-                try:
-                    os.makedirs('data_archive', exist_ok=True)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    file_path = os.path.join('data_archive', f'{symbol}_{function}_{interval}_{timestamp}.json')
-                    with open(file_path, 'w') as f:
-                        json.dump(result, f, indent=4)
-                    logger.info(f"Technical indicator data saved to {file_path}")
-                except Exception as e:
-                    logger.error(f"Error saving technical indicator data to file: {str(e)}")
-                return result
+    result = try_fetch(symbol, function, interval, time_period, series_type, priority)
+    if result and "Error Message" not in result and "Information" not in result:
+        # Save successful API response to JSON file
+        try:
+            os.makedirs('data_archive', exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            file_path = os.path.join('data_archive', f'{symbol}_{function}_{interval}_{timestamp}.json')
+            with open(file_path, 'w') as f:
+                json.dump(result, f, indent=4)
+            logger.info(f"Technical indicator data saved to {file_path}")
+        except Exception as e:
+            logger.error(f"Error saving technical indicator data to file: {str(e)}")
+        return result
+    if result:
+        return result
     
-    # If we get here, all keys failed or no valid keys available
+    # If we get here, the request failed outright
     return {"Error Message": "Could not fetch data. API keys may be missing, invalid, or rate limited."}
 
 
-def try_fetch_with_key(symbol, function, interval, time_period, series_type, apikey):
-    """Helper function to try fetching with a specific API key"""
+def try_fetch(symbol, function, interval, time_period, series_type, priority=INTERACTIVE):
+    """Helper function to fetch through the shared Alpha Vantage scheduler"""
     try:
-        base_url = "https://www.alphavantage.co/query"
-        
         # Build parameters based on indicator type
         params = {
             "symbol": symbol,
             "function": function,
             "interval": interval,
             "time_period": time_period,
-            "series_type": series_type,
-            "apikey": apikey
+            "series_type": series_type
         }
         
         # Special handling for certain indicators
@@ -89,13 +72,7 @@ def try_fetch_with_key(symbol, function, interval, time_period, series_type, api
             params.pop("series_type", None)
         
         # Make the request
-        response = requests.get(base_url, params=params)
-        
-        if response.status_code != 200:
-            logger.warning(f"Failed API request: {response.status_code}")
-            return None
-            
-        data = response.json()
+        data = scheduler.request(params, priority)
         
         # Check for API errors
         if "Error Message" in data:
@@ -119,7 +96,13 @@ def try_fetch_with_key(symbol, function, interval, time_period, series_type, api
             
         # Return the time series data
         return data[result_key]
-            
+    
+    except QuotaExhausted as e:
+        logger.warning(f"Indicator request not sent: {e}")
+        return {"Information": str(e)}
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Failed API request: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error fetching indicator: {e}")
         return {"Error Message": str(e)}
@@ -0,0 +1,126 @@
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.path.join('data_archive', 'transcripts')
+LEGACY_DIR = 'data_archive'  # Uncompressed {symbol}_earnings_transcript_{quarter}.json files
+
+_STORED_FILE = re.compile(r'^(?P<symbol>.+)_(?P<quarter>\d{4}Q[1-4])\.json\.gz$')
+_LEGACY_FILE = re.compile(r'^(?P<symbol>.+)_earnings_transcript_(?P<quarter>\d{4}[ _]?Q[1-4])\.json$', re.IGNORECASE)
+
+
+def normalize_quarter(quarter: str) -> str:
+    """'2023q1', '2023 Q1' or '2023/Q1' -> '2023Q1'"""
+    return re.sub(r'[\s/_-]', '', quarter).upper()
+
+
+def recent_quarters(count: int, today: Optional[date] = None) -> List[str]:
+    """The last count completed quarters, newest first"""
+    today = today or date.today()
+    year, quarter = today.year, (today.month - 1) // 3  # Quarter before the current one, 0 = Q4 of last year
+    quarters = []
+    for _ in range(count):
+        if quarter == 0:
+            year, quarter = year - 1, 4
+        quarters.append(f"{year}Q{quarter}")
+        quarter -= 1
+    return quarters
+
+
+class TranscriptStore:
+    """
+    Earnings call transcripts on disk, gzip-compressed, one file per
+    (symbol, quarter).
+
+    A published transcript never changes, so a stored one is served without
+    going back to the API. The index of stored quarters is built from the
+    directory on first use and kept up to date by put(). Transcripts archived
+    uncompressed by earlier versions are read too, and compressed into the
+    store the first time they are loaded.
+    """
+
+    def __init__(self, root: str = STORE_DIR, legacy_root: Optional[str] = LEGACY_DIR):
+        self.root = root
+        self.legacy_root = legacy_root
+        self._index: Optional[Dict[str, Set[str]]] = None  # Symbol -> stored quarters
+        self._legacy: Dict[str, Dict[str, str]] = {}  # Symbol -> {quarter: legacy file name}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, quarter: str) -> str:
+        return os.path.join(self.root, f"{symbol}_{quarter}.json.gz")
+
+    def _load_index(self) -> Dict[str, Set[str]]:
+        """Index of the store, scanning the directories the first time; call with the lock held"""
+        if self._index is None:
+            index: Dict[str, Set[str]] = {}
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    match = _STORED_FILE.match(name)
+                    if match:
+                        index.setdefault(match['symbol'].upper(), set()).add(match['quarter'])
+            if self.legacy_root and os.path.isdir(self.legacy_root):
+                for name in os.listdir(self.legacy_root):
+                    match = _LEGACY_FILE.match(name)
+                    if match:
+                        self._legacy.setdefault(match['symbol'].upper(), {})[normalize_quarter(match['quarter'])] = name
+            self._index = index
+        return self._index
+
+    def quarters(self, symbol: str) -> List[str]:
+        """Quarters with a transcript on disk for symbol, newest first"""
+        symbol = symbol.upper()
+        with self._lock:
+            index = self._load_index()
+            return sorted(index.get(symbol, set()) | set(self._legacy.get(symbol, {})), reverse=True)
+
+    def has(self, symbol: str, quarter: str) -> bool:
+        return normalize_quarter(quarter) in self.quarters(symbol)
+
+    def get(self, symbol: str, quarter: str) -> Optional[Dict[str, Any]]:
+        """The stored transcript data, None if it is not on disk"""
+        symbol, quarter = symbol.upper(), normalize_quarter(quarter)
+        with self._lock:
+            index = self._load_index()
+            stored = quarter in index.get(symbol, ())
+            legacy_name = None if stored else self._legacy.get(symbol, {}).get(quarter)
+        try:
+            if stored:
+                with gzip.open(self._path(symbol, quarter), 'rt', encoding='utf-8') as f:
+                    return json.load(f)
+            if legacy_name:
+                with open(os.path.join(self.legacy_root, legacy_name), 'r') as f:
+                    data = json.load(f)
+                self.put(symbol, quarter, data)
+                return data
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable stored transcript for {symbol} {quarter}: {e}")
+        return None
+
+    def put(self, symbol: str, quarter: str, data: Dict[str, Any]):
+        """Store a transcript, replacing the file atomically so readers never see part of it"""
+        symbol, quarter = symbol.upper(), normalize_quarter(quarter)
+        path = self._path(symbol, quarter)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error storing transcript for {symbol} {quarter}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._load_index().setdefault(symbol, set()).add(quarter)
+        logger.info(f"Stored transcript to {path}")
+
+
+store = TranscriptStore()
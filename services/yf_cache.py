@@ -0,0 +1,198 @@
+import copy
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+# Seconds each kind of Yahoo Finance data is reused for
+DEFAULT_TTLS = {
+    'info': 5 * 60,  # Quote and profile; prices move, the rest rarely does
+    'history': 5 * 60,
+    'download': 5 * 60,
+    'income_stmt': 24 * 60 * 60,  # Statements change once a quarter
+    'balance_sheet': 24 * 60 * 60,
+    'cashflow': 24 * 60 * 60,
+}
+
+STATEMENTS = ('income_stmt', 'balance_sheet', 'cashflow')
+
+
+class _Entry:
+    __slots__ = ('value', 'expires', 'size')
+
+    def __init__(self, value: Any, expires: float, size: int):
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+
+class _Flight:
+    """A fetch in progress that other callers for the same key wait on"""
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate memory held by a cached value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _copy(value: Any) -> Any:
+    """Copy mutable values handed out, so one caller's edits don't leak into the cache"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)  # Nested values too, e.g. info['companyOfficers']
+    return value
+
+
+class YFCache:
+    """
+    Process-wide cache of Yahoo Finance lookups.
+
+    Entries are keyed by ticker, data kind and call arguments and expire after
+    the TTL of their kind. Once the cached values exceed max_bytes the least
+    recently used ones are evicted. Concurrent misses for the same key are
+    single-flight: one thread fetches while the others wait for its result.
+    Failed and empty fetches are not cached.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, ttls: Optional[Dict[str, float]] = None):
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()  # Least recently used first
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, Hashable], loader: Callable[[], Any]) -> Any:
+        """Return the value cached for key = (ticker, kind, args), loading it on a miss"""
+        kind = key[1]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(entry.value)
+                self._drop(key)
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.misses += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.value)
+
+        try:
+            value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            if not _is_empty(value):
+                self._store(key, value, self.ttls.get(kind, DEFAULT_TTLS['info']))
+            return _copy(value)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    def _store(self, key: Hashable, value: Any, ttl: float):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable):
+        self._bytes -= self._entries.pop(key).size
+
+    def invalidate(self, ticker: Optional[str] = None, kind: Optional[str] = None):
+        """Drop cached values, optionally only those of one ticker and/or kind"""
+        with self._lock:
+            for key in list(self._entries):
+                if (ticker is None or key[0] == ticker) and (kind is None or key[1] == kind):
+                    self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def _is_empty(value: Any) -> bool:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.empty
+    return value is None or (isinstance(value, dict) and not value)
+
+
+cache = YFCache(max_bytes=int(os.environ.get('YF_CACHE_MAX_MB', 128)) * 1024 * 1024)
+
+# The loaders below use a new Ticker object: a Ticker keeps data once read, so
+# reading through a shared one would outlive the TTL of the data's kind
+
+
+def get_info(ticker: str) -> Dict[str, Any]:
+    """Ticker.info (quote, profile and key statistics)"""
+    ticker = ticker.upper()
+    return cache.get((ticker, 'info', ()), lambda: yf.Ticker(ticker).info)
+
+
+def get_statement(ticker: str, kind: str) -> pd.DataFrame:
+    """Annual income_stmt, balance_sheet or cashflow"""
+    if kind not in STATEMENTS:
+        raise ValueError(f"Unknown statement {kind!r}, expected one of {', '.join(STATEMENTS)}")
+    ticker = ticker.upper()
+    return cache.get((ticker, kind, ()), lambda: getattr(yf.Ticker(ticker), kind))
+
+
+def get_history(ticker: str, **kwargs) -> pd.DataFrame:
+    """Ticker.history, e.g. get_history('AAPL', period='10d')"""
+    ticker = ticker.upper()
+    return cache.get((ticker, 'history', tuple(sorted(kwargs.items()))),
+                     lambda: yf.Ticker(ticker).history(**kwargs))
+
+
+def download(ticker: str, **kwargs) -> pd.DataFrame:
+    """yf.download of a single ticker"""
+    ticker = ticker.upper()
+    return cache.get((ticker, 'download', tuple(sorted(kwargs.items()))),
+                     lambda: yf.download(ticker, **kwargs))
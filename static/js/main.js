@@ -24,7 +24,11 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Handle agent execution on results page
-    if (document.getElementById('agentContainer')) {
+    const agentContainer = document.getElementById('agentContainer');
+    if (agentContainer) {
+        // Receive agent results pushed over SocketIO as they complete
+        connectLiveUpdates(agentContainer.dataset.ticker);
+        
         // Start the autonomous agent workflow
         startAgentWorkflow();
     }
@@ -242,8 +246,119 @@ function createMiniChart(ticker, stockData) {
  * Handle autonomous agent workflow
  */
 function startAgentWorkflow() {
-    // Start with the first agent (data analyst)
-    runNextAgent('data_analyst');
+    const agents = ['data_analyst', 'trade_strategy', 'trade_advisor', 'risk_advisor'];
+    
+    // All agents run server-side in one call; independent ones run concurrently
+    agents.forEach(agent => {
+        updateAgentStatus(agent, 'processing');
+        const loadingSpinner = document.getElementById(`${agent}Loading`);
+        if (loadingSpinner) {
+            loadingSpinner.style.display = 'block';
+        }
+    });
+    updateProgressTracker();
+    
+    fetch('/run_all_agents', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status !== 'success') {
+            throw new Error(data.message || data.error || 'Analysis pipeline failed');
+        }
+        
+        agents.forEach(agent => renderAgentResults(agent, data.results[agent]));
+        updateProgressTracker();
+        updateWorkflowStatus(data.results.current_agent === 'completed' ? 'completed' : 'error');
+    })
+    .catch(error => {
+        // Fall back to running the agents one at a time
+        console.error('Error running the analysis pipeline:', error);
+        agents.forEach(agent => {
+            delete renderedResults[agent];
+            updateAgentStatus(agent, 'pending');
+        });
+        runNextAgent('data_analyst');
+    });
+}
+
+/**
+ * Show an agent's results unless the same results are already displayed
+ * (they may arrive both pushed over SocketIO and in the HTTP response)
+ */
+const renderedResults = {};
+
+function renderAgentResults(agentName, agentResults) {
+    const serialized = JSON.stringify(agentResults);
+    if (renderedResults[agentName] === serialized) return;
+    renderedResults[agentName] = serialized;
+    
+    updateAgentStatus(agentName, agentResults.status || 'completed');
+    displayAgentResults(agentName, agentResults);
+    updateProgressTracker();
+}
+
+/**
+ * Live agent updates over SocketIO.
+ *
+ * The server batches updates per room and sends each as a delta against the
+ * previous one for the same type, symbol and source; full updates (and the
+ * room state sent on joining) replace the stored value. A version gap means
+ * an update was missed, so the room state is requested again.
+ */
+const liveState = {};
+
+function applyDelta(target, changes, removed) {
+    Object.entries(changes).forEach(([key, value]) => {
+        if (value && typeof value === 'object' && !Array.isArray(value) &&
+                target[key] && typeof target[key] === 'object' && !Array.isArray(target[key])) {
+            applyDelta(target[key], value, []);
+        } else {
+            target[key] = value;
+        }
+    });
+    removed.forEach(path => {
+        let parent = target;
+        path.slice(0, -1).forEach(key => { parent = parent ? parent[key] : undefined; });
+        if (parent) delete parent[path[path.length - 1]];
+    });
+}
+
+function connectLiveUpdates(ticker) {
+    if (typeof io === 'undefined' || !ticker) return;
+    
+    const socket = io();
+    socket.on('connect', () => socket.emit('subscribe', { ticker: ticker }));
+    
+    socket.on('dtmac_updates', batch => {
+        batch.updates.forEach(update => {
+            const key = `${batch.room}|${update.type}|${update.symbol || ''}|${update.source}`;
+            const entry = liveState[key];
+            if (update.full) {
+                liveState[key] = { version: update.version, data: update.changes };
+            } else if (!entry || update.version !== entry.version + 1) {
+                // Missed an update; fetch the room's full state again
+                if (batch.room.startsWith('ticker:')) {
+                    socket.emit('subscribe', { ticker: ticker });
+                }
+                return;
+            } else {
+                applyDelta(entry.data, update.changes, update.removed);
+                entry.version = update.version;
+            }
+            
+            const data = liveState[key].data;
+            if (update.type === 'analysis_stage' && update.symbol === ticker && data.result) {
+                renderAgentResults(update.source, data.result);
+            }
+            document.dispatchEvent(new CustomEvent('dtmac-update', {
+                detail: { room: batch.room, type: update.type, symbol: update.symbol, source: update.source, data: data }
+            }));
+        });
+    });
 }
 
 /**
@@ -286,12 +401,8 @@ function runNextAgent(agentName) {
             // Get agent results
             const agentResults = data.results[agentName];
             
-            // Update agent status based on results
-            updateAgentStatus(agentName, agentResults.status || 'completed');
-            updateProgressTracker();
-            
-            // Display agent results
-            displayAgentResults(agentName, agentResults);
+            // Update agent status and display its results
+            renderAgentResults(agentName, agentResults);
             
             // Get the next agent from the response
             const nextAgent = data.results.current_agent;
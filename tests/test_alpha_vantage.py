@@ -0,0 +1,201 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from services import alpha_vantage
+from services.alpha_vantage import BATCH, INTERACTIVE, AlphaVantageScheduler, QuotaExhausted
+
+DAILY_LIMIT = {"Information": "We have detected your API key and our standard API rate limit is 25 requests per day."}
+MINUTE_LIMIT = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}
+
+
+class FakeClient:
+    def __init__(self, respond):
+        self.respond = respond  # apikey -> response data
+        self.calls = []
+
+    def get_json(self, url, params=None, timeout=None):
+        self.calls.append(params)
+        return self.respond(params["apikey"])
+
+
+@pytest.fixture(autouse=True)
+def budget(monkeypatch):
+    # Plenty of tokens per minute so no test waits on the bucket
+    monkeypatch.setattr(alpha_vantage, "CALLS_PER_MINUTE", 6000.0)
+    monkeypatch.setattr(alpha_vantage, "CALLS_PER_DAY", 25)
+    monkeypatch.setattr(alpha_vantage, "INTERACTIVE_RESERVE", 5)
+
+
+def use_client(monkeypatch, respond):
+    fake = FakeClient(respond)
+    monkeypatch.setattr(alpha_vantage, "client", fake)
+    return fake
+
+
+def test_no_keys_raises_quota_exhausted(monkeypatch):
+    use_client(monkeypatch, lambda key: {})
+    with pytest.raises(QuotaExhausted):
+        AlphaVantageScheduler([]).request({"function": "OVERVIEW"})
+
+
+def test_request_adds_apikey_and_counts_calls(monkeypatch):
+    fake = use_client(monkeypatch, lambda key: {"Symbol": "AAPL"})
+    scheduler = AlphaVantageScheduler(["key-one"])
+    assert scheduler.request({"function": "OVERVIEW", "symbol": "AAPL"}) == {"Symbol": "AAPL"}
+    assert fake.calls == [{"function": "OVERVIEW", "symbol": "AAPL", "apikey": "key-one"}]
+    state = scheduler.quota_state()
+    assert state["calls"] == 1
+    assert state["keys"][0]["calls_today"] == 1
+    assert state["keys"][0]["remaining_today"] == 24
+
+
+def test_identical_requests_in_flight_are_coalesced(monkeypatch):
+    entered = threading.Event()
+    release = threading.Event()
+
+    def respond(key):
+        entered.set()
+        release.wait(5)
+        return {"Symbol": "AAPL"}
+
+    fake = use_client(monkeypatch, respond)
+    scheduler = AlphaVantageScheduler(["key-one"])
+    params = {"function": "OVERVIEW", "symbol": "AAPL"}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.request(dict(params)))) for _ in range(3)]
+    threads[0].start()
+    assert entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while scheduler.quota_state()["coalesced"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [{"Symbol": "AAPL"}] * 3
+    assert len(fake.calls) == 1
+    assert scheduler.quota_state()["coalesced"] == 2
+
+
+def test_errors_reach_coalesced_callers_and_are_not_kept(monkeypatch):
+    def respond(key):
+        raise ValueError("boom")
+
+    use_client(monkeypatch, respond)
+    scheduler = AlphaVantageScheduler(["key-one"])
+    with pytest.raises(ValueError):
+        scheduler.request({"function": "OVERVIEW"})
+    assert scheduler.quota_state()["in_flight"] == 0
+
+
+def test_daily_limit_notice_rotates_to_another_key(monkeypatch):
+    fake = use_client(monkeypatch, lambda key: DAILY_LIMIT if key == "first-key" else {"Symbol": "AAPL"})
+    scheduler = AlphaVantageScheduler(["first-key", "second-key"])
+    # Both keys have the same budget; spend one call on the second so the first is picked
+    scheduler._keys["second-key"].calls_today = 1
+
+    assert scheduler.request({"function": "OVERVIEW"}) == {"Symbol": "AAPL"}
+    assert [call["apikey"] for call in fake.calls] == ["first-key", "second-key"]
+    first = scheduler.quota_state()["keys"][0]
+    assert first["remaining_today"] == 0
+
+
+def test_minute_limit_notice_cools_the_key_down(monkeypatch):
+    use_client(monkeypatch, lambda key: MINUTE_LIMIT if key == "first-key" else {"Symbol": "AAPL"})
+    scheduler = AlphaVantageScheduler(["first-key", "second-key"])
+    scheduler._keys["second-key"].calls_today = 1
+
+    assert scheduler.request({"function": "OVERVIEW"}) == {"Symbol": "AAPL"}
+    first = scheduler.quota_state()["keys"][0]
+    assert first["cooldown_seconds"] > 50
+    assert first["remaining_today"] == 24  # Not the daily limit
+
+
+def test_notice_is_returned_when_no_other_key_has_budget(monkeypatch):
+    use_client(monkeypatch, lambda key: DAILY_LIMIT)
+    scheduler = AlphaVantageScheduler(["only-key"])
+    assert scheduler.request({"function": "OVERVIEW"}) == DAILY_LIMIT
+    with pytest.raises(QuotaExhausted):
+        scheduler.request({"function": "OVERVIEW"})
+
+
+def test_batch_requests_leave_the_interactive_reserve(monkeypatch):
+    monkeypatch.setattr(alpha_vantage, "CALLS_PER_DAY", 3)
+    monkeypatch.setattr(alpha_vantage, "INTERACTIVE_RESERVE", 2)
+    use_client(monkeypatch, lambda key: {"ok": True})
+    scheduler = AlphaVantageScheduler(["key-one"])
+
+    scheduler.request({"symbol": "A"}, priority=BATCH)
+    with pytest.raises(QuotaExhausted, match="reserved"):
+        scheduler.request({"symbol": "B"}, priority=BATCH)
+    scheduler.request({"symbol": "C"}, priority=INTERACTIVE)
+    scheduler.request({"symbol": "D"}, priority=INTERACTIVE)
+    with pytest.raises(QuotaExhausted, match="exhausted"):
+        scheduler.request({"symbol": "E"}, priority=INTERACTIVE)
+
+
+def test_empty_bucket_waits_for_a_token(monkeypatch):
+    monkeypatch.setattr(alpha_vantage, "CALLS_PER_MINUTE", 600.0)  # One token every 0.1s
+    use_client(monkeypatch, lambda key: {"ok": True})
+    scheduler = AlphaVantageScheduler(["key-one"])
+    scheduler._keys["key-one"].tokens = 0
+
+    scheduler.request({"symbol": "A"})
+    assert scheduler.quota_state()["keys"][0]["tokens"] < 1
+
+
+def test_quota_state_masks_keys():
+    scheduler = AlphaVantageScheduler(["SECRETKEY123", "ab"])
+    keys = [entry["key"] for entry in scheduler.quota_state()["keys"]]
+    assert keys == ["SECR…", "…"]
+    assert "SECRETKEY123" not in str(scheduler.quota_state())
+
+
+def test_interactive_caller_joining_a_batch_request_lifts_its_priority(monkeypatch):
+    monkeypatch.setattr(alpha_vantage, "CALLS_PER_MINUTE", 120.0)  # One token every 0.5s
+    fake = use_client(monkeypatch, lambda key: {"ok": True})
+    scheduler = AlphaVantageScheduler(["key-one"])
+    scheduler._keys["key-one"].tokens = 0
+
+    normal = threading.Thread(target=scheduler.request, args=({"symbol": "NORMAL"}, alpha_vantage.NORMAL))
+    batch = threading.Thread(target=scheduler.request, args=({"symbol": "BATCH"}, BATCH))
+    joined = threading.Thread(target=scheduler.request, args=({"symbol": "BATCH"}, INTERACTIVE))
+    normal.start()
+    batch.start()
+    deadline = time.monotonic() + 5
+    while scheduler.quota_state()["waiting"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    joined.start()
+    for thread in (normal, batch, joined):
+        thread.join(5)
+
+    assert [call["symbol"] for call in fake.calls] == ["BATCH", "NORMAL"]
+
+
+def test_caller_retries_when_the_lower_priority_request_it_joined_ran_out_of_budget(monkeypatch):
+    fake = use_client(monkeypatch, lambda key: {"ok": True})
+    scheduler = AlphaVantageScheduler(["key-one"])
+    params = {"symbol": "A"}
+    # A batch request about to fail on the interactive reserve
+    flight = scheduler._in_flight[tuple(sorted(params.items()))] = alpha_vantage._Flight(BATCH)
+    results = []
+    joined = threading.Thread(target=lambda: results.append(scheduler.request(dict(params), INTERACTIVE)))
+    joined.start()
+    deadline = time.monotonic() + 5
+    while flight.priority != INTERACTIVE and time.monotonic() < deadline:
+        time.sleep(0.01)
+    flight.error = QuotaExhausted("Alpha Vantage quota left is reserved for interactive requests")
+    with scheduler._cond:
+        del scheduler._in_flight[tuple(sorted(params.items()))]
+    flight.done.set()
+    joined.join(5)
+
+    assert results == [{"ok": True}]
+    assert len(fake.calls) == 1
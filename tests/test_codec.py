@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+from agents.codec import decode_message, encode_message, pack, unpack
+from agents.dtmac import DTMessage, MessagePriority
+
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, 1, -1, 127, 128, -129, 2**63 - 1, -2**63,
+    0.0, -1.5, float("inf"), "", "AAPL", "ünïcödé", b"", b"\x00\xff",
+    [], [1, [2, [3]]], {}, {"symbol": "AAPL", "prices": [1.5, 2.5], "meta": {"n": None}},
+])
+def test_round_trip(value):
+    assert unpack(pack(value)) == value
+
+
+def test_tuples_decode_as_lists_and_keys_as_strings():
+    assert unpack(pack((1, 2))) == [1, 2]
+    assert unpack(pack({1: "a"})) == {"1": "a"}
+
+
+def test_datetime_round_trip():
+    value = datetime(2024, 1, 2, 3, 4, 5, 678000)
+    assert unpack(pack(value)) == value
+
+
+def test_small_values_stay_small():
+    assert len(pack(1)) == 2
+    assert len(pack("AAPL")) == 6
+
+
+def test_numpy_scalars_become_plain_numbers():
+    np = pytest.importorskip("numpy")
+    assert unpack(pack(np.int64(-5))) == -5
+    assert unpack(pack(np.float64(1.25))) == 1.25
+
+
+def test_rejects_unsupported_values():
+    with pytest.raises(TypeError):
+        pack(object())
+    with pytest.raises(OverflowError):
+        pack(2**64)
+    with pytest.raises(ValueError):
+        unpack(pack(1) + b"N")
+    with pytest.raises(ValueError):
+        unpack(b"?")
+
+
+def test_message_round_trip():
+    message = DTMessage("analyst", ["advisor", "risk"], {"symbol": "AAPL", "score": 0.5},
+                        "analysis_complete", MessagePriority.HIGH, {"correlation_id": "abc"})
+    decoded = decode_message(encode_message(message))
+
+    assert decoded.message_id == message.message_id
+    assert (decoded.seq, decoded.origin) == (message.seq, message.origin)
+    assert decoded.sender == message.sender
+    assert decoded.recipients == message.recipients
+    assert dict(decoded.content) == dict(message.content)
+    assert decoded.message_type == message.message_type
+    assert decoded.priority == MessagePriority.HIGH
+    assert decoded.metadata == message.metadata
+    assert decoded.timestamp_ns == message.timestamp_ns
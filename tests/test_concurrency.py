@@ -0,0 +1,103 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from agents.concurrency import run_blocking
+from agents.dtmac import DTMAC
+
+
+def square(value):
+    return value * value, os.getpid()
+
+
+def make_bus(concurrency=2):
+    dtmac = DTMAC()
+    dtmac.register_agent("analyst", [])
+    events = []
+    running = {"now": 0, "max": 0}
+
+    async def handle(message):
+        symbol, n = message.content["symbol"], message.content["n"]
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        events.append(("start", symbol, n))
+        await asyncio.sleep(0.02)
+        events.append(("end", symbol, n))
+        running["now"] -= 1
+
+    dtmac.register_handler("analyst", "analyse", handle)
+    dtmac.configure_concurrency("analyst", concurrency=concurrency)
+    return dtmac, events, running
+
+
+async def send_all(dtmac, messages):
+    for symbol, n in messages:
+        await dtmac.send_message("client", ["analyst"], {"symbol": symbol, "n": n}, "analyse")
+
+
+def test_partitions_run_concurrently_and_each_in_order():
+    async def scenario():
+        dtmac, events, running = make_bus()
+        await send_all(dtmac, [("AAPL", 1), ("MSFT", 1), ("AAPL", 2), ("MSFT", 2)])
+        await asyncio.sleep(0.2)
+        await dtmac.stop()
+        return events, running
+
+    events, running = asyncio.run(scenario())
+    assert running["max"] == 2
+    for symbol in ("AAPL", "MSFT"):
+        mine = [(kind, n) for kind, s, n in events if s == symbol]
+        assert mine == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+
+
+def test_concurrency_is_capped():
+    async def scenario():
+        dtmac, events, running = make_bus(concurrency=2)
+        await send_all(dtmac, [(symbol, 1) for symbol in ("A", "B", "C", "D", "E")])
+        await asyncio.sleep(0.3)
+        await dtmac.stop()
+        return events, running
+
+    events, running = asyncio.run(scenario())
+    assert running["max"] == 2
+    assert len([event for event in events if event[0] == "end"]) == 5
+
+
+def test_thread_executor_handler_runs_off_the_event_loop():
+    async def scenario():
+        dtmac = DTMAC()
+        dtmac.register_agent("analyst", [])
+        threads = []
+
+        def blocking(message):
+            threads.append(threading.get_ident())
+            time.sleep(0.1)
+
+        dtmac.register_handler("analyst", "analyse", blocking, executor="thread")
+        await dtmac.send_message("client", ["analyst"], {"symbol": "AAPL"}, "analyse")
+        # The loop keeps ticking while the handler blocks its thread
+        ticks = 0
+        started = time.monotonic()
+        while time.monotonic() - started < 0.15:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await dtmac.stop()
+        return threads, ticks
+
+    threads, ticks = asyncio.run(scenario())
+    assert threads and threads[0] != threading.get_ident()
+    assert ticks >= 5
+
+
+def test_run_blocking_in_a_process():
+    result, pid = asyncio.run(run_blocking(square, 7, executor="process"))
+    assert result == 49
+    assert pid != os.getpid()
+
+
+def test_run_blocking_rejects_unknown_executor():
+    with pytest.raises(ValueError):
+        asyncio.run(run_blocking(square, 7, executor="gpu"))
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from benchmarks import dtmac_benchmark
+from benchmarks.dtmac_benchmark import (build_plan, build_topology, compare, parse_args, parse_mix,
+                                        percentiles, run_scenario)
+
+SMALL = ["--messages", "200", "--agents", "4", "--topics", "3", "--symbols", "5",
+         "--history-size", "200", "--history-queries", "50", "--no-memory"]
+
+
+def test_percentiles_of_samples():
+    result = percentiles(list(range(1, 1001)))
+    assert result["p50"] == 501
+    assert result["p99"] == 991
+    assert result["max"] == 1000
+    assert percentiles([])["p99"] == 0.0
+
+
+def test_parse_mix_rejects_unknown_operations():
+    assert parse_mix("send=0.7,broadcast=0.3") == {"send": 0.7, "broadcast": 0.3}
+    with pytest.raises(ValueError):
+        parse_mix("send=1,publish=1")
+
+
+def test_topology_and_plan_are_seeded():
+    config = parse_args(SMALL)
+    first = build_topology(config, random.Random(1)), build_plan(config, "mixed", random.Random(1))
+    second = build_topology(config, random.Random(1)), build_plan(config, "mixed", random.Random(1))
+    assert first == second
+    assert len(first[1]) == 200
+    assert {operation for operation, _, _ in first[1]} == {"send", "broadcast"}
+
+
+@pytest.mark.parametrize("scenario", ["send", "broadcast", "mixed"])
+def test_traffic_scenarios_deliver_every_message(scenario):
+    result = asyncio.run(run_scenario(parse_args(SMALL), scenario))
+    assert result["messages"] == 200
+    assert result["handler_errors"] == 0
+    assert result["messages_per_sec"] > 0
+    if scenario == "send":
+        assert result["deliveries"] == 200
+
+
+def test_history_scenario_runs_its_queries():
+    result = asyncio.run(run_scenario(parse_args(SMALL), "history"))
+    assert result["history_messages"] == 200
+    assert result["queries"] == 50
+
+
+def test_compare_reports_regressions_beyond_threshold(capsys):
+    baseline = {"scenarios": {"send": {"messages_per_sec": 1000.0, "latency_us": {"p50": 10.0}}}}
+    current = {"scenarios": {"send": {"messages_per_sec": 800.0, "latency_us": {"p50": 10.5}}}}
+    assert compare(baseline, current, threshold=0.1) == ["send.messages_per_sec"]
+
+
+def test_main_writes_results_and_fails_on_regression(tmp_path):
+    output = tmp_path / "run.json"
+    assert dtmac_benchmark.main(SMALL + ["--scenarios", "send", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert list(results["scenarios"]) == ["send"]
+
+    results["scenarios"]["send"]["messages_per_sec"] *= 100
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(results))
+    assert dtmac_benchmark.main(SMALL + ["--scenarios", "send", "--output", str(output),
+                                         "--compare", str(baseline)]) == 1
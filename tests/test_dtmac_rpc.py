@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from agents.dtmac import DTMAC
+from agents.mailbox import OverflowPolicy
+
+
+def make_bus(overflow_policy=OverflowPolicy.COALESCE):
+    dtmac = DTMAC()
+    dtmac.register_agent("advisor", [])
+    dtmac.register_agent("client", [])
+    dtmac.configure_mailbox("advisor", capacity=100, overflow_policy=overflow_policy)
+    calls = []
+
+    async def handle_advice_request(message):
+        calls.append(message.content["symbol"])
+        await asyncio.sleep(0.01)
+        await dtmac.reply(message, "advisor", {"call": len(calls)}, "advice_response")
+
+    dtmac.register_handler("advisor", "advice_request", handle_advice_request)
+    return dtmac, calls
+
+
+def test_request_gets_reply():
+    async def scenario():
+        dtmac, _ = make_bus()
+        response = await dtmac.request("client", "advisor", {"symbol": "AAPL"}, "advice_request", timeout=1)
+        await dtmac.stop()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.message_type == "advice_response"
+    assert response.content["call"] == 1
+
+
+def test_concurrent_requests_for_same_symbol_are_not_coalesced():
+    async def scenario():
+        dtmac, calls = make_bus()
+        responses = await asyncio.gather(*(
+            dtmac.request("client", "advisor", {"symbol": "AAPL"}, "advice_request", timeout=1)
+            for _ in range(3)
+        ))
+        await dtmac.stop()
+        return responses, calls
+
+    responses, calls = asyncio.run(scenario())
+    assert calls == ["AAPL"] * 3
+    assert sorted(response.content["call"] for response in responses) == [1, 2, 3]
+
+
+def test_request_times_out_without_handler():
+    async def scenario():
+        dtmac, _ = make_bus()
+        try:
+            await dtmac.request("client", "advisor", {"symbol": "AAPL"}, "unknown_request", timeout=0.05)
+        finally:
+            await dtmac.stop()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(scenario())
+
+
+def test_failing_handler_replies_with_error():
+    async def scenario():
+        dtmac, _ = make_bus()
+
+        async def fail(message):
+            raise ValueError("boom")
+
+        dtmac.register_handler("advisor", "advice_request", fail)
+        response = await dtmac.request("client", "advisor", {"symbol": "AAPL"}, "advice_request", timeout=1)
+        await dtmac.stop()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.message_type == "error_response"
+    assert response.content["error"] == "boom"
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from services import earning_call_transcript
+from services.alpha_vantage import QuotaExhausted
+from services.transcript_store import TranscriptStore
+
+
+class FakeScheduler:
+    """Answers transcript requests from a dict of symbol -> response or exception"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def has_keys(self):
+        return True
+
+    def request(self, params, priority):
+        self.requested.append(params["symbol"])
+        response = self.responses.get(params["symbol"], {"transcript": [{"speaker": "CEO"}]})
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def fake_api(monkeypatch, tmp_path):
+    def install(responses):
+        scheduler = FakeScheduler(responses)
+        monkeypatch.setattr(earning_call_transcript, "scheduler", scheduler)
+        monkeypatch.setattr(earning_call_transcript, "store", TranscriptStore(str(tmp_path), None))
+        monkeypatch.setattr(earning_call_transcript, "_missing", {})
+        return scheduler
+    return install
+
+
+def test_prefetch_continues_past_a_bad_symbol(fake_api):
+    scheduler = fake_api({"BAD": {"Error Message": "Invalid API call"}})
+    results = earning_call_transcript.prefetch_transcripts(["BAD", "AAPL"], quarters=2)
+
+    assert list(results["BAD"].values()) == ["Invalid API call"] * 2
+    assert list(results["AAPL"].values()) == ["fetched"] * 2
+    assert scheduler.requested == ["BAD", "BAD", "AAPL", "AAPL"]
+
+
+def test_prefetch_stops_when_out_of_quota(fake_api):
+    scheduler = fake_api({"MSFT": QuotaExhausted("No Alpha Vantage budget left")})
+    results = earning_call_transcript.prefetch_transcripts(["AAPL", "MSFT", "GOOGL"], quarters=1)
+
+    assert list(results["AAPL"].values()) == ["fetched"]
+    assert list(results["MSFT"].values()) == ["No Alpha Vantage budget left"]
+    assert "GOOGL" not in results
+    assert scheduler.requested == ["AAPL", "MSFT"]
+
+
+def test_prefetch_stops_on_rate_limit_notice(fake_api):
+    notice = {"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day."}
+    fake_api({"AAPL": notice})
+    results = earning_call_transcript.prefetch_transcripts(["AAPL", "MSFT"], quarters=2)
+
+    assert len(results["AAPL"]) == 1
+    assert "MSFT" not in results
+
+
+def test_stored_quarters_cost_no_call(fake_api):
+    scheduler = fake_api({})
+    earning_call_transcript.prefetch_transcripts(["AAPL"], quarters=2)
+    results = earning_call_transcript.prefetch_transcripts(["AAPL"], quarters=2)
+
+    assert list(results["AAPL"].values()) == ["stored"] * 2
+    assert len(scheduler.requested) == 2
+
+
+def test_single_lookup_reports_quota_as_error(fake_api):
+    fake_api({"AAPL": QuotaExhausted("No Alpha Vantage budget left")})
+    assert earning_call_transcript.get_earnings_call_transcript("AAPL", "2024Q1") == {
+        "error": "No Alpha Vantage budget left"
+    }
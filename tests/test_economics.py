@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from services import economics
+
+
+class FakeHTTP:
+    """Stands in for AsyncHTTPClient, answering every series with two observations"""
+
+    def __init__(self, fail=()):
+        self.requested = []
+        self.fail = set(fail)
+
+    async def get_json(self, url, params=None):
+        self.requested.append(params["series_id"])
+        if params["series_id"] in self.fail:
+            raise ConnectionError("unreachable")
+        return {"observations": [{"date": "2024-02-01", "value": "110"}, {"date": "2024-01-01", "value": "100"}]}
+
+
+@pytest.fixture(autouse=True)
+def fred(monkeypatch, tmp_path):
+    monkeypatch.setenv("FRED_API_KEY", "test")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(economics, "HISTORY_DAYS", 100000)
+    economics._series_cache.clear()
+    yield tmp_path
+    economics._series_cache.clear()
+
+
+def test_async_fetch_summarizes_every_series(fred):
+    http = FakeHTTP()
+    results = asyncio.run(economics.get_economic_indicators_async(http))
+
+    assert sorted(http.requested) == sorted(economics.INDICATORS)
+    assert results["GDP"]["current_value"] == 110.0
+    assert results["GDP"]["change_pct"] == pytest.approx(10.0)
+    assert len(list((fred / "data_archive").iterdir())) == 1
+
+
+def test_async_fetch_serves_fresh_series_from_cache(fred):
+    asyncio.run(economics.get_economic_indicators_async(FakeHTTP()))
+    http = FakeHTTP()
+    results = asyncio.run(economics.get_economic_indicators_async(http))
+
+    assert http.requested == []
+    assert set(results) == set(economics.INDICATORS)
+    # Nothing new was fetched, so nothing new is archived
+    assert len(list((fred / "data_archive").iterdir())) == 1
+
+
+def test_async_fetch_skips_failed_series(fred):
+    results = asyncio.run(economics.get_economic_indicators_async(FakeHTTP(fail={"GDP"})))
+    assert "GDP" not in results
+    assert "UNRATE" in results
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    """Stands in for the pooled HTTP client used by the threaded fetch"""
+
+    def __init__(self, observations=None, status_code=200, delay=0.0):
+        self.params = []
+        self.observations = observations or [{"date": "2024-02-01", "value": "110"},
+                                             {"date": "2024-01-01", "value": "100"}]
+        self.status_code = status_code
+        self.delay = delay
+
+    def get(self, url, params=None, timeout=None):
+        self.params.append(params)
+        time.sleep(self.delay)
+        return FakeResponse(self.status_code, {"observations": self.observations})
+
+
+def expire_cache():
+    for cached in economics._series_cache.values():
+        cached.expires = 0
+
+
+def test_series_are_fetched_concurrently(fred, monkeypatch):
+    client = FakeClient(delay=0.05)
+    monkeypatch.setattr(economics, "client", client)
+
+    started = time.monotonic()
+    results = economics.get_economic_indicators()
+
+    assert time.monotonic() - started < 0.05 * len(economics.INDICATORS) / 2
+    assert sorted(params["series_id"] for params in client.params) == sorted(economics.INDICATORS)
+    assert results["UNRATE"]["current_value"] == 110.0
+
+
+def test_fresh_series_need_no_requests(fred, monkeypatch):
+    monkeypatch.setattr(economics, "client", FakeClient())
+    economics.get_economic_indicators()
+    client = FakeClient()
+    monkeypatch.setattr(economics, "client", client)
+
+    economics.get_economic_indicators()
+    assert client.params == []
+    assert len(list((fred / "data_archive").iterdir())) == 1
+
+
+def test_ttl_follows_release_frequency(fred, monkeypatch):
+    monkeypatch.setattr(economics, "client", FakeClient())
+    economics.get_economic_indicators()
+    daily = economics._series_cache["T10Y2Y"].expires
+    quarterly = economics._series_cache["GDP"].expires
+    assert quarterly - daily == pytest.approx(economics.FREQUENCY_TTLS["Q"] - economics.FREQUENCY_TTLS["D"], abs=1)
+
+
+def test_stale_series_are_refreshed_from_their_latest_date(fred, monkeypatch):
+    monkeypatch.setattr(economics, "client", FakeClient())
+    economics.get_economic_indicators()
+    expire_cache()
+    client = FakeClient(observations=[{"date": "2024-03-01", "value": "121"}, {"date": "2024-02-01", "value": "111"}])
+    monkeypatch.setattr(economics, "client", client)
+
+    results = economics.get_economic_indicators()
+
+    assert {params["observation_start"] for params in client.params} == {"2024-02-01"}
+    # The revised latest value replaces the cached one, older values are kept
+    assert [value["value"] for value in results["GDP"]["values"]] == [121.0, 111.0, 100.0]
+
+
+def test_failed_refresh_keeps_the_stale_series(fred, monkeypatch):
+    monkeypatch.setattr(economics, "client", FakeClient())
+    economics.get_economic_indicators()
+    expire_cache()
+    monkeypatch.setattr(economics, "client", FakeClient(status_code=503))
+
+    results = economics.get_economic_indicators()
+    assert results["GDP"]["current_value"] == 110.0
+
+
+def test_missing_api_key_returns_sample_data(fred, monkeypatch):
+    monkeypatch.delenv("FRED_API_KEY")
+    client = FakeClient()
+    monkeypatch.setattr(economics, "client", client)
+    assert economics.get_economic_indicators() == economics.get_sample_economic_data()
+    assert client.params == []
@@ -0,0 +1,181 @@
+import json
+import os
+import time
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+
+from services import historic_data
+from services.historic_data import DataArchiver
+
+
+def frame(rows):
+    df = pd.DataFrame(rows)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.set_index("Date")
+
+
+def bar(date, close):
+    return {"Date": date, "Open": close, "High": close, "Low": close, "Close": close, "Volume": 100.0}
+
+
+def write_archive(directory, rows, start, end, written="2024-01-10", ticker="AAPL"):
+    path = os.path.join(directory, f"{ticker}_historic_data_{start}_{end}.json")
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=2)
+    stamp = time.mktime(time.strptime(written, "%Y-%m-%d")) + 12 * 3600
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Serve get_historic_data from a dict of date -> close, recording each requested range"""
+    prices = {}
+    calls = []
+
+    def fake_download(ticker, start_date=None, end_date=None, interval="1d"):
+        calls.append((start_date, end_date))
+        rows = [bar(date, close) for date, close in sorted(prices.items()) if start_date <= date < end_date]
+        return historic_data._prepare_frame(frame(rows), ticker) if rows else pd.DataFrame()
+
+    monkeypatch.setattr(historic_data, "get_historic_data", fake_download)
+    return prices, calls
+
+
+def test_tail_is_appended_after_checking_a_settled_row(tmp_path, downloads):
+    prices, calls = downloads
+    archived = [bar("2024-01-02", 10.0), bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    write_archive(str(tmp_path), archived, "2024-01-01", "2024-01-05")
+    prices.update({"2024-01-02": 10.0, "2024-01-03": 11.0, "2024-01-04": 12.0, "2024-01-05": 13.0})
+
+    path = DataArchiver(str(tmp_path)).archive_historic_data("AAPL", "2024-01-01", "2024-01-06")
+
+    assert calls == [("2024-01-04", "2024-01-06")]
+    with open(path) as f:
+        assert [row["Close"] for row in json.load(f)] == [10.0, 11.0, 12.0, 13.0]
+
+
+def test_readjusted_prices_force_a_full_download(tmp_path, downloads):
+    prices, calls = downloads
+    archived = [bar("2024-01-02", 10.0), bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    write_archive(str(tmp_path), archived, "2024-01-01", "2024-01-05")
+    # A 2:1 split since the archive was written halves every adjusted price
+    prices.update({"2024-01-02": 5.0, "2024-01-03": 5.5, "2024-01-04": 6.0, "2024-01-05": 6.5})
+
+    path = DataArchiver(str(tmp_path)).archive_historic_data("AAPL", "2024-01-01", "2024-01-06")
+
+    assert calls[-1] == ("2024-01-01", "2024-01-06")
+    with open(path) as f:
+        assert [row["Close"] for row in json.load(f)] == [5.0, 5.5, 6.0, 6.5]
+
+
+def test_head_overlaps_the_first_archived_day(tmp_path, downloads):
+    prices, calls = downloads
+    archived = [bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    write_archive(str(tmp_path), archived, "2024-01-03", "2024-01-05")
+    prices.update({"2024-01-02": 10.0, "2024-01-03": 11.0, "2024-01-04": 12.0})
+
+    path = DataArchiver(str(tmp_path)).archive_historic_data("AAPL", "2024-01-01", "2024-01-05")
+
+    assert calls == [("2024-01-01", "2024-01-04")]
+    with open(path) as f:
+        assert [row["Date"] for row in json.load(f)] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+
+
+def test_empty_head_is_a_failure(tmp_path, downloads):
+    _, calls = downloads
+    archived = [bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    write_archive(str(tmp_path), archived, "2024-01-03", "2024-01-05")
+
+    archiver = DataArchiver(str(tmp_path))
+    assert archiver._archive_incremental("AAPL", "2024-01-01", "2024-01-05") is None
+
+
+def test_rewrite_tail_replaces_last_rows(tmp_path):
+    archived = [bar("2024-01-02", 10.0), bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    path = write_archive(str(tmp_path), archived, "2024-01-01", "2024-01-05")
+    rows = archived[:2] + [bar("2024-01-04", 12.5), bar("2024-01-05", 13.0)]
+
+    assert DataArchiver(str(tmp_path))._rewrite_tail(path, archived, rows)
+    with open(path) as f:
+        assert json.load(f) == rows
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")] == []
+
+
+def test_bulk_refresh_downloads_missing_ranges_in_bulk(tmp_path, downloads, monkeypatch):
+    _, single_calls = downloads
+    prices = {"2024-01-02": 10.0, "2024-01-03": 11.0, "2024-01-04": 12.0, "2024-01-05": 13.0}
+    bulk_calls = []
+
+    def fake_bulk(tickers, start_date=None, end_date=None):
+        bulk_calls.append((sorted(tickers), start_date, end_date))
+        rows = [bar(date, close) for date, close in sorted(prices.items()) if start_date <= date < end_date]
+        return pd.concat({ticker: frame(rows) for ticker in tickers}, axis=1)
+
+    monkeypatch.setattr(historic_data, "get_historic_data_bulk", fake_bulk)
+    archived = [bar("2024-01-02", 10.0), bar("2024-01-03", 11.0), bar("2024-01-04", 12.0)]
+    for ticker in ("AAPL", "MSFT"):
+        write_archive(str(tmp_path), archived, "2024-01-01", "2024-01-05", ticker=ticker)
+
+    results = DataArchiver(str(tmp_path)).archive_historic_data_bulk(
+        ["AAPL", "MSFT", "NVDA"], "2024-01-01", "2024-01-06")
+
+    assert single_calls == []
+    assert bulk_calls == [(["AAPL", "MSFT"], "2024-01-04", "2024-01-06"),
+                          (["NVDA"], "2024-01-01", "2024-01-06")]
+    for ticker in ("AAPL", "MSFT", "NVDA"):
+        with open(results[ticker]) as f:
+            assert [row["Close"] for row in json.load(f)] == [10.0, 11.0, 12.0, 13.0]
+
+
+def panel(data):
+    """Bulk panel of ticker -> rows, aligned on the union of their dates like yf.download(group_by='ticker')"""
+    return pd.concat({ticker: frame(rows) for ticker, rows in data.items()}, axis=1).sort_index()
+
+
+def test_panel_ticker_frame_drops_alignment_rows():
+    bulk = panel({"AAPL": [bar("2024-01-02", 10.0), bar("2024-01-03", 11.0)],
+                  "NEW": [bar("2024-01-03", 5.0)]})
+
+    df = historic_data.panel_ticker_frame(bulk, "new")
+    assert list(df["Date"]) == ["2024-01-03"]
+    assert list(df["Close"]) == [5.0]
+    assert list(historic_data.panel_ticker_frame(bulk, "AAPL")["Date"]) == ["2024-01-02", "2024-01-03"]
+
+
+def test_panel_ticker_frame_of_missing_ticker_is_empty():
+    bulk = panel({"AAPL": [bar("2024-01-02", 10.0)]})
+    assert historic_data.panel_ticker_frame(bulk, "MSFT").empty
+    assert historic_data.panel_ticker_frame(pd.DataFrame(), "AAPL").empty
+
+
+def test_bulk_download_batches_tickers_and_drops_failed_ones(monkeypatch):
+    batches = []
+
+    def fake_download(tickers, **kwargs):
+        batches.append(list(tickers))
+        df = panel({ticker: [bar("2024-01-02", 10.0)] for ticker in tickers})
+        if "BAD" in tickers:
+            df[("BAD", "Close")] = float("nan")
+            df = df.drop(columns=[c for c in df.columns if c[0] == "BAD" and c[1] != "Close"])
+        return df
+
+    monkeypatch.setattr(historic_data.yf, "download", fake_download)
+    bulk = historic_data.get_historic_data_bulk(["aapl", "MSFT", "AAPL", "BAD"], "2024-01-01", "2024-01-05",
+                                                batch_size=2)
+
+    assert batches == [["AAPL", "MSFT"], ["BAD"]]
+    assert sorted(set(bulk.columns.get_level_values(0))) == ["AAPL", "MSFT"]
+
+
+def test_archive_bulk_from_a_panel_writes_one_file_per_ticker(tmp_path):
+    bulk = panel({"AAPL": [bar("2024-01-02", 10.0)], "MSFT": [bar("2024-01-02", 20.0)]})
+    results = DataArchiver(str(tmp_path)).archive_historic_data_bulk(
+        ["AAPL", "MSFT", "NVDA"], "2024-01-01", "2024-01-05", panel=bulk)
+
+    with open(results["MSFT"]) as f:
+        assert [row["Close"] for row in json.load(f)] == [20.0]
+    assert results["NVDA"] == "No data available for NVDA"
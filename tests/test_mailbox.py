@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from agents.dtmac import DTMessage, MessagePriority
+from agents.mailbox import Mailbox, OverflowPolicy
+
+
+def message(symbol=None, priority=MessagePriority.NORMAL, message_type="update", metadata=None, **content):
+    if symbol is not None:
+        content["symbol"] = symbol
+    return DTMessage("sender", ["agent"], content, message_type, priority, metadata)
+
+
+def drain(mailbox):
+    messages = []
+    while not mailbox.empty():
+        messages.append(mailbox.get_nowait())
+    return messages
+
+
+def test_higher_priority_first_fifo_within_level():
+    mailbox = Mailbox()
+    low = message("A", MessagePriority.LOW)
+    normal_1 = message("B")
+    critical = message("C", MessagePriority.CRITICAL)
+    normal_2 = message("D")
+    for m in (low, normal_1, critical, normal_2):
+        mailbox.put_nowait(m)
+
+    assert mailbox.messages() == [critical, normal_1, normal_2, low]
+    assert drain(mailbox) == [critical, normal_1, normal_2, low]
+    with pytest.raises(asyncio.QueueEmpty):
+        mailbox.get_nowait()
+
+
+def test_get_waits_for_a_message():
+    async def scenario():
+        mailbox = Mailbox()
+        getter = asyncio.create_task(mailbox.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        m = message("A")
+        mailbox.put_nowait(m)
+        return m, await asyncio.wait_for(getter, 1)
+
+    sent, received = asyncio.run(scenario())
+    assert received is sent
+
+
+def test_block_policy_waits_for_room():
+    async def scenario():
+        mailbox = Mailbox(capacity=1, overflow_policy=OverflowPolicy.BLOCK)
+        first, second = message("A"), message("B")
+        await mailbox.put(first)
+        with pytest.raises(asyncio.QueueFull):
+            mailbox.put_nowait(second)
+        putter = asyncio.create_task(mailbox.put(second))
+        await asyncio.sleep(0)
+        assert not putter.done()
+        assert mailbox.get_nowait() is first
+        await asyncio.wait_for(putter, 1)
+        return mailbox
+
+    mailbox = asyncio.run(scenario())
+    assert len(mailbox) == 1
+    assert mailbox.max_depth == 1
+
+
+def test_drop_oldest_evicts_lowest_priority_first():
+    mailbox = Mailbox(capacity=2, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    low, normal, high = message("A", MessagePriority.LOW), message("B"), message("C", MessagePriority.HIGH)
+    mailbox.put_nowait(low)
+    mailbox.put_nowait(normal)
+    mailbox.put_nowait(high)
+
+    assert drain(mailbox) == [high, normal]
+    assert mailbox.dropped == 1
+
+
+def test_drop_oldest_drops_an_incoming_message_of_lower_priority():
+    mailbox = Mailbox(capacity=1, overflow_policy=OverflowPolicy.DROP_OLDEST)
+    normal = message("A")
+    mailbox.put_nowait(normal)
+    mailbox.put_nowait(message("B", MessagePriority.LOW))
+
+    assert drain(mailbox) == [normal]
+    assert mailbox.dropped == 1
+
+
+def test_coalesce_keeps_position_and_latest_content():
+    mailbox = Mailbox(overflow_policy=OverflowPolicy.COALESCE)
+    mailbox.put_nowait(message("A", price=1))
+    mailbox.put_nowait(message("B", price=2))
+    mailbox.put_nowait(message("A", price=3))
+
+    assert [(m.content["symbol"], m.content["price"]) for m in drain(mailbox)] == [("A", 3), ("B", 2)]
+    assert mailbox.coalesced == 1
+
+
+def test_coalesce_moves_message_whose_priority_changed():
+    mailbox = Mailbox(overflow_policy=OverflowPolicy.COALESCE)
+    mailbox.put_nowait(message("A", MessagePriority.LOW, price=1))
+    mailbox.put_nowait(message("B", price=2))
+    mailbox.put_nowait(message("A", MessagePriority.HIGH, price=3))
+
+    assert len(mailbox) == 2
+    assert [m.content["price"] for m in drain(mailbox)] == [3, 2]
+
+
+def test_full_mailbox_ignores_coalesced_away_entries():
+    mailbox = Mailbox(capacity=2, overflow_policy=OverflowPolicy.COALESCE)
+    mailbox.put_nowait(message("A", MessagePriority.LOW))
+    normal = message("B")
+    mailbox.put_nowait(normal)
+    # Moves A to HIGH, leaving a dead entry at LOW
+    high = message("A", MessagePriority.HIGH)
+    mailbox.put_nowait(high)
+
+    # LOW holds no live message, so the incoming LOW message is the least important one
+    mailbox.put_nowait(message("C", MessagePriority.LOW))
+    assert drain(mailbox) == [high, normal]
+    assert mailbox.dropped == 1
+
+
+def test_requests_are_never_coalesced():
+    mailbox = Mailbox(overflow_policy=OverflowPolicy.COALESCE)
+    first = message("A", message_type="advice_request", metadata={"correlation_id": "1"})
+    second = message("A", message_type="advice_request", metadata={"correlation_id": "2"})
+    mailbox.put_nowait(first)
+    mailbox.put_nowait(second)
+
+    assert drain(mailbox) == [first, second]
+    assert mailbox.coalesced == 0
+
+
+def test_extract_and_requeue():
+    source = Mailbox()
+    target = Mailbox(capacity=1)
+    keep, move_1, move_2 = message("A"), message("B"), message("B", MessagePriority.HIGH)
+    for m in (keep, move_1, move_2):
+        source.put_nowait(m)
+
+    moved = source.extract(lambda m: m.content["symbol"] == "B")
+    assert moved == [move_2, move_1]
+    assert source.messages() == [keep]
+
+    # Handed-over messages are queued past capacity
+    for m in moved:
+        target.requeue(m)
+    assert drain(target) == [move_2, move_1]
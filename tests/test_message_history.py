@@ -0,0 +1,48 @@
+import time
+
+from agents.dtmac import DTMessage
+from agents.message_history import MessageHistory
+
+
+def message(sender, recipients, message_type):
+    return DTMessage(sender, recipients, {}, message_type)
+
+
+def test_count_cap_evicts_oldest():
+    history = MessageHistory(max_messages=2, max_age=None)
+    messages = [message("a", ["b"], "t") for _ in range(3)]
+    for m in messages:
+        history.append(m)
+
+    assert list(history) == messages[1:]
+    assert history.get("a") == messages[1:]
+    assert history.get(message_type="t") == messages[1:]
+
+
+def test_age_cap_evicts_expired():
+    history = MessageHistory(max_age=0.01)
+    history.append(message("a", ["b"], "t"))
+    time.sleep(0.02)
+    assert len(history) == 0
+    assert history.get("a") == []
+
+
+def test_filters_by_agent_and_type():
+    history = MessageHistory()
+    ping = message("a", ["b"], "ping")
+    pong = message("b", ["a"], "pong")
+    other = message("c", ["d"], "ping")
+    for m in (ping, pong, other):
+        history.append(m)
+
+    assert history.get("a") == [ping, pong]
+    assert history.get("b", "pong") == [pong]
+    assert history.get(message_type="ping") == [ping, other]
+    assert history.get("d", "pong") == []
+
+
+def test_sender_also_recipient_is_indexed_once():
+    history = MessageHistory(max_messages=1)
+    history.append(message("a", ["a"], "self"))
+    history.append(message("b", ["c"], "t"))
+    assert history.get("a") == []
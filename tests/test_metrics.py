@@ -0,0 +1,104 @@
+import asyncio
+
+from agents.dtmac import DTMAC
+from agents.metrics import DTMACMetrics, Histogram, RateCounter
+
+
+def test_histogram_counts_values_into_buckets():
+    histogram = Histogram(bounds=(1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert histogram.counts == [2, 1, 1]
+    assert snapshot["buckets"] == {"1.0": 2, "2.0": 1, "+Inf": 1}
+    assert snapshot["mean"] == 1.5
+    assert snapshot["max"] == 3.0
+
+
+def test_quantile_is_the_upper_bound_of_its_bucket():
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    for value in [0.5] * 50 + [1.5] * 45 + [3.0] * 5:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 1.0
+    assert histogram.quantile(0.95) == 2.0
+    assert histogram.quantile(0.99) == 3.0  # Capped at the largest value seen
+
+
+def test_quantile_of_the_overflow_bucket_is_the_max():
+    histogram = Histogram(bounds=(1.0,))
+    histogram.observe(0.5)
+    histogram.observe(7.0)
+    assert histogram.quantile(0.99) == 7.0
+
+
+def test_quantile_of_empty_histogram_is_zero():
+    assert Histogram().quantile(0.5) == 0.0
+    assert Histogram().snapshot()["mean"] == 0.0
+
+
+def test_rate_counts_events_within_the_window():
+    counter = RateCounter(window=10)
+    for now in (100.0, 100.5, 101.2, 105.0):
+        counter.add(now)
+    assert counter.rate(105.5) == 4 / 10
+
+
+def test_rate_drops_slots_that_left_the_window():
+    counter = RateCounter(window=10)
+    counter.add(100.0)
+    counter.add(101.0)
+    counter.add(108.0)
+    # Second 100 leaves the window at 110, 101 at 111
+    assert counter.rate(110.0) == 2 / 10
+    assert counter.rate(111.0) == 1 / 10
+
+
+def test_rate_resets_after_a_gap_longer_than_the_window():
+    counter = RateCounter(window=10)
+    for now in range(100, 110):
+        counter.add(float(now))
+    assert counter.rate(109.0) == 1.0
+    assert counter.rate(500.0) == 0.0
+    counter.add(500.0)
+    assert counter.rate(500.0) == 1 / 10
+
+
+def test_record_handled_and_unhandled_per_agent_and_type():
+    metrics = DTMACMetrics()
+    metrics.record_handled("advisor", "advice", latency=0.001, handler_time=0.01, error=False)
+    metrics.record_handled("advisor", "advice", latency=0.002, handler_time=0.02, error=True)
+    metrics.record_unhandled("advisor")
+
+    snapshot = metrics.snapshot("advisor", {"depth": 3})
+    assert snapshot["queue"] == {"depth": 3}
+    assert snapshot["handled"] == 2
+    assert snapshot["errors"] == 1
+    assert snapshot["unhandled"] == 1
+    assert snapshot["message_types"]["advice"]["latency"]["count"] == 2
+    assert snapshot["messages_per_sec"] > 0
+    assert metrics.snapshot("nobody")["handled"] == 0
+
+
+def test_dtmac_records_handled_messages_and_errors():
+    async def scenario():
+        dtmac = DTMAC()
+        dtmac.register_agent("advisor", [])
+
+        async def handle(message):
+            if message.content.get("fail"):
+                raise ValueError("boom")
+
+        dtmac.register_handler("advisor", "advice", handle)
+        await dtmac.send_message("client", ["advisor"], {}, "advice")
+        await dtmac.send_message("client", ["advisor"], {"fail": True}, "advice")
+        await dtmac.send_message("client", ["advisor"], {}, "unknown")
+        await asyncio.sleep(0.05)
+        metrics = dtmac.get_metrics("advisor")
+        await dtmac.stop()
+        return metrics
+
+    metrics = asyncio.run(scenario())
+    assert metrics["handled"] == 2
+    assert metrics["errors"] == 1
+    assert metrics["unhandled"] == 1
+    assert metrics["message_types"]["advice"]["handler_time"]["count"] == 2
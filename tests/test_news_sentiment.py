@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from services.news_sentiment import NewsStore
+
+
+def article(url, *tickers, title="Title"):
+    return {
+        "url": url,
+        "title": title,
+        "ticker_sentiment": [{"ticker": ticker, "ticker_sentiment_score": "0.3", "relevance_score": "0.5"}
+                             for ticker in tickers]
+    }
+
+
+def test_shared_article_is_stored_once_and_indexed_under_every_ticker():
+    store = NewsStore()
+    store.add_feed("AAPL", [article("https://a", "AAPL", "MSFT")])
+    store.add_feed("MSFT", [article("https://a", "AAPL", "MSFT")])
+
+    assert len(store.articles("AAPL")) == 1
+    assert len(store.articles("MSFT")) == 1
+    assert len(store._articles) == 1
+
+
+def test_related_ticker_uses_articles_fetched_for_another():
+    store = NewsStore()
+    store.add_feed("AAPL", [article("https://a", "AAPL", "MSFT")])
+    assert [a["url"] for a in store.articles("MSFT")] == ["https://a"]
+    assert not store.is_fresh("MSFT")
+    assert store.is_fresh("AAPL")
+
+
+def test_refetched_article_replaces_its_ticker_index():
+    store = NewsStore()
+    store.add_feed("AAPL", [article("https://a", "AAPL", "MSFT")])
+    store.add_feed("AAPL", [article("https://a", "AAPL", title="Updated")])
+
+    assert store.articles("AAPL")[0]["title"] == "Updated"
+    assert store.articles("MSFT") == []
+
+
+def test_articles_without_url_are_keyed_by_title_and_time():
+    store = NewsStore()
+    first = {"title": "Same", "time_published": "20240101T000000", "ticker_sentiment": [{"ticker": "AAPL"}]}
+    store.add_feed("AAPL", [first, dict(first)])
+    assert len(store.articles("AAPL")) == 1
+
+
+def test_articles_expire_after_article_ttl():
+    store = NewsStore(article_ttl=0.01)
+    store.add_feed("AAPL", [article("https://old", "AAPL")])
+    time.sleep(0.02)
+    store.add_feed("MSFT", [article("https://new", "MSFT")])
+
+    assert store.articles("AAPL") == []
+    assert "AAPL" not in store._by_ticker
+    assert [a["url"] for a in store.articles("MSFT")] == ["https://new"]
+
+
+def test_feed_freshness_follows_cache_ttl():
+    store = NewsStore(cache_ttl=0.01)
+    store.add_feed("AAPL", [])
+    assert store.is_fresh("AAPL")
+    time.sleep(0.02)
+    assert not store.is_fresh("AAPL")
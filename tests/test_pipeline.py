@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.pipeline import Pipeline, Stage
+
+CONTEXT = {"ticker": "AAPL", "start_date": "2024-01-01"}
+
+
+def counting(name, calls, result=None, delay=0.0):
+    async def func(context, inputs):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        return result if result is not None else {"stage": name, "inputs": sorted(inputs)}
+    return func
+
+
+def test_independent_stages_overlap_and_dependents_wait():
+    calls = []
+    pipeline = Pipeline([
+        Stage("data", counting("data", calls, delay=0.05)),
+        Stage("strategy", counting("strategy", calls, delay=0.1), depends_on=("data",)),
+        Stage("risk", counting("risk", calls, delay=0.1), depends_on=("data",)),
+    ])
+
+    started = time.monotonic()
+    results = asyncio.run(pipeline.run(CONTEXT))
+    elapsed = time.monotonic() - started
+
+    assert calls[0] == "data"
+    assert results["strategy"]["inputs"] == ["data"]
+    assert elapsed < 0.24  # 0.05 + 0.1, not 0.05 + 0.1 + 0.1
+
+
+def test_results_are_cached_per_context():
+    calls = []
+    pipeline = Pipeline([Stage("data", counting("data", calls))])
+    asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run({**CONTEXT, "ticker": "MSFT"}))
+    assert calls == ["data", "data"]
+
+
+def test_version_change_invalidates_the_cached_result():
+    calls = []
+    version = {"value": 1}
+    pipeline = Pipeline([Stage("data", counting("data", calls), version=lambda context: version["value"])])
+    asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run(CONTEXT))
+    version["value"] = 2
+    asyncio.run(pipeline.run(CONTEXT))
+    assert calls == ["data", "data"]
+
+
+def test_version_errors_disable_caching():
+    calls = []
+
+    def version(context):
+        raise OSError("archive missing")
+
+    pipeline = Pipeline([Stage("data", counting("data", calls), version=version)])
+    asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run(CONTEXT))
+    assert calls == ["data", "data"]
+
+
+def test_ttl_expires_cached_results():
+    calls = []
+    pipeline = Pipeline([Stage("data", counting("data", calls), ttl=0.01)])
+    asyncio.run(pipeline.run(CONTEXT))
+    time.sleep(0.02)
+    asyncio.run(pipeline.run(CONTEXT))
+    assert calls == ["data", "data"]
+
+
+def test_uncached_stage_always_runs():
+    calls = []
+    pipeline = Pipeline([Stage("data", counting("data", calls), cache=False)])
+    asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run(CONTEXT))
+    assert calls == ["data", "data"]
+
+
+def test_failures_are_not_cached_and_skip_dependents():
+    calls = []
+    pipeline = Pipeline([
+        Stage("data", counting("data", calls, result={"error": "no data"})),
+        Stage("risk", counting("risk", calls), depends_on=("data",)),
+    ])
+    results = asyncio.run(pipeline.run(CONTEXT))
+    asyncio.run(pipeline.run(CONTEXT))
+
+    assert calls == ["data", "data"]
+    assert results["risk"]["error"].startswith("Skipped because data failed")
+
+
+def test_exceptions_become_error_results():
+    def broken(context, inputs):
+        raise RuntimeError("boom")
+
+    results = asyncio.run(Pipeline([Stage("data", broken)]).run(CONTEXT))
+    assert results == {"data": {"error": "boom"}}
+
+
+def test_invalidate_drops_one_stage_or_context():
+    calls = []
+    pipeline = Pipeline([Stage("data", counting("data", calls)), Stage("risk", counting("risk", calls))])
+    asyncio.run(pipeline.run(CONTEXT))
+    pipeline.invalidate(stage="risk", context=CONTEXT)
+    asyncio.run(pipeline.run(CONTEXT))
+    assert sorted(calls) == ["data", "risk", "risk"]
+
+
+def test_selected_stages_run_with_their_dependencies_only():
+    calls = []
+    pipeline = Pipeline([
+        Stage("data", counting("data", calls)),
+        Stage("risk", counting("risk", calls), depends_on=("data",)),
+        Stage("strategy", counting("strategy", calls)),
+    ])
+    results = asyncio.run(pipeline.run(CONTEXT, stages=["risk"]))
+    assert sorted(results) == ["data", "risk"]
+
+
+def test_on_result_reports_each_stage():
+    reported = []
+    pipeline = Pipeline([Stage("data", counting("data", [])), Stage("risk", counting("risk", []), depends_on=("data",))])
+    asyncio.run(pipeline.run(CONTEXT, on_result=lambda name, result: reported.append(name)))
+    assert reported == ["data", "risk"]
+
+
+def test_invalid_graphs_are_rejected():
+    noop = counting("noop", [])
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([Stage("a", noop, depends_on=("b",)), Stage("b", noop, depends_on=("a",))])
+    with pytest.raises(ValueError, match="unknown stage"):
+        Pipeline([Stage("a", noop, depends_on=("missing",))])
+    with pytest.raises(ValueError, match="Duplicate"):
+        Pipeline([Stage("a", noop), Stage("a", noop)])
+    with pytest.raises(ValueError, match="no rate limit"):
+        Pipeline([Stage("a", noop, upstreams={"yahoo": 1})])
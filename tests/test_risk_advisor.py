@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from agents.dtmac import DTMAC
+from agents.risk_advisor_agent import RiskAdvisorAgent
+
+
+@pytest.fixture
+def advisor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return RiskAdvisorAgent(DTMAC())
+
+
+def test_risk_assessment_does_not_watch_the_symbol(advisor):
+    advisor.dtmac.register_agent("client", [])
+    advisor.analyze_risk = lambda symbol: {"risk_score": 0.5}
+
+    async def scenario():
+        response = await advisor.dtmac.request("client", "risk_advisor", {"symbol": "AAPL"},
+                                               "risk_assessment_request", timeout=5)
+        await advisor.dtmac.stop()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.content["assessment"] == {"risk_score": 0.5}
+    assert advisor.watched_symbols == set()
+
+
+def test_watch_symbol_messages_start_and_stop_rescoring(advisor):
+    async def scenario():
+        await advisor.dtmac.send_message("ui_agent", ["risk_advisor"], {"symbol": "AAPL", "watch": True}, "watch_symbol")
+        await asyncio.sleep(0.05)
+        watched = set(advisor.watched_symbols)
+        await advisor.dtmac.send_message("ui_agent", ["risk_advisor"], {"symbol": "AAPL", "watch": False}, "watch_symbol")
+        await asyncio.sleep(0.05)
+        await advisor.dtmac.stop()
+        return watched
+
+    assert asyncio.run(scenario()) == {"AAPL"}
+    assert advisor.watched_symbols == set()
+
+
+def test_watching_stops_at_the_cap(advisor, monkeypatch):
+    monkeypatch.setattr(RiskAdvisorAgent, "MAX_WATCHED_SYMBOLS", 2)
+
+    async def scenario():
+        results = [advisor.watch_symbol(symbol) for symbol in ("AAPL", "MSFT", "NVDA", "AAPL")]
+        await advisor.dtmac.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [True, True, False, True]
+    assert advisor.watched_symbols == {"AAPL", "MSFT"}
@@ -0,0 +1,170 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.dtmac import DTMAC
+from agents.scheduler import TimerScheduler
+
+
+def recorder():
+    fired = []
+
+    def make(name):
+        async def action():
+            fired.append((name, time.monotonic()))
+        return action
+
+    return fired, make
+
+
+def test_one_shot_timer_fires_once_and_is_forgotten():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("once"), delay=0.01)
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        return fired, len(scheduler)
+
+    fired, remaining = asyncio.run(scenario())
+    assert [name for name, _ in fired] == ["once"]
+    assert remaining == 0
+
+
+def test_timers_fire_in_due_order():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("late"), delay=0.04)
+        scheduler.schedule(make("early"), delay=0.01)  # Wakes the scheduler sleeping for the later one
+        await asyncio.sleep(0.08)
+        scheduler.stop()
+        return fired
+
+    assert [name for name, _ in asyncio.run(scenario())] == ["early", "late"]
+
+
+def test_recurring_timer_keeps_firing():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("tick"), delay=0.01, interval=0.02)
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+        return fired
+
+    assert 3 <= len(asyncio.run(scenario())) <= 6
+
+
+def test_missed_intervals_are_skipped_not_replayed():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("tick"), delay=0.0, interval=0.05)
+        await asyncio.sleep(0.01)
+        time.sleep(0.3)  # Block the loop for six intervals
+        resumed = time.monotonic()
+        await asyncio.sleep(0.07)
+        scheduler.stop()
+        return fired, resumed
+
+    fired, resumed = asyncio.run(scenario())
+    after = [at for _, at in fired if at >= resumed]
+    # One late firing on resuming, then back on the interval; not six catching up
+    assert 1 <= len(after) <= 2
+    if len(after) == 2:
+        assert after[1] - after[0] >= 0.04
+
+
+def test_rescheduling_a_key_replaces_its_timer():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("first"), delay=0.01, key="AAPL")
+        scheduler.schedule(make("second"), delay=0.02, key="AAPL")
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        return fired
+
+    assert [name for name, _ in asyncio.run(scenario())] == ["second"]
+
+
+def test_cancel_by_key_and_id():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+        scheduler.schedule(make("keyed"), delay=0.01, interval=0.01, key="AAPL")
+        timer_id = scheduler.schedule(make("plain"), delay=0.01)
+        results = [scheduler.cancel_key("AAPL"), scheduler.cancel_key("AAPL"),
+                   scheduler.cancel(timer_id), scheduler.cancel(timer_id)]
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        return fired, results, len(scheduler)
+
+    fired, results, remaining = asyncio.run(scenario())
+    assert fired == []
+    assert results == [True, False, True, False]
+    assert remaining == 0
+
+
+def test_cancelled_timers_are_compacted_out_of_the_heap():
+    async def scenario():
+        scheduler = TimerScheduler()
+        _, make = recorder()
+        ids = [scheduler.schedule(make(i), delay=60) for i in range(200)]
+        for timer_id in ids[:150]:
+            scheduler.cancel(timer_id)
+        heap_size = len(scheduler._heap)
+        scheduler.stop()
+        return heap_size, len(scheduler)
+
+    heap_size, remaining = asyncio.run(scenario())
+    assert remaining == 50
+    # Compacted once more than half the heap was cancelled; 49 cancelled entries since then
+    assert heap_size == 99
+
+
+def test_interval_must_be_positive():
+    async def scenario():
+        with pytest.raises(ValueError):
+            TimerScheduler().schedule(recorder()[1]("x"), delay=0, interval=0)
+
+    asyncio.run(scenario())
+
+
+def test_failing_action_does_not_stop_the_scheduler():
+    async def scenario():
+        scheduler = TimerScheduler()
+        fired, make = recorder()
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        scheduler.schedule(broken, delay=0.0)
+        scheduler.schedule(make("after"), delay=0.02)
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        return fired
+
+    assert [name for name, _ in asyncio.run(scenario())] == ["after"]
+
+
+def test_dtmac_schedule_message_delivers_and_cancels_by_key():
+    async def scenario():
+        dtmac = DTMAC()
+        dtmac.register_agent("advisor", [])
+        received = []
+
+        async def handle(message):
+            received.append(message.content["symbol"])
+
+        dtmac.register_handler("advisor", "rescore", handle)
+        dtmac.schedule_message("advisor", ["advisor"], {"symbol": "AAPL"}, "rescore", delay=0.01, key="AAPL")
+        dtmac.schedule_message("advisor", ["advisor"], {"symbol": "MSFT"}, "rescore", delay=0.01, key="MSFT")
+        dtmac.cancel_scheduled(key="MSFT")
+        await asyncio.sleep(0.05)
+        await dtmac.stop()
+        return received
+
+    assert asyncio.run(scenario()) == ["AAPL"]
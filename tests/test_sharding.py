@@ -0,0 +1,74 @@
+import asyncio
+
+from agents.dtmac import DTMAC
+from agents.sharding import HashRing
+
+
+SYMBOLS = [f"SYM{i}" for i in range(1000)]
+
+
+def test_keys_map_stably_and_spread_over_nodes():
+    ring = HashRing(["a", "b", "c"])
+    owners = {symbol: ring.get(symbol) for symbol in SYMBOLS}
+    assert owners == {symbol: HashRing(["a", "b", "c"]).get(symbol) for symbol in SYMBOLS}
+    counts = {node: list(owners.values()).count(node) for node in ring.nodes}
+    assert all(200 < count < 500 for count in counts.values())
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(["a", "b", "c"])
+    before = {symbol: ring.get(symbol) for symbol in SYMBOLS}
+    ring.add("d")
+    after = {symbol: ring.get(symbol) for symbol in SYMBOLS}
+
+    moved = [symbol for symbol in SYMBOLS if before[symbol] != after[symbol]]
+    assert all(after[symbol] == "d" for symbol in moved)
+    assert 100 < len(moved) < 400
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(["a", "b", "c"])
+    before = {symbol: ring.get(symbol) for symbol in SYMBOLS}
+    ring.remove("b")
+
+    assert "b" not in ring
+    for symbol in SYMBOLS:
+        if before[symbol] != "b":
+            assert ring.get(symbol) == before[symbol]
+        else:
+            assert ring.get(symbol) in ("a", "c")
+
+
+def test_empty_ring():
+    ring = HashRing()
+    assert len(ring) == 0
+    assert ring.get("AAPL") is None
+
+
+def test_replicas_handle_each_symbol_in_order():
+    async def scenario():
+        dtmac = DTMAC()
+        handled = []
+        for replica in ("worker#0", "worker#1"):
+            dtmac.register_replica("worker", replica, ["quotes"])
+
+            async def handle(message, replica=replica):
+                handled.append((replica, message.content["symbol"], message.content["n"]))
+
+            dtmac.register_handler(replica, "quote", handle)
+
+        for n in range(3):
+            for symbol in SYMBOLS[:20]:
+                await dtmac.broadcast_to_topic("feed", "quotes", {"symbol": symbol, "n": n}, "quote")
+        for _ in range(20):
+            await asyncio.sleep(0)
+        await dtmac.stop()
+        return dtmac, handled
+
+    dtmac, handled = asyncio.run(scenario())
+    ring = dtmac.replica_groups["worker"]
+    assert len(handled) == 60
+    for symbol in SYMBOLS[:20]:
+        seen = [(replica, n) for replica, handled_symbol, n in handled if handled_symbol == symbol]
+        assert [n for _, n in seen] == [0, 1, 2]
+        assert {replica for replica, _ in seen} == {ring.get(symbol)}
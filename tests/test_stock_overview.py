@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from services import stock_overview
+from services.stock_overview import fetch_sources
+
+
+def slow(seconds, result):
+    def source(ticker):
+        time.sleep(seconds)
+        return {**result, "ticker": ticker}
+    return source
+
+
+def test_sources_are_fetched_concurrently():
+    started = time.monotonic()
+    results = fetch_sources("AAPL", {name: slow(0.1, {"name": name}) for name in ("a", "b", "c")})
+    assert time.monotonic() - started < 0.25
+    assert results == {name: {"name": name, "ticker": "AAPL"} for name in ("a", "b", "c")}
+
+
+def test_slow_source_times_out_without_holding_the_others():
+    release = threading.Event()
+
+    def stuck(ticker):
+        release.wait(5)
+        return {}
+
+    started = time.monotonic()
+    results = fetch_sources("AAPL", {"fast": slow(0.0, {}), "stuck": stuck}, timeouts={"stuck": 0.1})
+    elapsed = time.monotonic() - started
+    release.set()
+
+    assert results["fast"] == {"ticker": "AAPL"}
+    assert results["stuck"] == {"error": "stuck timed out after 0.1s"}
+    assert elapsed < 0.5
+
+
+def test_timeouts_run_from_the_same_start():
+    # Both take 0.15s against 0.2s timeouts: waiting on them in turn must not add up
+    results = fetch_sources("AAPL", {"a": slow(0.15, {}), "b": slow(0.15, {})}, timeouts={"a": 0.2, "b": 0.2})
+    assert "error" not in results["a"] and "error" not in results["b"]
+
+
+def test_failing_source_reports_an_error():
+    def broken(ticker):
+        raise RuntimeError("boom")
+
+    results = fetch_sources("AAPL", {"ok": slow(0.0, {}), "broken": broken})
+    assert results["broken"] == {"error": "boom"}
+    assert results["ok"] == {"ticker": "AAPL"}
+
+
+def test_overview_keeps_other_sections_when_news_fails(monkeypatch):
+    basics = {"ticker": "AAPL", "company_name": "Apple", "sector": "Tech", "industry": "Hardware",
+              "close": 1.0, "percent_change": 0.0, "52_week_range": "1 - 2", "volume": 1, "beta": 1.0,
+              "vwap": 1.0, "market_cap": 1, "pe_ratio": 1.0, "eps": 1.0, "dividend_yield": 0.0}
+
+    def news(ticker):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(stock_overview, "fetch_stock_basics", lambda ticker: basics)
+    monkeypatch.setattr(stock_overview, "get_company_financials", lambda ticker: {})
+    monkeypatch.setattr(stock_overview, "get_financial_ratios", lambda ticker: {})
+    monkeypatch.setattr(stock_overview, "get_news_sentiment", news)
+
+    overview = stock_overview.get_stock_overview("AAPL")
+    assert overview["company_info"]["name"] == "Apple"
+    assert "error" not in overview
+    assert overview["news_sentiment"] == {"has_error": True, "error": "throttled", "results": {}}
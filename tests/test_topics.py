@@ -0,0 +1,54 @@
+from agents.topics import TopicIndex, symbol_topic
+
+
+def test_symbol_topic():
+    assert symbol_topic("market_data", "AAPL") == "market_data.AAPL"
+    assert symbol_topic("market_data", None) == "market_data"
+
+
+def test_dotted_ticker_is_one_segment():
+    index = TopicIndex()
+    index.subscribe("market_data.*", "wildcard")
+    index.subscribe(symbol_topic("market_data", "BRK.B"), "brk")
+    topic = symbol_topic("market_data", "BRK.B")
+    assert len(topic.split(".")) == 2
+    assert sorted(index.match(topic)) == ["brk", "wildcard"]
+    assert index.match(symbol_topic("market_data", "AAPL")) == ["wildcard"]
+
+
+def test_parent_subscription_receives_subtopics():
+    index = TopicIndex()
+    index.subscribe("market_data", "analyst")
+    index.subscribe("market_data.AAPL", "aapl")
+    assert index.match("market_data") == ["analyst"]
+    assert sorted(index.match("market_data.AAPL")) == ["aapl", "analyst"]
+    assert index.match("market_data.MSFT") == ["analyst"]
+    assert index.match("risk_alerts.AAPL") == []
+
+
+def test_wildcard_matches_exactly_one_segment():
+    index = TopicIndex()
+    index.subscribe("risk_alerts.*", "risk")
+    assert index.match("risk_alerts.AAPL") == ["risk"]
+    assert index.match("risk_alerts") == []
+    # Deeper topics are subtopics of the matched one
+    assert index.match("risk_alerts.AAPL.var") == ["risk"]
+
+
+def test_subscribers_are_deduplicated():
+    index = TopicIndex()
+    index.subscribe("market_data", "agent")
+    index.subscribe("market_data.*", "agent")
+    index.subscribe("market_data", "agent")
+    assert index.match("market_data.AAPL") == ["agent"]
+
+
+def test_unsubscribe_invalidates_cache_and_prunes():
+    index = TopicIndex()
+    index.subscribe("market_data.AAPL", "aapl")
+    assert index.match("market_data.AAPL") == ["aapl"]
+    index.unsubscribe("market_data.AAPL", "aapl")
+    assert index.match("market_data.AAPL") == []
+    assert index._root.children == {}
+    # Unknown patterns and agents are ignored
+    index.unsubscribe("nothing.here", "aapl")
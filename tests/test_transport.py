@@ -0,0 +1,53 @@
+import asyncio
+
+from agents.base_agent import BaseAgent
+from agents.dtmac import DTMAC
+from agents.transport import ProcessTransport
+
+
+class EchoAgent(BaseAgent):
+    """Worker-hosted agent: announces itself from a timer set up in start(), echoes requests"""
+
+    def __init__(self, dtmac, replica=None):
+        super().__init__("echo", dtmac, ["echo_topic"], replica)
+        self.dtmac.register_handler(self.agent_id, "announce", self.handle_announce)
+        self.dtmac.register_handler(self.agent_id, "echo", self.handle_echo)
+
+    async def start(self):
+        self.schedule_message(self.agent_id, {}, "announce", delay=0.01)
+        self.subscribe(["late_topic"])
+
+    async def get_status(self):
+        return {"status": "active"}
+
+    async def handle_announce(self, message):
+        await self.send_to_agent("collector", {"started": True}, "started")
+
+    async def handle_echo(self, message):
+        await self.reply(message, dict(message.content), "echo_response")
+
+
+def test_worker_agent_starts_and_replies():
+    async def scenario():
+        dtmac = DTMAC()
+        dtmac.register_agent("collector", [])
+        started = asyncio.get_running_loop().create_future()
+
+        async def handle_started(message):
+            started.set_result(message.content["started"])
+
+        dtmac.register_handler("collector", "started", handle_started)
+        transport = ProcessTransport(dtmac)
+        try:
+            await transport.spawn(EchoAgent)
+            was_started = await asyncio.wait_for(started, 30)
+            response = await dtmac.request("collector", "echo", {"symbol": "AAPL"}, "echo", timeout=30)
+            return was_started, dict(response.content), dtmac.get_topic_subscribers("late_topic")
+        finally:
+            await transport.stop()
+            await dtmac.stop()
+
+    was_started, content, late_subscribers = asyncio.run(scenario())
+    assert was_started is True
+    assert content == {"symbol": "AAPL"}
+    assert late_subscribers == ["echo"]
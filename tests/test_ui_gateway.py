@@ -0,0 +1,119 @@
+import asyncio
+
+from agents.dtmac import DTMAC, DTMessage, MessagePriority
+from agents.ui_gateway_agent import MARKET_ROOM, UIGatewayAgent, diff, session_room, ticker_room
+
+
+def make_gateway(**kwargs):
+    emitted = []
+    gateway = UIGatewayAgent(DTMAC(), lambda event, data, room: emitted.append((room, data["updates"])),
+                             flush_interval=60, **kwargs)
+    return gateway, emitted
+
+
+def update(content, message_type="risk_update", sender="risk_advisor", session_id=None):
+    metadata = {"session_id": session_id} if session_id else None
+    return DTMessage(sender, ["ui_agent"], content, message_type, MessagePriority.NORMAL, metadata)
+
+
+def receive(gateway, *messages):
+    async def scenario():
+        for message in messages:
+            await gateway.handle_update(message)
+        gateway._flusher.cancel()
+        gateway.flush()
+
+    asyncio.run(scenario())
+
+
+def test_diff_reports_nested_changes_and_removed_paths():
+    changes, removed = diff({"a": 1, "b": {"c": 1, "d": 2}, "e": 3}, {"a": 1, "b": {"c": 2}, "f": 4})
+    assert changes == {"b": {"c": 2}, "f": 4}
+    assert sorted(removed) == [["b", "d"], ["e"]]
+
+
+def test_first_update_is_full_and_later_ones_are_deltas():
+    gateway, emitted = make_gateway()
+    receive(gateway, update({"symbol": "AAPL", "score": 1, "level": "low"}))
+    receive(gateway, update({"symbol": "AAPL", "score": 2, "level": "low"}))
+
+    (room, first), (_, second) = emitted
+    assert room == ticker_room("AAPL")
+    assert first[0]["full"] and first[0]["version"] == 1
+    assert first[0]["changes"] == {"symbol": "AAPL", "score": 1, "level": "low"}
+    assert not second[0]["full"] and second[0]["version"] == 2
+    assert second[0]["changes"] == {"score": 2}
+
+
+def test_updates_within_an_interval_are_batched_per_room_keeping_the_latest():
+    gateway, emitted = make_gateway()
+    receive(gateway,
+            update({"symbol": "AAPL", "score": 1}),
+            update({"symbol": "AAPL", "score": 2}),
+            update({"symbol": "AAPL", "action": "buy"}, message_type="trading_advice", sender="trade_advisor"),
+            update({"indicators": {}}, message_type="economic_update", sender="data_analyst"))
+
+    batches = dict(emitted)
+    assert len(emitted) == 2
+    assert [(u["type"], u["changes"]) for u in batches[ticker_room("AAPL")]] == [
+        ("risk_update", {"symbol": "AAPL", "score": 2}),
+        ("trading_advice", {"symbol": "AAPL", "action": "buy"}),
+    ]
+    assert batches[MARKET_ROOM][0]["type"] == "economic_update"
+
+
+def test_unchanged_update_is_not_sent_again():
+    gateway, emitted = make_gateway()
+    receive(gateway, update({"symbol": "AAPL", "score": 1}))
+    receive(gateway, update({"symbol": "AAPL", "score": 1}))
+    assert len(emitted) == 1
+
+
+def test_session_updates_also_go_to_the_session_room():
+    gateway, emitted = make_gateway()
+    receive(gateway, update({"symbol": "AAPL", "score": 1}, session_id="abc"))
+    assert sorted(room for room, _ in emitted) == [session_room("abc"), ticker_room("AAPL")]
+
+
+def test_room_state_holds_latest_full_content_and_versions():
+    gateway, _ = make_gateway()
+    receive(gateway, update({"symbol": "AAPL", "score": 1}))
+    receive(gateway, update({"symbol": "AAPL", "score": 2}))
+
+    state = gateway.room_state(ticker_room("AAPL"))
+    assert state["room"] == ticker_room("AAPL")
+    assert state["updates"] == [{"type": "risk_update", "symbol": "AAPL", "source": "risk_advisor",
+                                 "version": 2, "full": True, "changes": {"symbol": "AAPL", "score": 2},
+                                 "removed": []}]
+    assert gateway.room_state("ticker:NONE")["updates"] == []
+
+
+def test_forgotten_room_sends_its_next_update_in_full():
+    gateway, emitted = make_gateway()
+    receive(gateway, update({"symbol": "AAPL", "score": 1}, session_id="abc"))
+    gateway.forget_room(session_room("abc"))
+    assert gateway.room_state(session_room("abc"))["updates"] == []
+    assert not any(room == session_room("abc") for room, _ in gateway._versions)
+
+    receive(gateway, update({"symbol": "AAPL", "score": 2}, session_id="abc"))
+    session_batch = [batch for room, batch in emitted if room == session_room("abc")][-1]
+    assert session_batch[0]["full"] and session_batch[0]["version"] == 1
+
+
+def test_idle_rooms_expire():
+    gateway, _ = make_gateway(room_ttl=0)
+    receive(gateway, update({"symbol": "AAPL", "score": 1}, session_id="abc"))
+    assert gateway.room_state(session_room("abc"))["updates"] == []
+    assert gateway.room_state(ticker_room("AAPL"))["updates"] == []
+
+
+def test_least_recently_used_rooms_beyond_max_rooms_are_forgotten():
+    gateway, _ = make_gateway(max_rooms=2)
+    for symbol in ("AAPL", "MSFT", "NVDA"):
+        receive(gateway, update({"symbol": symbol, "score": 1}))
+    receive(gateway, update({"indicators": {}}, message_type="economic_update", sender="data_analyst"))
+
+    assert gateway.room_state(ticker_room("AAPL"))["updates"] == []
+    assert gateway.room_state(ticker_room("MSFT"))["updates"]
+    assert gateway.room_state(ticker_room("NVDA"))["updates"]
+    assert gateway.room_state(MARKET_ROOM)["updates"]  # The market room is never forgotten
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+
+from services.yf_cache import YFCache
+
+
+def test_hit_returns_cached_value():
+    cache = YFCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"price": 1}
+
+    assert cache.get(("AAPL", "info", ()), loader) == {"price": 1}
+    assert cache.get(("AAPL", "info", ()), loader) == {"price": 1}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_nested_values_are_copied():
+    cache = YFCache()
+    info = cache.get(("AAPL", "info", ()), lambda: {"companyOfficers": [{"name": "A"}]})
+    info["companyOfficers"].append({"name": "B"})
+    info["companyOfficers"][0]["name"] = "changed"
+    assert cache.get(("AAPL", "info", ()), lambda: {}) == {"companyOfficers": [{"name": "A"}]}
+
+
+def test_entries_expire_after_ttl():
+    cache = YFCache(ttls={"info": 0.01})
+    cache.get(("AAPL", "info", ()), lambda: {"price": 1})
+    time.sleep(0.02)
+    assert cache.get(("AAPL", "info", ()), lambda: {"price": 2}) == {"price": 2}
+
+
+def test_least_recently_used_entry_is_evicted():
+    value = {"data": "x" * 1000}
+    cache = YFCache(max_bytes=3000)
+    cache.get(("A", "info", ()), lambda: dict(value))
+    cache.get(("B", "info", ()), lambda: dict(value))
+    cache.get(("A", "info", ()), lambda: {"reloaded": True})  # A is now the most recently used
+    cache.get(("C", "info", ()), lambda: dict(value))
+    assert cache.get(("A", "info", ()), lambda: {"reloaded": True}) == value
+    assert cache.get(("B", "info", ()), lambda: {"reloaded": True}) == {"reloaded": True}
+
+
+def test_failed_and_empty_fetches_are_not_cached():
+    cache = YFCache()
+
+    def fail():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError):
+        cache.get(("AAPL", "info", ()), fail)
+    assert cache.get(("AAPL", "info", ()), lambda: {}) == {}
+    assert cache.get(("AAPL", "info", ()), lambda: {"price": 1}) == {"price": 1}
+
+
+def test_concurrent_misses_are_single_flight():
+    cache = YFCache()
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return {"price": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(("AAPL", "info", ()), loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"price": 1}] * 5
+
+
+def test_invalidate_by_ticker():
+    cache = YFCache()
+    cache.get(("AAPL", "info", ()), lambda: {"price": 1})
+    cache.get(("MSFT", "info", ()), lambda: {"price": 2})
+    cache.invalidate("AAPL")
+    assert cache.stats()["entries"] == 1